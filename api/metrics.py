@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from grpc_core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Возвращает метрики процесса в текстовом формате Prometheus.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
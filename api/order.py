@@ -2,17 +2,19 @@ import typing as t
 import jwt
 from datetime import datetime, timedelta
 from loguru import logger
-from fastapi import APIRouter, Depends, HTTPException, status, Security
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Security
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.responses import JSONResponse
 
+from grpc import StatusCode
 from grpc.aio import AioRpcError
 from google.protobuf.json_format import MessageToDict
 
 from grpc_core.protos.order import order_pb2
 from grpc_core.clients.order import grpc_order_client
 from grpc_core.protos.check import check_pb2
-from grpc_core.servers.schemas.order import OrderListResponse, OrderReadResponse, OrderDeleteResponse
+from grpc_core.servers.schemas.order import (OrderListResponse, OrderReadResponse, OrderDeleteResponse,
+                                             OrderSearchResponse, OrderSearchResult, OrderStatsResponse)
 from settings import settings
 
 router = APIRouter(prefix='/order', tags=['Order'])
@@ -31,17 +33,36 @@ async def get_token() -> JSONResponse:
 
 @router.get("")
 async def list_orders(
+        date_from: str = '',
+        date_to: str = '',
+        completed: t.Optional[bool] = None,
+        limit: int = 0,
+        page_token: str = '',
+        include_archived: bool = False,
         key: str = Security(api_key_header),
         client: t.Any = Depends(grpc_order_client)
 ) -> JSONResponse:
     """
     Получает список заказов через gRPC сервис OrderService.
 
-    Функция вызывает метод ListOrders gRPC сервиса OrderService для получения списка всех заказов.
+    Функция вызывает метод ListOrders gRPC сервиса OrderService для получения списка всех заказов или,
+    если заданы фильтры, страницы заказов с датой в [date_from, date_to) в порядке даты.
     В случае ошибки gRPC запроса, выбрасывается HTTPException.
 
     Параметры:
     ----------
+    date_from : str, optional
+        Начало диапазона дат (ISO 8601, без часового пояса - UTC), включительно.
+    date_to : str, optional
+        Конец диапазона дат, не включительно.
+    completed : bool, optional
+        Только выполненные или только невыполненные заказы.
+    limit : int, optional
+        Размер страницы (0 - без ограничения).
+    page_token : str, optional
+        next_page_token предыдущей страницы.
+    include_archived : bool, optional
+        Включать выполненные заказы, перенесенные в архив.
     client : Any, optional
         Клиент gRPC для взаимодействия с сервисом OrderService (по умолчанию используется зависимость grpc_order_client).
 
@@ -55,12 +76,108 @@ async def list_orders(
     HTTPException
         Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 404 и деталями ошибки.
     """
+    request = order_pb2.ListOrdersRequest(
+        date_from=date_from, date_to=date_to, completed=completed, limit=limit, page_token=page_token,
+        include_archived=include_archived,
+    )
     try:
-        orders = await client.ListOrders(order_pb2.ListOrdersRequest())
+        orders = await client.ListOrders(request)
     except AioRpcError as e:
         raise HTTPException(status_code=404, detail=e.details())
 
-    return JSONResponse(OrderListResponse(**MessageToDict(orders)).dict())
+    return JSONResponse(
+        OrderListResponse(**MessageToDict(orders), next_page_token=orders.next_page_token).dict()
+    )
+
+
+@router.get("/search")
+async def search_orders(
+        q: str,
+        limit: int = 0,
+        page_token: str = '',
+        key: str = Security(api_key_header),
+        client: t.Any = Depends(grpc_order_client)
+) -> JSONResponse:
+    """
+    Ищет заказы по названию через gRPC сервис OrderService.
+
+    Функция читает стрим метода SearchOrders gRPC сервиса OrderService и возвращает страницу найденных
+    заказов в порядке релевантности. Неверный запрос (нет слов, неверный limit или page_token) -
+    HTTPException 400, остальные ошибки gRPC - 404.
+
+    Параметры:
+    ----------
+    q : str
+        Строка поиска: слова ищутся как начала слов названия, текст в кавычках - как фраза.
+    limit : int, optional
+        Размер страницы (0 - ORDER_SEARCH_DEFAULT_LIMIT).
+    page_token : str, optional
+        next_page_token предыдущей страницы.
+    client : Any, optional
+        Клиент gRPC для взаимодействия с сервисом OrderService (по умолчанию используется зависимость grpc_order_client).
+
+    Возвращает:
+    -----------
+    JSONResponse
+        JSON-ответ с найденными заказами, их релевантностью (rank, меньше - релевантнее) и next_page_token.
+
+    Исключения:
+    -----------
+    HTTPException
+        Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 400 или 404 и деталями ошибки.
+    """
+    results, next_page_token = [], ''
+    try:
+        async for item in client.SearchOrders(order_pb2.SearchOrdersRequest(query=q, limit=limit, page_token=page_token)):
+            results.append(OrderSearchResult(**MessageToDict(item, preserving_proto_field_name=True)))
+            next_page_token = item.next_page_token
+    except AioRpcError as e:
+        status_code = 400 if e.code() == StatusCode.INVALID_ARGUMENT else 404
+        raise HTTPException(status_code=status_code, detail=e.details())
+
+    return JSONResponse(OrderSearchResponse(results=results, next_page_token=next_page_token).dict())
+
+
+@router.get("/stats")
+async def order_stats(
+        date_from: str = '',
+        date_to: str = '',
+        key: str = Security(api_key_header),
+        client: t.Any = Depends(grpc_order_client)
+) -> JSONResponse:
+    """
+    Получает счетчики заказов через gRPC сервис OrderService.
+
+    Функция вызывает метод GetOrderStats gRPC сервиса OrderService и возвращает число всех, выполненных
+    и невыполненных заказов и гистограмму по дням UTC. Неверная дата - HTTPException 400,
+    остальные ошибки gRPC - 404.
+
+    Параметры:
+    ----------
+    date_from : str, optional
+        Первый день гистограммы (YYYY-MM-DD), включительно.
+    date_to : str, optional
+        Последний день гистограммы, не включительно.
+    client : Any, optional
+        Клиент gRPC для взаимодействия с сервисом OrderService (по умолчанию используется зависимость grpc_order_client).
+
+    Возвращает:
+    -----------
+    JSONResponse
+        JSON-ответ со счетчиками заказов.
+
+    Исключения:
+    -----------
+    HTTPException
+        Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 400 или 404 и деталями ошибки.
+    """
+    try:
+        stats = await client.GetOrderStats(order_pb2.GetOrderStatsRequest(date_from=date_from, date_to=date_to))
+    except AioRpcError as e:
+        status_code = 400 if e.code() == StatusCode.INVALID_ARGUMENT else 404
+        raise HTTPException(status_code=status_code, detail=e.details())
+
+    return JSONResponse(OrderStatsResponse(**MessageToDict(stats, preserving_proto_field_name=True)).dict())
 
 
 @router.get("/{uuid:str}")
@@ -105,6 +222,7 @@ async def create_order(
         name: str,
         completed: bool,
         date: str = f'{datetime.utcnow()}Z',
+        idempotency_key: t.Optional[str] = Header(default=None, alias='Idempotency-Key'),
         client: t.Any = Depends(grpc_order_client),
         key: str = Security(api_key_header),
 ) -> JSONResponse:
@@ -122,6 +240,9 @@ async def create_order(
         Статус выполнения заказа.
     date : str, optional
         Дата создания заказа в формате строки (по умолчанию текущая дата и время в формате UTC с 'Z').
+    idempotency_key : str, optional
+        Ключ идемпотентности из заголовка Idempotency-Key. Повторный запрос с тем же ключом вернет
+        ранее созданный заказ вместо создания нового, а запрос с тем же ключом и другими параметрами - 422.
     client : Any, optional
         Клиент gRPC для взаимодействия с сервисом OrderService (по умолчанию используется зависимость grpc_order_client).
 
@@ -133,7 +254,7 @@ async def create_order(
     Исключения:
     -----------
     HTTPException
-        Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 404 и деталями ошибки.
+        Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 422 или 404 и деталями ошибки.
     """
     try:
         order = await client.CreateOrder(
@@ -141,11 +262,14 @@ async def create_order(
                 name=name,
                 completed=completed,
                 date=date
-            )
+            ),
+            metadata=(('idempotency-key', idempotency_key),) if idempotency_key else None,
         )
     except AioRpcError as e:
         logger.error(e.details())
-        raise HTTPException(status_code=404, detail=e.details())
+        # INVALID_ARGUMENT - ключ идемпотентности использован с другими параметрами
+        status_code = 422 if e.code() == StatusCode.INVALID_ARGUMENT else 404
+        raise HTTPException(status_code=status_code, detail=e.details())
 
     return JSONResponse(MessageToDict(order))
 
@@ -186,7 +310,8 @@ async def update_order(
    Исключения:
    -----------
    HTTPException
-       Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 404 и деталями ошибки.
+       Исключение, выбрасываемое при ошибке gRPC запроса, с кодом состояния 409, если заказ перенесен в архив,
+       иначе 404, и деталями ошибки.
    """
     try:
         order = await client.UpdateOrder(
@@ -198,7 +323,8 @@ async def update_order(
             )
         )
     except AioRpcError as e:
-        raise HTTPException(status_code=404, detail=e.details())
+        status_code = 409 if e.code() == StatusCode.FAILED_PRECONDITION else 404
+        raise HTTPException(status_code=status_code, detail=e.details())
 
     return JSONResponse(OrderReadResponse(**MessageToDict(order)).dict())
 
@@ -250,6 +376,8 @@ async def check_order_status(
         # устанавливаем тайм-аут в 2 секунды, определяя за сколько времени должна будет отработать вся цепочка вызовов
         order = await client.CheckStatusOrder(check_pb2.CheckStatusOrderRequest(uuid=uuid), timeout=2)
     except AioRpcError as e:
-        raise HTTPException(status_code=404, detail=e.details())
+        # Заказ перенесен в архив: статус архивного заказа не изменяется
+        status_code = 409 if e.code() == StatusCode.FAILED_PRECONDITION else 404
+        raise HTTPException(status_code=status_code, detail=e.details())
 
     return JSONResponse(MessageToDict(order))
@@ -0,0 +1,133 @@
+"""
+Бенчмарк клиентских повторов и хеджирования против локального сервера с внедрением сбоев.
+
+Сервер отвечает на ReadOrder/ListOrders/UpdateOrder, отклоняя часть запросов с кодом UNAVAILABLE
+и задерживая часть ответов (медленный «хвост»). Одна и та же нагрузка прогоняется через обычный канал
+и через канал grpc_core.clients.channel.create_channel, после чего сравниваются доля успешных ответов,
+перцентили задержки и число запросов, дошедших до сервера.
+
+Запуск:
+    python -m benchmarks.client_resilience --requests 2000 --concurrency 20 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import grpc
+
+from grpc_core.clients.channel import create_channel
+from grpc_core.protos.order import order_pb2, order_pb2_grpc
+
+
+class FaultyOrderService(order_pb2_grpc.OrderServiceServicer):
+    def __init__(self, failure_rate: float, slow_rate: float, slow_delay: float, delay: float) -> None:
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.delay = delay
+        self.attempts = 0
+
+    async def _respond(self, context, response):
+        self.attempts += 1
+        if random.random() < self.failure_rate:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, 'Внедренный сбой')
+        await asyncio.sleep(self.slow_delay if random.random() < self.slow_rate else self.delay)
+        return response
+
+    async def ReadOrder(self, request, context):
+        return await self._respond(context, order_pb2.ReadOrderResponse(order=order_pb2.Order(uuid=request.uuid)))
+
+    async def ListOrders(self, request, context):
+        return await self._respond(context, order_pb2.ListOrdersResponse())
+
+    async def UpdateOrder(self, request, context):
+        return await self._respond(context, order_pb2.UpdateOrderResponse(order=order_pb2.Order(uuid=request.uuid)))
+
+
+async def drive(stub, method: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if method == 'ReadOrder':
+                    await stub.ReadOrder(order_pb2.ReadOrderRequest(uuid=str(i)), timeout=5)
+                elif method == 'ListOrders':
+                    await stub.ListOrders(order_pb2.ListOrdersRequest(), timeout=5)
+                else:
+                    await stub.UpdateOrder(order_pb2.UpdateOrderRequest(uuid=str(i)), timeout=5)
+            except grpc.aio.AioRpcError:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 2) if latencies else 0.0
+
+    return {
+        'success_rate': round(len(latencies) / requests, 4),
+        'errors': errors,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+async def main(args) -> None:
+    service = FaultyOrderService(args.failure_rate, args.slow_rate, args.slow_delay, args.delay)
+    server = grpc.aio.server()
+    order_pb2_grpc.add_OrderServiceServicer_to_server(service, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    await server.start()
+    target = f'127.0.0.1:{port}'
+
+    results = {}
+    try:
+        for name, channel in (
+                ('plain', grpc.aio.insecure_channel(target)),
+                ('resilient', create_channel(target)),
+        ):
+            async with channel:
+                stub = order_pb2_grpc.OrderServiceStub(channel)
+                for method in args.methods:
+                    service.attempts = 0
+                    result = await drive(stub, method, args.requests, args.concurrency)
+                    result['server_attempts'] = service.attempts
+                    results[f'{name}.{method}'] = result
+    finally:
+        await server.stop(grace=None)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    header = f"{'channel.method':<24}{'success':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'attempts':>10}"
+    print(header)
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['success_rate']:>9}{result['errors']:>8}{result['p50_ms']:>9}"
+            f"{result['p95_ms']:>9}{result['p99_ms']:>9}{result['server_attempts']:>10}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.05, help='доля ответов UNAVAILABLE')
+    parser.add_argument('--slow-rate', type=float, default=0.02, help='доля медленных ответов')
+    parser.add_argument('--slow-delay', type=float, default=0.5, help='задержка медленного ответа, с')
+    parser.add_argument('--delay', type=float, default=0.002, help='обычная задержка ответа, с')
+    parser.add_argument('--methods', nargs='+', default=['ReadOrder', 'ListOrders', 'UpdateOrder'])
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""
+Микробенчмарки слоев преобразования заказов.
+
+Каждый шаг, через который проходят заказы между БД, gRPC и HTTP шлюзом, замеряется отдельно
+для --sizes заказов (по умолчанию 1, 100 и 10000):
+    request.rpc_to_dict     - GrpcParseMessage.rpc_to_dict для запросов CreateOrderRequest;
+    request.pydantic        - OrderCreateRequest из полученных словарей;
+    response.pydantic       - OrderListResponse из строк БД (OrderHandler.list_orders);
+    response.dict           - OrderListResponse.dict();
+    response.dict_to_rpc    - GrpcParseMessage.dict_to_rpc в ListOrdersResponse (OrderService);
+    response.serialize      - сериализация ListOrdersResponse;
+    gateway.parse           - разбор ListOrdersResponse на стороне шлюза;
+    gateway.message_to_dict - MessageToDict (api/order.py);
+    gateway.pydantic        - OrderListResponse из словаря шлюза;
+    gateway.json            - JSONResponse из OrderListResponse.dict().
+Для шага выводятся время вызова (минимум и медиана по --repeat повторам), время на один заказ,
+пиковый объем памяти, выделенной за один вызов, и объем его результата (tracemalloc).
+
+Реализация protobuf выбирается при импорте, поэтому каждая из --backends (python, upb, cpp) замеряется
+в отдельном процессе с PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION; недоступные реализации пропускаются.
+--output сохраняет результаты в JSON.
+
+Запуск:
+    python -m benchmarks.conversion --backends python,upb --sizes 1,100,10000 --output conversion.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+import uuid
+import warnings
+
+from benchmarks.workers_scaling import ROOT
+
+STEPS = (
+    'request.rpc_to_dict',
+    'request.pydantic',
+    'response.pydantic',
+    'response.dict',
+    'response.dict_to_rpc',
+    'response.serialize',
+    'gateway.parse',
+    'gateway.message_to_dict',
+    'gateway.pydantic',
+    'gateway.json',
+)
+
+
+def steps(orders: int) -> dict:
+    """
+    Готовит входные данные для orders заказов и возвращает вызовы шагов без аргументов.
+    """
+    # Импорт внутри дочернего процесса: реализация protobuf уже выбрана переменной окружения
+    from fastapi.responses import JSONResponse
+    from google.protobuf.json_format import MessageToDict
+
+    from grpc_core.protos.order import order_pb2
+    from grpc_core.servers.schemas.order import OrderCreateRequest, OrderListResponse, OrderResponse
+    from grpc_core.servers.utils import GrpcParseMessage
+
+    parser = GrpcParseMessage()
+    rows = [
+        {'uuid': str(uuid.UUID(int=index + 1)), 'name': f'order {index}', 'completed': bool(index % 2), 'date': '2024-01-01'}
+        for index in range(orders)
+    ]
+    requests = [order_pb2.CreateOrderRequest(name=row['name'], date=row['date']) for row in rows]
+    request_dicts = [parser.rpc_to_dict(request) for request in requests]
+    model = OrderListResponse(orders=[OrderResponse(**row) for row in rows])
+    data = model.dict()
+    message = parser.dict_to_rpc(data, order_pb2.ListOrdersResponse())
+    payload = message.SerializeToString()
+    gateway_dict = MessageToDict(message)
+    gateway_model = OrderListResponse(**gateway_dict)
+
+    return {
+        'request.rpc_to_dict': lambda: [parser.rpc_to_dict(request) for request in requests],
+        'request.pydantic': lambda: [OrderCreateRequest(**data) for data in request_dicts],
+        'response.pydantic': lambda: OrderListResponse(orders=[OrderResponse(**row) for row in rows]),
+        'response.dict': model.dict,
+        'response.dict_to_rpc': lambda: parser.dict_to_rpc(data, order_pb2.ListOrdersResponse()),
+        'response.serialize': message.SerializeToString,
+        'gateway.parse': lambda: order_pb2.ListOrdersResponse.FromString(payload),
+        'gateway.message_to_dict': lambda: MessageToDict(message),
+        'gateway.pydantic': lambda: OrderListResponse(**gateway_dict),
+        'gateway.json': lambda: JSONResponse(gateway_model.dict()),
+    }
+
+
+def allocated(function) -> tuple[int, int]:
+    """
+    Пиковый объем памяти, выделенной за один вызов, и объем, занятый его результатом, в байтах.
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - before, current - before
+
+
+def measure(sizes: list[int], repeat: int) -> list[dict]:
+    from google.protobuf.internal import api_implementation
+
+    backend = api_implementation.Type()
+    results = []
+    for orders in sizes:
+        calls = steps(orders)
+        for step in STEPS:
+            function = calls[step]
+            timer = timeit.Timer(function)
+            number, _ = timer.autorange()
+            timings = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+            peak, retained = allocated(function)
+            results.append({
+                'backend': backend,
+                'step': step,
+                'orders': orders,
+                'us_per_call_min': round(min(timings) * 1e6, 2),
+                'us_per_call_median': round(statistics.median(timings) * 1e6, 2),
+                'us_per_order': round(min(timings) / orders * 1e6, 3),
+                'alloc_peak_kib': round(peak / 1024, 1),
+                'result_kib': round(retained / 1024, 1),
+            })
+    return results
+
+
+def run_backend(backend: str, args) -> list[dict] | None:
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION': backend}
+    command = [
+        sys.executable, '-m', 'benchmarks.conversion', '--child',
+        '--sizes', ','.join(map(str, args.sizes)), '--repeat', str(args.repeat),
+    ]
+    process = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f'Реализация protobuf {backend} недоступна: {process.stderr.strip().splitlines()[-1]}', file=sys.stderr)
+        return None
+    results = json.loads(process.stdout)
+    if results and results[0]['backend'] != backend:
+        # Старые версии protobuf молча подменяют неизвестную реализацию другой
+        print(f'Реализация protobuf {backend} недоступна: загружена {results[0]["backend"]}', file=sys.stderr)
+        return None
+    return results
+
+
+def main(args) -> None:
+    if args.child:
+        # .dict() моделей pydantic v2 устарел, но используется в коде сервиса: предупреждения не выводим
+        warnings.simplefilter('ignore', DeprecationWarning)
+        print(json.dumps(measure(args.sizes, args.repeat)))
+        return
+
+    results = []
+    for backend in args.backends.split(','):
+        results.extend(run_backend(backend, args) or [])
+    report = {
+        'parameters': {'sizes': args.sizes, 'repeat': args.repeat, 'backends': args.backends.split(',')},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = [
+        'backend', 'step', 'orders', 'us_per_call_min', 'us_per_call_median', 'us_per_order', 'alloc_peak_kib', 'result_kib',
+    ]
+    print(f'{columns[0]:<9}{columns[1]:<25}' + ''.join(f'{column:>20}' for column in columns[2:]))
+    for result in results:
+        print(
+            f"{result['backend']:<9}{result['step']:<25}"
+            + ''.join(f'{str(result[column]):>20}' for column in columns[2:])
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--sizes', type=lambda value: [int(size) for size in value.split(',')], default='1,100,10000',
+        help='число заказов через запятую',
+    )
+    parser.add_argument('--backends', default='python,upb', help='реализации protobuf через запятую: python, upb, cpp')
+    parser.add_argument('--repeat', type=int, default=5, help='число повторов замера')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    main(parser.parse_args())
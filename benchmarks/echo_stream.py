@@ -0,0 +1,128 @@
+"""
+Пропускная способность стримов EchoService.
+
+Запускает gRPC сервер (python -m grpc_core.servers) во временном каталоге и для каждого размера полезной
+нагрузки из --payload-sizes измеряет:
+    server - ServerStream с --messages ответами без пауз (interval=0);
+    both   - полнодуплексный BothStream: клиент отправляет --messages сообщений, не дожидаясь ответов,
+             и одновременно читает по одному ответу на каждое.
+Выводятся скорость отправки клиента (sent), скорость приема, измеренная клиентом, и скорость, которую
+сервер передал в trailing metadata (echo-messages-per-sec, echo-bytes-per-sec). С --client-delay клиент
+читает медленно, и за счет управления потоком HTTP/2 скорость сервера падает до скорости клиента.
+Скрипт только измеряет; выигрыш конвейера BothStream и ограничение ECHO_MAX_IN_FLIGHT проверяются
+тестами tests/perf/test_echo_stream.py (маркер perf).
+
+Запуск:
+    python -m benchmarks.echo_stream --rpc both --messages 20000 --payload-sizes 0,1024,65536
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import grpc
+
+from benchmarks.workers_scaling import ROOT, auth_metadata, free_port, wait_ready
+from grpc_core.protos.echo import echo_pb2, echo_pb2_grpc
+
+
+def summary(rpc: str, payload_size: int, sent, received: tuple[int, int, float], trailing) -> dict:
+    # sent - число отправленных сообщений и время отправки или None, если клиент отправляет один запрос
+    messages, received_bytes, elapsed = received
+    return {
+        'rpc': rpc,
+        'payload_size': payload_size,
+        'messages': messages,
+        'sent_msgs_per_sec': round(sent[0] / sent[1], 1) if sent else None,
+        'client_msgs_per_sec': round(messages / elapsed, 1),
+        'client_mbytes_per_sec': round(received_bytes / elapsed / 1e6, 2),
+        'server_msgs_per_sec': float(trailing['echo-messages-per-sec']),
+        'server_mbytes_per_sec': round(float(trailing['echo-bytes-per-sec']) / 1e6, 2),
+    }
+
+
+async def receive(call, client_delay: float, started: float) -> tuple[int, int, float]:
+    received = 0
+    received_bytes = 0
+    async for reply in call:
+        received += 1
+        received_bytes += reply.ByteSize()
+        if client_delay:
+            await asyncio.sleep(client_delay)
+    return received, received_bytes, time.perf_counter() - started
+
+
+async def server_stream(stub, messages: int, payload_size: int, client_delay: float) -> dict:
+    request = echo_pb2.EchoMessage(
+        username='benchmark', message='echo', replies=messages, interval=0, payload_size=payload_size
+    )
+    started = time.perf_counter()
+    call = stub.ServerStream(request, metadata=auth_metadata())
+    received = await receive(call, client_delay, started)
+    return summary('server', payload_size, None, received, await call.trailing_metadata())
+
+
+async def both_stream(stub, messages: int, payload_size: int, client_delay: float) -> dict:
+    request = echo_pb2.EchoMessage(username='benchmark', message='echo', replies=1, interval=0, payload_size=payload_size)
+    started = time.perf_counter()
+    call = stub.BothStream(metadata=auth_metadata())
+
+    async def send() -> tuple[int, float]:
+        for _ in range(messages):
+            await call.write(request)
+        await call.done_writing()
+        return messages, time.perf_counter() - started
+
+    sent, received = await asyncio.gather(send(), receive(call, client_delay, started))
+    return summary('both', payload_size, sent, received, await call.trailing_metadata())
+
+
+RPCS = {'server': server_stream, 'both': both_stream}
+
+
+async def run(args, target: str) -> list[dict]:
+    await wait_ready(target)
+    rpcs = list(RPCS) if args.rpc == 'all' else [args.rpc]
+    async with grpc.aio.insecure_channel(target) as channel:
+        stub = echo_pb2_grpc.EchoServiceStub(channel)
+        return [
+            await RPCS[rpc](stub, args.messages, size, args.client_delay)
+            for rpc in rpcs
+            for size in map(int, args.payload_sizes.split(','))
+        ]
+
+
+def main(args) -> None:
+    port = free_port()
+    env = {
+        **os.environ, 'PYTHONPATH': ROOT, 'GRPC_PORT': str(port), 'TRACING_EXPORTER': 'none', 'LOG_LEVEL': 'WARNING',
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        server = subprocess.Popen([sys.executable, '-m', 'grpc_core.servers', '--workers', '1'], cwd=directory, env=env)
+        try:
+            results = asyncio.run(run(args, f'127.0.0.1:{port}'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print(''.join(f'{column:>22}' for column in columns))
+    for result in results:
+        print(''.join(f'{str(result[column]):>22}' for column in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rpc', choices=(*RPCS, 'all'), default='all', help='измеряемый метод')
+    parser.add_argument('--messages', type=int, default=20000, help='число сообщений в стриме')
+    parser.add_argument('--payload-sizes', default='0,1024,65536', help='размеры полезной нагрузки через запятую, байт')
+    parser.add_argument('--client-delay', type=float, default=0.0, help='пауза клиента после каждого ответа, с')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""
+Демонстрация клиентской балансировки между несколькими бэкендами OrderService.
+
+Запускает в процессе несколько серверов на разных портах: обычные, медленный, часто отвечающий
+UNAVAILABLE и помеченный через Health как NOT_SERVING. Затем отправляет запросы через LoadBalancer
+и выводит, сколько запросов получил каждый бэкенд и был ли он исключен из ротации.
+
+Запуск:
+    python -m benchmarks.load_balancing --policy least_request --requests 2000
+"""
+import argparse
+import asyncio
+
+import grpc
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+
+from benchmarks.client_resilience import FaultyOrderService
+from grpc_core.clients.balancer import LoadBalancer
+from grpc_core.protos.order import order_pb2, order_pb2_grpc
+
+BACKENDS = {
+    'normal-1': dict(failure_rate=0.0, slow_rate=0.0, slow_delay=0.0, delay=0.002),
+    'normal-2': dict(failure_rate=0.0, slow_rate=0.0, slow_delay=0.0, delay=0.002),
+    'slow': dict(failure_rate=0.0, slow_rate=1.0, slow_delay=0.05, delay=0.0),
+    'failing': dict(failure_rate=0.5, slow_rate=0.0, slow_delay=0.0, delay=0.002),
+    'not-serving': dict(failure_rate=0.0, slow_rate=0.0, slow_delay=0.0, delay=0.002),
+}
+
+
+class StaticHealthService(health_pb2_grpc.HealthServicer):
+    def __init__(self, status) -> None:
+        self.status = status
+
+    async def Watch(self, request, context):
+        yield health_pb2.HealthCheckResponse(status=self.status)
+        # Статус не меняется: держим подписку открытой, пока клиент ее не отменит
+        await asyncio.Future()
+
+
+async def start_backend(name: str, config: dict):
+    service = FaultyOrderService(**config)
+    status = health_pb2.HealthCheckResponse.NOT_SERVING if name == 'not-serving' else health_pb2.HealthCheckResponse.SERVING
+    health_servicer = StaticHealthService(status)
+    server = grpc.aio.server()
+    order_pb2_grpc.add_OrderServiceServicer_to_server(service, server)
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    await server.start()
+    return server, service, f'127.0.0.1:{port}'
+
+
+async def main(args) -> None:
+    started = {name: await start_backend(name, config) for name, config in BACKENDS.items()}
+    balancer = LoadBalancer([address for _, _, address in started.values()], policy=args.policy)
+    # Даем подпискам Health.Watch получить первый статус
+    await asyncio.sleep(0.5)
+
+    stub = order_pb2_grpc.OrderServiceStub(balancer.channel())
+    semaphore = asyncio.Semaphore(args.concurrency)
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            try:
+                await stub.UpdateOrder(order_pb2.UpdateOrderRequest(uuid=str(i)), timeout=5)
+            except grpc.aio.AioRpcError:
+                errors += 1
+
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+    print(f"{'backend':<14}{'address':<18}{'requests':>10}{'healthy':>9}{'ejections':>11}")
+    for (name, (_, service, address)), backend in zip(started.items(), balancer.backends):
+        print(f'{name:<14}{address:<18}{service.attempts:>10}{str(backend.healthy):>9}{backend.ejections:>11}')
+    print(f'errors: {errors}')
+
+    await balancer.close()
+    for server, _, _ in started.values():
+        await server.stop(grace=None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--policy', choices=['round_robin', 'least_request'], default='round_robin')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""
+Стоимость логирования одного запроса в горячем пути.
+
+Сравниваются три способа записать результат ListOrders:
+    eager   - f-строка с полным списком заказов (форматируется всегда, даже если уровень отфильтрован);
+    lazy    - тот же полный список, переданный аргументом (форматируется, только если сообщение пишется);
+    summary - только число заказов, как в OrderHandler.list_orders.
+Каждый способ измеряется для сообщения, которое пишется (INFO), и отфильтрованного по уровню (DEBUG),
+с записью в файл в вызывающем потоке (enqueue=False) и через очередь (enqueue=True, как в grpc_core.logger).
+call_us - время вызова логгера в обработчике, drain_ms - время дозаписи очереди после серии вызовов.
+
+Запуск:
+    python -m benchmarks.logging_cost --orders 1000 --calls 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from loguru import logger
+
+STYLES = ('eager', 'lazy', 'summary')
+# Уровень сообщения при уровне обработчика INFO: INFO пишется, DEBUG отфильтровывается
+LEVELS = (('emitted', 'INFO'), ('filtered', 'DEBUG'))
+
+
+def make_orders(count: int) -> list[dict]:
+    return [
+        {'uuid': str(uuid.uuid4()), 'name': f'order {i}', 'completed': bool(i % 2), 'date': '2024-01-01 00:00:00'}
+        for i in range(count)
+    ]
+
+
+def log_call(style: str, level: str, orders: list[dict]) -> None:
+    if style == 'eager':
+        logger.log(level, f'List orders: {orders}')
+    elif style == 'lazy':
+        logger.log(level, 'List orders: {}', orders)
+    else:
+        logger.log(level, 'List orders: {} orders', len(orders))
+
+
+def measure(style: str, level: str, enqueue: bool, orders: list[dict], calls: int, path: str) -> dict:
+    logger.remove()
+    handler = logger.add(path, level='INFO', enqueue=enqueue, diagnose=False)
+    try:
+        started = time.perf_counter()
+        for _ in range(calls):
+            log_call(style, level, orders)
+        elapsed = time.perf_counter() - started
+        drain_started = time.perf_counter()
+        logger.complete()
+        drain = time.perf_counter() - drain_started
+    finally:
+        logger.remove(handler)
+    return {'call_us': round(elapsed / calls * 1e6, 2), 'drain_ms': round(drain * 1e3, 1)}
+
+
+def main(args) -> None:
+    orders = make_orders(args.orders)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        for enqueue in (False, True):
+            for style in STYLES:
+                for level_name, level in LEVELS:
+                    result = measure(style, level, enqueue, orders, args.calls, path)
+                    results.append({'style': style, 'level': level_name, 'enqueue': enqueue, **result})
+
+    if args.json:
+        print(json.dumps({'orders': args.orders, 'calls': args.calls, 'results': results}, indent=2))
+        return
+    print(f'orders={args.orders} calls={args.calls}')
+    print(f"{'style':<10}{'level':<10}{'enqueue':<10}{'call_us':>12}{'drain_ms':>12}")
+    for result in results:
+        print(
+            f"{result['style']:<10}{result['level']:<10}{str(result['enqueue']):<10}"
+            f"{result['call_us']:>12}{result['drain_ms']:>12}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=1000, help='число заказов в ответе ListOrders')
+    parser.add_argument('--calls', type=int, default=2000, help='число вызовов логгера на сценарий')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
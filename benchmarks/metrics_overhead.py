@@ -0,0 +1,89 @@
+"""
+Стоимость записи метрик gRPC на один вызов.
+
+Измеряются:
+    record    - запись завершенного вызова в RpcMethodMetrics (in-flight, код ответа, задержка, размеры);
+    unary     - вызов обработчика без метрик и в обертке MetricsInterceptor, разница - накладные расходы;
+    render    - формирование ответа /metrics для --methods методов.
+
+Запуск:
+    python -m benchmarks.metrics_overhead --calls 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from grpc_core.metrics import REGISTRY, Registry, RpcMetrics
+from grpc_core.servers import interceptors
+
+
+class Context:
+    # Контекст вызова без установленного кода ответа, как у успешно завершенного обработчика
+    @staticmethod
+    def code():
+        return None
+
+
+async def behavior(request, context):
+    return request
+
+
+def measure_record(metrics: RpcMetrics, calls: int) -> float:
+    method = metrics.method('/bench.BenchService/Call')
+    started = time.perf_counter()
+    for _ in range(calls):
+        method.start()
+        method.request_bytes.observe(120)
+        method.response_bytes.observe(480)
+        method.finish('OK', 0.0012)
+    return (time.perf_counter() - started) / calls
+
+
+async def measure_call(handler, calls: int) -> float:
+    context = Context()
+    started = time.perf_counter()
+    for _ in range(calls):
+        await handler(b'request', context)
+    return (time.perf_counter() - started) / calls
+
+
+def measure_render(registry: Registry, metrics: RpcMetrics, methods: int) -> float:
+    for index in range(methods):
+        method = metrics.method(f'/bench.BenchService/Method{index}')
+        method.start()
+        method.finish('OK', 0.001)
+    started = time.perf_counter()
+    registry.render()
+    return time.perf_counter() - started
+
+
+def main(args) -> None:
+    metrics = RpcMetrics('bench')
+    record = measure_record(metrics, args.calls)
+    wrapped = interceptors._measured_unary(behavior, metrics.method('/bench.BenchService/Wrapped'))
+    bare_call = asyncio.run(measure_call(behavior, args.calls))
+    wrapped_call = asyncio.run(measure_call(wrapped, args.calls))
+    render = measure_render(REGISTRY, metrics, args.methods)
+
+    results = {
+        'record_us': round(record * 1e6, 3),
+        'unary_bare_us': round(bare_call * 1e6, 3),
+        'unary_metered_us': round(wrapped_call * 1e6, 3),
+        'unary_overhead_us': round((wrapped_call - bare_call) * 1e6, 3),
+        'render_ms': round(render * 1e3, 2),
+        'methods': args.methods,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, value in results.items():
+        print(f'{name:<20}{value:>12}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100000, help='число вызовов на измерение')
+    parser.add_argument('--methods', type=int, default=50, help='число методов при измерении /metrics')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
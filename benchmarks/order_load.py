@@ -0,0 +1,323 @@
+"""
+Нагрузочный бенчмарк OrderService.
+
+Запускает Server в этом же процессе на свободном порту с БД SQLite во временном каталоге, заполняет
+таблицу заказов до каждого размера из --table-sizes (напрямую через sqlite3, без RPC) и подает нагрузку:
+    closed - --concurrency клиентов, каждый отправляет следующий запрос после ответа на предыдущий;
+    open   - запросы отправляются с постоянной частотой --rate независимо от ответов, задержка
+             считается от запланированного момента отправки, поэтому очередь на сервере в нее входит.
+Смесь методов задается --workload: имя набора из WORKLOADS или веса методов, например
+ReadOrder=80,UpdateOrder=15,ListOrders=5. Для каждого размера таблицы и метода выводятся число запросов,
+ошибки по кодам, пропускная способность и задержки p50/p90/p99/p999; --output сохраняет результаты и
+параметры запуска в JSON для сравнения запусков.
+
+--storage выбирает хранилище заказов (ORDER_STORAGE): sqlite, sharded или memory. Заказы sharded и memory создаются через
+хранилище в процессе сервера; разница задержек sqlite и memory - доля хранилища во времени вызова.
+
+Клиент и сервер делят один цикл событий, поэтому задержки включают работу клиента, а пропускная
+способность ограничена одним ядром. ListOrders возвращает всю таблицу: на больших таблицах он
+блокирует цикл событий на секунды (задержки остальных методов растут вместе с ним) и завершается
+DEADLINE_EXCEEDED по --timeout или RESOURCE_EXHAUSTED, если ответ превышает GRPC_MAX_SEND_MESSAGE_LENGTH.
+
+Запуск:
+    python -m benchmarks.order_load --mode closed --concurrency 32 --workload mixed --duration 10
+    python -m benchmarks.order_load --mode open --rate 500 --workload read --table-sizes 1000,1000000 --output load.json
+    python -m benchmarks.order_load --workload read --table-sizes 10000 --storage memory
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from collections import Counter, deque
+
+import grpc
+
+from benchmarks.workers_scaling import auth_metadata, free_port
+from grpc_core.logger import setup_logging
+from grpc_core.protos.check import check_pb2
+from grpc_core.protos.order import order_pb2, order_pb2_grpc
+from settings import settings
+
+WORKLOADS = {
+    'read': {'ReadOrder': 1},
+    'write': {'CreateOrder': 1},
+    'update': {'UpdateOrder': 1},
+    'delete': {'DeleteOrder': 1},
+    'list': {'ListOrders': 1},
+    'mixed': {'ReadOrder': 70, 'UpdateOrder': 15, 'CreateOrder': 10, 'DeleteOrder': 5},
+    'mixed-list': {'ReadOrder': 69, 'UpdateOrder': 15, 'CreateOrder': 10, 'DeleteOrder': 5, 'ListOrders': 1},
+}
+PERCENTILES = {'p50_ms': 0.5, 'p90_ms': 0.9, 'p99_ms': 0.99, 'p999_ms': 0.999}
+SEED_BATCH = 10000
+
+
+def parse_workload(value: str) -> dict[str, float]:
+    if value in WORKLOADS:
+        return WORKLOADS[value]
+    mix = {}
+    for item in value.split(','):
+        rpc, _, weight = item.partition('=')
+        if rpc not in order_pb2.DESCRIPTOR.services_by_name['OrderService'].methods_by_name:
+            raise argparse.ArgumentTypeError(f'Неизвестный метод OrderService: {rpc}')
+        mix[rpc] = float(weight or 1)
+    return mix
+
+
+def order_uuid(index: int) -> str:
+    # uuid заранее созданного заказа вычисляется по номеру, чтобы не хранить миллион строк в памяти
+    return str(uuid.UUID(int=index + 1))
+
+
+def seed_orders(path: str, start: int, stop: int) -> None:
+    """
+    Добавляет в таблицу order заказы с номерами от start до stop одной транзакцией.
+    """
+    rows = ((order_uuid(index), f'order {index}', index % 2, '2024-01-01') for index in range(start, stop))
+    with sqlite3.connect(path) as connection:
+        while batch := [row for _, row in zip(range(SEED_BATCH), rows)]:
+            connection.executemany('INSERT INTO "order" (uuid, name, completed, date) VALUES (?, ?, ?, ?)', batch)
+
+
+async def seed_repository(start: int, stop: int) -> None:
+    """
+    Добавляет заказы с номерами от start до stop через хранилище процесса (для ORDER_STORAGE=memory).
+    """
+    from grpc_core.servers.repositories.order import get_order_repository
+
+    repository = get_order_repository()
+    for index in range(start, stop):
+        await repository.insert({'uuid': order_uuid(index), 'name': f'order {index}', 'completed': bool(index % 2),
+                                 'date': '2024-01-01'})
+
+
+def count_orders(path: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT COUNT(*) FROM "order"').fetchone()[0]
+
+
+class Workload:
+    """
+    Генератор запросов смеси методов и учет их результатов.
+
+    Атрибуты:
+    ---------
+    seeded : int
+        Число заранее созданных заказов, из которых выбираются цели ReadOrder и UpdateOrder.
+    latencies : dict[str, list[float]]
+        Задержки успешных и неуспешных вызовов по методам, с.
+    errors : dict[str, collections.Counter]
+        Число ошибок по методам и кодам gRPC.
+    """
+
+    def __init__(self, stub: order_pb2_grpc.OrderServiceStub, mix: dict[str, float], seeded: int, timeout: float) -> None:
+        self.stub = stub
+        self.rpcs = list(mix)
+        self.weights = list(mix.values())
+        self.seeded = seeded
+        self.timeout = timeout
+        self.metadata = auth_metadata()
+        # Заказы, созданные во время замера: DeleteOrder удаляет их, а не заранее созданные заказы,
+        # чтобы ReadOrder и UpdateOrder не получали ошибки на удаленных заказах
+        self.created: deque[str] = deque()
+        self.latencies: dict[str, list[float]] = {rpc: [] for rpc in self.rpcs}
+        self.errors: dict[str, Counter] = {rpc: Counter() for rpc in self.rpcs}
+
+    def _request(self, rpc: str):
+        if rpc == 'ReadOrder':
+            return order_pb2.ReadOrderRequest(uuid=order_uuid(random.randrange(self.seeded)))
+        if rpc == 'UpdateOrder':
+            return order_pb2.UpdateOrderRequest(
+                uuid=order_uuid(random.randrange(self.seeded)), name='updated', completed=True, date='2024-02-01'
+            )
+        if rpc == 'CreateOrder':
+            return order_pb2.CreateOrderRequest(name='benchmark', date='2024-01-01')
+        if rpc == 'DeleteOrder':
+            return order_pb2.DeleteOrderRequest(uuid=self.created.popleft() if self.created else str(uuid.uuid4()))
+        if rpc == 'CheckStatusOrder':
+            return check_pb2.CheckStatusOrderRequest(uuid=order_uuid(random.randrange(self.seeded)))
+        return order_pb2.ListOrdersRequest()
+
+    async def call(self, scheduled: float | None = None) -> None:
+        """
+        Отправляет один запрос случайного метода смеси; задержка считается от scheduled, если он задан.
+        """
+        rpc = random.choices(self.rpcs, self.weights)[0]
+        started = time.perf_counter() if scheduled is None else scheduled
+        try:
+            response = await getattr(self.stub, rpc)(self._request(rpc), metadata=self.metadata, timeout=self.timeout)
+        except grpc.aio.AioRpcError as e:
+            self.errors[rpc][e.code().name] += 1
+        else:
+            if rpc == 'CreateOrder':
+                self.created.append(response.order.uuid)
+        self.latencies[rpc].append(time.perf_counter() - started)
+
+
+async def closed_loop(workload: Workload, concurrency: int, duration: float) -> float:
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        while time.perf_counter() < deadline:
+            await workload.call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def open_loop(workload: Workload, rate: float, duration: float) -> float:
+    started = time.perf_counter()
+    tasks = set()
+    for index in range(int(rate * duration)):
+        scheduled = started + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(workload.call(scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started
+
+
+def percentile(values: list[float], q: float) -> float:
+    # Ближайший ранг: наименьшее значение, не меньше которого q доли замеров
+    return values[max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))]
+
+
+def summarize(name: str, latencies: list[float], errors: Counter, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    result = {
+        'rpc': name,
+        'requests': len(latencies),
+        'errors': dict(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+    for key, q in PERCENTILES.items():
+        result[key] = round(percentile(latencies, q) * 1e3, 3) if latencies else None
+    return result
+
+
+async def measure(args, target: str, rows: int) -> list[dict]:
+    async with grpc.aio.insecure_channel(target) as channel:
+        workload = Workload(order_pb2_grpc.OrderServiceStub(channel), args.workload, rows, args.timeout)
+        if args.mode == 'closed':
+            elapsed = await closed_loop(workload, args.concurrency, args.duration)
+        else:
+            elapsed = await open_loop(workload, args.rate, args.duration)
+    results = [
+        summarize(rpc, workload.latencies[rpc], workload.errors[rpc], elapsed)
+        for rpc in workload.rpcs
+    ]
+    if len(results) > 1:
+        results.append(summarize(
+            'total',
+            [latency for latencies in workload.latencies.values() for latency in latencies],
+            sum(workload.errors.values(), Counter()),
+            elapsed,
+        ))
+    return results
+
+
+async def run(args) -> list[dict]:
+    # Импорт после настройки: Server читает адрес и трассировку из settings при создании
+    from grpc_core.clients.balancer import close_balancer
+    from grpc_core.servers.manager import Server
+    from grpc_core.servers.repositories.order import get_order_repository
+
+    server = Server()
+    await server.start()
+    target = f'127.0.0.1:{settings.GRPC_PORT}'
+    results = []
+    seeded = 0
+    try:
+        for size in sorted(args.table_sizes):
+            if args.storage == 'sqlite':
+                await asyncio.to_thread(seed_orders, 'bd.sqlite', seeded, size)
+            else:
+                await seed_repository(seeded, size)
+            seeded = max(seeded, size)
+            rows = await get_order_repository().count()
+            for result in await measure(args, target, seeded):
+                results.append({'table_size': size, 'rows': rows, **result})
+    finally:
+        await close_balancer()
+        await server.stop(grace=0)
+    return results
+
+
+def main(args) -> None:
+    settings.GRPC_HOST_LOCAL = '127.0.0.1'
+    settings.GRPC_PORT = free_port()
+    settings.TRACING_EXPORTER = 'none'
+    settings.LOG_LEVEL = args.log_level
+    settings.ORDER_STORAGE = args.storage
+    settings.ORDER_MEMORY_SNAPSHOT_PATH = ''
+    setup_logging()
+
+    output = os.path.abspath(args.output) if args.output else None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # БД bd.sqlite открывается относительно текущего каталога
+        os.chdir(workdir)
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'parameters': {
+            'mode': args.mode,
+            'workload': args.workload,
+            'concurrency': args.concurrency if args.mode == 'closed' else None,
+            'rate': args.rate if args.mode == 'open' else None,
+            'duration': args.duration,
+            'table_sizes': args.table_sizes,
+            'storage': args.storage,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'grpc': grpc.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': results,
+    }
+    if output:
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = ['table_size', 'rpc', 'requests', 'throughput_rps', *PERCENTILES, 'errors']
+    print(''.join(f'{column:>16}' for column in columns[:-1]), '  errors')
+    for result in results:
+        errors = ', '.join(f'{code}={count}' for code, count in result['errors'].items()) or '-'
+        print(''.join(f'{str(result[column]):>16}' for column in columns[:-1]), f'  {errors}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed', help='модель нагрузки')
+    parser.add_argument('--workload', type=parse_workload, default='mixed', help='набор из WORKLOADS или веса методов')
+    parser.add_argument('--concurrency', type=int, default=32, help='одновременных клиентов в режиме closed')
+    parser.add_argument('--rate', type=float, default=200.0, help='запросов в секунду в режиме open')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность замера для каждого размера таблицы, с')
+    parser.add_argument(
+        '--table-sizes', type=lambda value: [int(size) for size in value.split(',')],
+        default='1000,10000,100000,1000000', help='размеры таблицы заказов через запятую',
+    )
+    parser.add_argument('--storage', choices=('sqlite', 'sharded', 'memory'), default='sqlite', help='хранилище заказов')
+    parser.add_argument('--timeout', type=float, default=30.0, help='таймаут одного запроса, с')
+    parser.add_argument('--log-level', default='WARNING', help='уровень логов сервера')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
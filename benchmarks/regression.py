@@ -0,0 +1,313 @@
+"""
+Проверка производительности на регрессии относительно сохраненного базового замера.
+
+Короткие воспроизводимые нагрузки выполняются в этом же процессе: OrderService и EchoService через
+Server на свободном порту с БД SQLite во временном каталоге, маршруты FastAPI из main.app через
+httpx.ASGITransport и преобразования ListOrders из benchmarks.conversion. Для каждой нагрузки
+измеряются:
+    relative_throughput - операций в секунду, деленное на скорость калибровочной нагрузки на чистом
+                          Python, измеренную в том же запуске (лучший из --repeat повторов): отношение
+                          меньше зависит от скорости и загрузки машины, чем абсолютные значения;
+    alloc_peak_kib      - пиковый объем памяти, выделенной за пакет операций (tracemalloc); размер пакета
+                          фиксирован, поэтому значение воспроизводимо.
+Результаты сравниваются с benchmarks/baseline.json: скрипт завершается с кодом 1, если относительная
+скорость упала больше чем на --throughput-tolerance или память выросла больше чем на --alloc-tolerance
+(и больше чем на ALLOC_SLACK_KIB). Базовый замер обновляется одной командой с --update-baseline и
+коммитится вместе с изменением, которое его сдвинуло.
+
+Та же проверка входит в набор тестов производительности (tests/perf, маркер perf).
+
+Запуск:
+    python -m benchmarks.regression
+    python -m benchmarks.regression --update-baseline
+    python -m benchmarks.regression --only order. --only echo.
+    python -m pytest -m perf tests/perf/test_regression.py
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import grpc
+import httpx
+
+from benchmarks.conversion import steps as conversion_steps
+from benchmarks.order_load import order_uuid, seed_orders
+from benchmarks.workers_scaling import ROOT, auth_metadata, free_port
+from grpc_core.logger import setup_logging
+from grpc_core.protos.echo import echo_pb2, echo_pb2_grpc
+from grpc_core.protos.order import order_pb2, order_pb2_grpc
+from settings import settings
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+# Рост памяти меньше этого порога не считается регрессией: небольшие пакеты шумят сильнее процентов
+ALLOC_SLACK_KIB = 16.0
+# Допустимое падение скорости и рост памяти относительно базового замера, доли
+THROUGHPUT_TOLERANCE = 0.3
+ALLOC_TOLERANCE = 0.25
+REPEAT = 5
+TABLE_SIZE = 1000
+
+
+async def calibration(count: int = 20000) -> int:
+    # Калибровочная нагрузка: словари, строки и json, как в слоях преобразования сервиса
+    for index in range(count):
+        json.loads(json.dumps({'uuid': str(index), 'name': f'order {index}', 'completed': bool(index % 2)}))
+    return count
+
+
+class Workloads:
+    """
+    Нагрузки проверки; каждая возвращает число выполненных операций.
+
+    Атрибуты:
+    ---------
+    channel : grpc.aio.Channel
+        Канал к серверу, запущенному в процессе.
+    http : httpx.AsyncClient
+        Клиент маршрутов FastAPI без сетевого соединения.
+    """
+
+    def __init__(self, channel: grpc.aio.Channel, http: httpx.AsyncClient) -> None:
+        self.channel = channel
+        self.http = http
+        self.orders = order_pb2_grpc.OrderServiceStub(channel)
+        self.echo = echo_pb2_grpc.EchoServiceStub(channel)
+        self.metadata = auth_metadata()
+        self.headers = dict(self.metadata)
+        self.conversion = conversion_steps(100)
+
+    def names(self) -> list[str]:
+        return [name[len('workload_'):].replace('__', '.') for name in dir(self) if name.startswith('workload_')]
+
+    def get(self, name: str):
+        return getattr(self, 'workload_' + name.replace('.', '__'))
+
+    async def workload_conversion__server_list_100(self) -> int:
+        for _ in range(100):
+            for step in ('response.pydantic', 'response.dict', 'response.dict_to_rpc', 'response.serialize'):
+                self.conversion[step]()
+        return 100
+
+    async def workload_conversion__gateway_list_100(self) -> int:
+        for _ in range(100):
+            for step in ('gateway.parse', 'gateway.message_to_dict', 'gateway.pydantic', 'gateway.json'):
+                self.conversion[step]()
+        return 100
+
+    async def workload_order__read(self) -> int:
+        for index in range(200):
+            await self.orders.ReadOrder(order_pb2.ReadOrderRequest(uuid=order_uuid(index)), metadata=self.metadata)
+        return 200
+
+    async def workload_order__create_delete(self) -> int:
+        for _ in range(100):
+            response = await self.orders.CreateOrder(
+                order_pb2.CreateOrderRequest(name='regression', date='2024-01-01'), metadata=self.metadata
+            )
+            await self.orders.DeleteOrder(order_pb2.DeleteOrderRequest(uuid=response.order.uuid), metadata=self.metadata)
+        return 100
+
+    async def workload_order__read_concurrent(self) -> int:
+        async def client(offset: int) -> None:
+            for index in range(offset, TABLE_SIZE, 8):
+                await self.orders.ReadOrder(order_pb2.ReadOrderRequest(uuid=order_uuid(index)), metadata=self.metadata)
+
+        await asyncio.gather(*(client(offset) for offset in range(8)))
+        return TABLE_SIZE
+
+    async def workload_order__list_1000(self) -> int:
+        for _ in range(5):
+            await self.orders.ListOrders(order_pb2.ListOrdersRequest(), metadata=self.metadata)
+        return 5
+
+    async def workload_echo__server_stream(self) -> int:
+        request = echo_pb2.EchoMessage(username='regression', message='echo', replies=2000, interval=0)
+        return len([reply async for reply in self.echo.ServerStream(request, metadata=self.metadata)])
+
+    async def workload_echo__both_stream(self) -> int:
+        request = echo_pb2.EchoMessage(username='regression', message='echo', replies=1, interval=0)
+        call = self.echo.BothStream(iter([request] * 1000), metadata=self.metadata)
+        return len([reply async for reply in call])
+
+    async def workload_http__read_order(self) -> int:
+        for index in range(100):
+            response = await self.http.get(f'/order/{order_uuid(index)}', headers=self.headers)
+            response.raise_for_status()
+        return 100
+
+    async def workload_http__list_orders(self) -> int:
+        for _ in range(5):
+            response = await self.http.get('/order', headers=self.headers)
+            response.raise_for_status()
+        return 5
+
+
+async def throughput(function, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        # Сборка мусора от предыдущих замеров не должна попадать в текущий
+        gc.collect()
+        started = time.perf_counter()
+        operations = await function()
+        best = max(best, operations / (time.perf_counter() - started))
+    return best
+
+
+async def allocation_peak(function) -> float:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        await function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - before) / 1024
+
+
+async def measure(names: list[str] | None, repeat: int) -> dict[str, dict]:
+    # Импорт после настройки: Server читает адрес и трассировку из settings при создании
+    from grpc_core.clients.balancer import close_balancer
+    from grpc_core.servers.manager import Server
+    from main import app
+
+    server = Server()
+    await server.start()
+    await asyncio.to_thread(seed_orders, 'bd.sqlite', 0, TABLE_SIZE)
+    results = {}
+    try:
+        async with grpc.aio.insecure_channel(f'127.0.0.1:{settings.GRPC_PORT}') as channel, httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url='http://regression'
+        ) as http:
+            workloads = Workloads(channel, http)
+            selected = [name for name in workloads.names() if not names or any(name.startswith(n) for n in names)]
+            # Прогрев: соединения, кэши обработчиков и ленивые импорты не должны попадать в замер
+            for name in selected:
+                await workloads.get(name)()
+            for name in selected:
+                function = workloads.get(name)
+                reference = await throughput(calibration, repeat)
+                results[name] = {
+                    'relative_throughput': float(f'{await throughput(function, repeat) / reference:.4g}'),
+                    'alloc_peak_kib': round(await allocation_peak(function), 1),
+                }
+    finally:
+        await close_balancer()
+        await server.stop(grace=0)
+    return results
+
+
+def regressions_of(name: str, result: dict, base: dict, throughput_tolerance: float, alloc_tolerance: float) -> list[str]:
+    """
+    Возвращает описания регрессий нагрузки name: падение скорости или рост памяти сверх допустимых долей.
+    """
+    regressions = []
+    speed = result['relative_throughput'] / base['relative_throughput'] - 1
+    memory = result['alloc_peak_kib'] / max(base['alloc_peak_kib'], 1e-9) - 1
+    if speed < -throughput_tolerance:
+        regressions.append(f'{name}: скорость {speed:+.1%} (допустимо -{throughput_tolerance:.0%})')
+    if memory > alloc_tolerance and result['alloc_peak_kib'] - base['alloc_peak_kib'] > ALLOC_SLACK_KIB:
+        regressions.append(f'{name}: память {memory:+.1%} (допустимо +{alloc_tolerance:.0%})')
+    return regressions
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], args) -> list[str]:
+    """
+    Возвращает описания регрессий: нагрузки, ставшие медленнее или требующие больше памяти, чем в baseline.
+    """
+    regressions = []
+    print(f"{'workload':<34}{'throughput':>12}{'baseline':>12}{'change':>9}{'alloc_kib':>12}{'baseline':>12}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34}{result['relative_throughput']:>12}{'-':>12}{'':>9}{result['alloc_peak_kib']:>12}{'-':>12}")
+            continue
+        speed = result['relative_throughput'] / base['relative_throughput'] - 1
+        memory = result['alloc_peak_kib'] / max(base['alloc_peak_kib'], 1e-9) - 1
+        print(
+            f"{name:<34}{result['relative_throughput']:>12}{base['relative_throughput']:>12}{speed:>+9.1%}"
+            f"{result['alloc_peak_kib']:>12}{base['alloc_peak_kib']:>12}{memory:>+9.1%}"
+        )
+        regressions += regressions_of(name, result, base, args.throughput_tolerance, args.alloc_tolerance)
+    return regressions
+
+
+def load_baseline(path: str = BASELINE) -> dict[str, dict]:
+    with open(path) as file:
+        return json.load(file)['workloads']
+
+
+def configure() -> None:
+    """
+    Настраивает сервер для замеров в процессе: свободный порт, без экспорта трассировки и мониторинга цикла.
+    """
+    settings.GRPC_HOST_LOCAL = '127.0.0.1'
+    settings.GRPC_PORT = free_port()
+    settings.TRACING_EXPORTER = 'none'
+    settings.LOG_LEVEL = 'WARNING'
+    settings.LOOP_MONITOR_ENABLED = False
+    setup_logging()
+    # .dict() моделей pydantic v2 устарел, но используется в коде сервиса
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+
+def run(names: list[str] | None, repeat: int) -> dict[str, dict]:
+    """
+    Выполняет замеры нагрузок с префиксами names (все, если None) на БД во временном каталоге.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # БД bd.sqlite открывается относительно текущего каталога
+        os.chdir(workdir)
+        try:
+            return asyncio.run(measure(names, repeat))
+        finally:
+            os.chdir(cwd)
+
+
+def main(args) -> int:
+    configure()
+    results = run(args.only, args.repeat)
+
+    if args.update_baseline:
+        baseline = {}
+        if args.only and os.path.exists(args.baseline):
+            baseline = load_baseline(args.baseline)
+        report = {
+            'environment': {'python': platform.python_version(), 'grpc': grpc.__version__, 'platform': platform.platform()},
+            'workloads': {**baseline, **results},
+        }
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Базовый замер сохранен в {args.baseline}: {len(results)} нагрузок')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'Нет базового замера {args.baseline}: создайте его с --update-baseline', file=sys.stderr)
+        return 1
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args)
+    for regression in regressions:
+        print(f'РЕГРЕССИЯ {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=BASELINE, help='файл базового замера')
+    parser.add_argument('--update-baseline', action='store_true', help='перезаписать базовый замер результатами запуска')
+    parser.add_argument('--only', action='append', help='префикс имени нагрузки (можно указать несколько раз)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='повторов замера скорости, берется лучший')
+    parser.add_argument(
+        '--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE, help='допустимое падение скорости, доля'
+    )
+    parser.add_argument('--alloc-tolerance', type=float, default=ALLOC_TOLERANCE, help='допустимый рост памяти, доля')
+    sys.exit(main(parser.parse_args()))
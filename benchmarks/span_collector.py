@@ -0,0 +1,59 @@
+"""
+Локальный заменитель коллектора Jaeger для проверки экспорта спанов без настоящего Jaeger.
+
+Принимает PostSpans по протоколу коллектора Jaeger (тот же, что использует JaegerExporter), считает
+полученные пакеты и спаны и может отвечать с задержкой, имитируя медленный коллектор.
+
+Запуск:
+    python -m benchmarks.span_collector --port 14250 --delay 2
+"""
+import argparse
+import asyncio
+
+import grpc
+from loguru import logger
+from opentelemetry.exporter.jaeger.proto.grpc.gen import collector_pb2, collector_pb2_grpc
+
+
+class StandInCollector(collector_pb2_grpc.CollectorServiceServicer):
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.batches = 0
+        self.spans = 0
+
+    async def PostSpans(self, request, context):
+        await asyncio.sleep(self.delay)
+        self.batches += 1
+        self.spans += len(request.batch.spans)
+        return collector_pb2.PostSpansResponse()
+
+
+async def start_collector(port: int = 0, delay: float = 0.0):
+    collector = StandInCollector(delay)
+    server = grpc.aio.server()
+    collector_pb2_grpc.add_CollectorServiceServicer_to_server(collector, server)
+    port = server.add_insecure_port(f'127.0.0.1:{port}')
+    await server.start()
+    return server, collector, port
+
+
+async def main(args) -> None:
+    server, collector, port = await start_collector(args.port, args.delay)
+    logger.info(f'Коллектор слушает 127.0.0.1:{port}, задержка ответа {args.delay} с')
+    try:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            logger.info(f'Получено пакетов: {collector.batches}, спанов: {collector.spans}')
+    finally:
+        await server.stop(grace=None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=14250)
+    parser.add_argument('--delay', type=float, default=0.0, help='задержка ответа на пакет спанов, с')
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
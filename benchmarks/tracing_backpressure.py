@@ -0,0 +1,147 @@
+"""
+Проверка того, что экспорт спанов не блокирует обработку запросов.
+
+Метод с декоратором traced вызывается с постоянной частотой --rate в течение --duration секунд при разных
+состояниях экспорта: экспорт отключен, быстрый коллектор, медленный коллектор (benchmarks.span_collector
+с задержкой ответа) и недоступный коллектор. Для каждого сценария выводятся перцентили времени вызова
+и метрики конвейера: экспортировано, ошибки экспорта, отброшено из-за переполнения очереди и в очереди.
+Если экспорт не влияет на горячий путь, время вызова во всех сценариях одинаково, а при медленном
+или недоступном коллекторе растет только число отброшенных спанов.
+
+Запуск:
+    python -m benchmarks.tracing_backpressure --rate 1000 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Имя сценария, экспортер и задержка ответа коллектора (None - коллектор не запускается)
+SCENARIOS = [
+    ('export disabled', 'none', None),
+    ('fast collector', 'jaeger', 0.0),
+    ('slow collector', 'jaeger', 2.0),
+    ('missing collector', 'jaeger', None),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run_load(exporter: str, port: int, args_dict: dict) -> dict:
+    from grpc_core.protos.order import order_pb2
+    from grpc_core.servers import tracing
+    from grpc_core.servers.tracing import setup_tracing, traced
+    from settings import settings
+
+    settings.TRACING_EXPORTER = exporter
+    settings.JAEGER_HOST = '127.0.0.1'
+    settings.JAEGER_PORT = port
+    settings.TRACING_SAMPLE_RATIO = 1.0
+    settings.TRACING_MAX_QUEUE_SIZE = args_dict['queue_size']
+    settings.TRACING_MAX_EXPORT_BATCH_SIZE = args_dict['batch_size']
+    settings.TRACING_SCHEDULE_DELAY_MILLIS = args_dict['schedule_delay_ms']
+    settings.TRACING_EXPORT_TIMEOUT_MILLIS = 1000
+    setup_tracing(service_name='Backpressure')
+
+    class Service:
+        response = order_pb2.Order(uuid='backpressure', name='order', date='2024-01-01')
+
+        @traced()
+        async def Call(self, request, context):
+            return self.response
+
+    service = Service()
+    latencies = []
+
+    async def load() -> None:
+        interval = 1 / args_dict['rate']
+        deadline = time.monotonic() + args_dict['duration']
+        next_call = time.monotonic()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            await service.Call(None, None)
+            latencies.append(time.perf_counter() - started)
+            next_call += interval
+            await asyncio.sleep(max(0.0, next_call - time.monotonic()))
+
+    asyncio.run(load())
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1e6, 1)
+
+    result = {
+        'calls': len(latencies),
+        'p50_us': percentile(0.50),
+        'p99_us': percentile(0.99),
+        'max_us': round(latencies[-1] * 1e6, 1),
+        'exported': int(tracing.SPANS_EXPORTED.value(result='success')),
+        'failed': int(tracing.SPANS_EXPORTED.value(result='failure')),
+        'dropped': int(tracing.SPANS_DROPPED.value()),
+        'queued': int(tracing.SPANS_QUEUED.value()),
+    }
+    return result
+
+
+def measure(name: str, exporter: str, delay, args) -> dict:
+    port = free_port()
+    collector = None
+    if delay is not None:
+        collector = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.span_collector', '--port', str(port), '--delay', str(delay)],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        wait_port(port)
+    try:
+        with get_context('spawn').Pool(1) as pool:
+            result = pool.apply(run_load, (exporter, port, vars(args)))
+    finally:
+        if collector is not None:
+            collector.terminate()
+            collector.wait()
+    return {'scenario': name, **result}
+
+
+def main(args) -> None:
+    results = [measure(name, exporter, delay, args) for name, exporter, delay in SCENARIOS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = ['calls', 'p50_us', 'p99_us', 'max_us', 'exported', 'failed', 'dropped', 'queued']
+    print(f"{'scenario':<20}" + ''.join(f'{column:>10}' for column in columns))
+    for result in results:
+        print(f"{result['scenario']:<20}" + ''.join(f'{result[column]:>10}' for column in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=1000, help='вызовов в секунду')
+    parser.add_argument('--duration', type=float, default=5.0, help='длительность сценария, с')
+    parser.add_argument('--queue-size', type=int, default=2048)
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--schedule-delay-ms', type=int, default=200)
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
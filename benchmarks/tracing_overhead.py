@@ -0,0 +1,122 @@
+"""
+Бенчмарк накладных расходов трассировки на один вызов метода gRPC сервиса.
+
+Метод, возвращающий ListOrdersResponse с --orders заказами, вызывается напрямую (без сети) без декоратора,
+с декоратором traced без SDK трассировки и с SDK при разных долях сэмплирования и политиках записи ответа.
+Спаны проходят через ErrorSpanProcessor и BatchSpanProcessor в экспортер, который их отбрасывает, поэтому
+в замер входит и фоновая работа процессора (время force_flush включается в результат).
+Каждая конфигурация выполняется в отдельном процессе, так как провайдер трассировки устанавливается один раз.
+
+Запуск:
+    python -m benchmarks.tracing_overhead --orders 100 --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+from multiprocessing import get_context
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from grpc_core.protos.order import order_pb2
+from grpc_core.servers.tracing import ErrorSpanProcessor, create_sampler, traced
+from settings import settings
+
+# Имя конфигурации, доля сэмплирования (None - без SDK) и политика записи ответа
+CONFIGS = [
+    ('baseline', None, None),
+    ('traced, no sdk', None, None),
+    ('ratio 0', 0.0, 'full'),
+    ('ratio 0.1, truncated', 0.1, 'truncated'),
+    ('ratio 1, off', 1.0, 'off'),
+    ('ratio 1, truncated', 1.0, 'truncated'),
+    ('ratio 1, full', 1.0, 'full'),
+]
+
+
+class DiscardingExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.exported = 0
+
+    def export(self, spans) -> SpanExportResult:
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BenchService:
+    def __init__(self, orders: int) -> None:
+        self.response = order_pb2.ListOrdersResponse(orders=[
+            order_pb2.Order(uuid=f'{i:032d}', name=f'order {i}', completed=i % 2 == 0, date='2024-01-01T00:00:00Z')
+            for i in range(orders)
+        ])
+
+    async def ListOrdersPlain(self, request, context):
+        return self.response
+
+    @traced()
+    async def ListOrders(self, request, context):
+        return self.response
+
+
+def run_config(name: str, ratio, payload, orders: int, iterations: int) -> dict:
+    exporter = None
+    provider = None
+    if ratio is not None:
+        exporter = DiscardingExporter()
+        provider = TracerProvider(sampler=create_sampler(ratio))
+        provider.add_span_processor(ErrorSpanProcessor(BatchSpanProcessor(exporter)))
+        trace.set_tracer_provider(provider)
+        settings.TRACING_PAYLOAD_CAPTURE = payload
+        settings.TRACING_PAYLOAD_CAPTURE_METHODS = {}
+
+    service = BenchService(orders)
+    method = service.ListOrdersPlain if name == 'baseline' else service.ListOrders
+    request = order_pb2.ListOrdersRequest()
+
+    async def loop() -> None:
+        for _ in range(iterations):
+            await method(request, None)
+
+    started = time.perf_counter()
+    asyncio.run(loop())
+    if provider is not None:
+        provider.force_flush()
+    elapsed = time.perf_counter() - started
+    if provider is not None:
+        provider.shutdown()
+    return {
+        'config': name,
+        'us_per_call': round(elapsed / iterations * 1e6, 2),
+        'exported_spans': exporter.exported if exporter else 0,
+    }
+
+
+def main(args) -> None:
+    context = get_context('spawn')
+    results = []
+    for name, ratio, payload in CONFIGS:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(run_config, (name, ratio, payload, args.orders, args.iterations)))
+    base = results[0]['us_per_call']
+    for result in results:
+        result['overhead_us'] = round(result['us_per_call'] - base, 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'config':<24}{'us/call':>10}{'overhead':>10}{'exported':>10}")
+    for result in results:
+        print(f"{result['config']:<24}{result['us_per_call']:>10}{result['overhead_us']:>10}{result['exported_spans']:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=100, help='число заказов в ответе')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
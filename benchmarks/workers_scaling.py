@@ -0,0 +1,153 @@
+"""
+Бенчмарк масштабирования gRPC сервера по числу рабочих процессов.
+
+Для каждого числа процессов от 1 до --max-workers запускает python -m grpc_core.servers во временном каталоге
+(с отдельной БД SQLite), создает заказ и в течение --duration секунд читает его через ReadOrder из нескольких
+клиентских процессов. Ядро распределяет между процессами сервера соединения, поэтому каждый клиент открывает
+несколько каналов с собственным пулом подключений (grpc.use_local_subchannel_pool), иначе все каналы процесса
+использовали бы одно соединение и попадали бы в один процесс сервера.
+
+Запуск:
+    python -m benchmarks.workers_scaling --max-workers 4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import grpc
+import jwt
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+
+from grpc_core.protos.order import order_pb2, order_pb2_grpc
+from settings import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def auth_metadata() -> tuple:
+    return (('rpc-auth', jwt.encode({'sub': 'benchmark'}, settings.SECRET_KEY, algorithm='HS256')),)
+
+
+async def wait_ready(target: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with grpc.aio.insecure_channel(target) as channel:
+        stub = health_pb2_grpc.HealthStub(channel)
+        while True:
+            try:
+                await stub.Check(health_pb2.HealthCheckRequest(), timeout=1)
+                return
+            except grpc.aio.AioRpcError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def create_order(target: str) -> str:
+    async with grpc.aio.insecure_channel(target) as channel:
+        stub = order_pb2_grpc.OrderServiceStub(channel)
+        response = await stub.CreateOrder(
+            order_pb2.CreateOrderRequest(name='benchmark', date='2024-01-01'), metadata=auth_metadata()
+        )
+        return response.order.uuid
+
+
+async def client_load(target: str, uuid: str, channels: int, concurrency: int, duration: float) -> tuple[int, int]:
+    opened = [grpc.aio.insecure_channel(target, options=[('grpc.use_local_subchannel_pool', 1)]) for _ in range(channels)]
+    stubs = [order_pb2_grpc.OrderServiceStub(channel) for channel in opened]
+    request = order_pb2.ReadOrderRequest(uuid=uuid)
+    metadata = auth_metadata()
+    deadline = time.monotonic() + duration
+    completed = errors = 0
+
+    async def loop(stub) -> None:
+        nonlocal completed, errors
+        while time.monotonic() < deadline:
+            try:
+                await stub.ReadOrder(request, metadata=metadata, timeout=5)
+                completed += 1
+            except grpc.aio.AioRpcError:
+                errors += 1
+
+    await asyncio.gather(*(loop(stubs[i % channels]) for i in range(concurrency)))
+    for channel in opened:
+        await channel.close()
+    return completed, errors
+
+
+def run_client(args: tuple) -> tuple[int, int]:
+    return asyncio.run(client_load(*args))
+
+
+def measure(workers: int, args) -> dict:
+    port = free_port()
+    target = f'127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {**os.environ, 'GRPC_PORT': str(port), 'PYTHONPATH': ROOT}
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'grpc_core.servers', '--workers', str(workers)],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_ready(target))
+            # Health отвечает первый поднявшийся процесс; даем подняться остальным
+            time.sleep(1 + 0.2 * workers)
+            uuid = asyncio.run(create_order(target))
+            with ProcessPoolExecutor(args.clients, mp_context=get_context('spawn')) as pool:
+                started = time.monotonic()
+                results = list(pool.map(
+                    run_client,
+                    [(target, uuid, args.channels, args.concurrency, args.duration)] * args.clients,
+                ))
+                elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            server.wait()
+    completed = sum(result[0] for result in results)
+    return {
+        'workers': workers,
+        'requests': completed,
+        'errors': sum(result[1] for result in results),
+        'rps': round(completed / elapsed, 1),
+    }
+
+
+def main(args) -> None:
+    results = [measure(workers, args) for workers in range(1, args.max_workers + 1)]
+    base = results[0]['rps'] or 1
+    for result in results:
+        result['speedup'] = round(result['rps'] / base, 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'workers':>8}{'requests':>10}{'errors':>8}{'rps':>10}{'speedup':>9}")
+    for result in results:
+        print(
+            f"{result['workers']:>8}{result['requests']:>10}{result['errors']:>8}"
+            f"{result['rps']:>10}{result['speedup']:>9}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--clients', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='клиентские процессы')
+    parser.add_argument('--channels', type=int, default=8, help='каналов (соединений) на клиентский процесс')
+    parser.add_argument('--concurrency', type=int, default=32, help='одновременных запросов на клиентский процесс')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность замера, с')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""
+Запись вызовов gRPC для воспроизведения нагрузки (см. CaptureInterceptor и grpc_core.clients.replay).
+
+Файл записи - последовательность сообщений capture.CapturedCall, перед каждым его длина в формате varint
+(как в writeDelimitedTo protobuf). Такой файл можно дописывать и читать потоком, не загружая целиком, а
+запись, оборванная остановкой процесса, отбрасывается при чтении.
+
+Сообщения сериализуются и пишутся отдельным потоком: обработчик запроса только кладет запись в очередь.
+При переполнении очереди (диск не успевает) записи отбрасываются и учитываются в grpc_capture_dropped_total,
+а не задерживают запросы.
+"""
+import os
+import queue
+import threading
+import typing as t
+
+from loguru import logger
+
+from grpc_core import metrics
+from grpc_core.protos.capture.capture_pb2 import CapturedCall
+
+CAPTURED = metrics.counter('grpc_capture_calls_total', 'Вызовы, записанные в файл записи')
+DROPPED = metrics.counter('grpc_capture_dropped_total', 'Вызовы, не записанные из-за переполнения очереди записи')
+
+
+def _encode_varint(value: int) -> bytes:
+    data = bytearray()
+    while value > 0x7F:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def _read_varint(file: t.BinaryIO) -> t.Optional[int]:
+    # None - конец файла (в том числе посреди varint оборванной записи)
+    value = shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            return None
+        value |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+
+class CaptureWriter:
+    """
+    Дописывает записанные вызовы в файл из фонового потока.
+
+    Атрибуты:
+    ---------
+    path : str
+        Путь к файлу записи. Подстрока {pid} заменяется номером процесса, чтобы процессы
+        python -m grpc_core.servers с GRPC_WORKERS > 1 писали в разные файлы.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000) -> None:
+        self.path = path.format(pid=os.getpid())
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._file = open(self.path, 'ab')
+        self._thread = threading.Thread(target=self._run, name='grpc-capture', daemon=True)
+        self._thread.start()
+        logger.info('Запись вызовов gRPC в {}', self.path)
+
+    def write(self, call: CapturedCall) -> None:
+        try:
+            self._queue.put_nowait(call)
+        except queue.Full:
+            DROPPED.inc()
+
+    def close(self) -> None:
+        """ Дописывает записи из очереди и закрывает файл. """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                call = self._queue.get()
+                if call is None:
+                    break
+                data = call.SerializeToString()
+                self._file.write(_encode_varint(len(data)) + data)
+                CAPTURED.inc()
+                # Буфер сбрасывается, когда очередь опустела: файл можно читать во время записи
+                if self._queue.empty():
+                    self._file.flush()
+        finally:
+            self._file.close()
+
+
+def read_capture(path: str) -> t.Iterator[CapturedCall]:
+    """
+    Читает записанные вызовы из файла по порядку; оборванная последняя запись пропускается.
+    """
+    with open(path, 'rb') as file:
+        while True:
+            size = _read_varint(file)
+            if size is None:
+                return
+            data = file.read(size)
+            if len(data) < size:
+                logger.warning('Файл записи {} оборван: последняя запись пропущена', path)
+                return
+            yield CapturedCall.FromString(data)
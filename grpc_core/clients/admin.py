@@ -0,0 +1,77 @@
+"""
+Командный клиент AdminService для диагностики работающего gRPC сервера.
+
+Запуск:
+    python -m grpc_core.clients.admin profile --duration 10 --profiler sampling > profile.folded
+    python -m grpc_core.clients.admin profile --duration 10 --sort tottime
+    python -m grpc_core.clients.admin tracemalloc --duration 30 --group-by traceback
+    python -m grpc_core.clients.admin tasks
+
+Токен берется из --token или подписывается SECRET_KEY из настроек.
+"""
+import argparse
+import asyncio
+import sys
+
+import grpc
+import jwt
+
+from grpc_core.protos.admin import admin_pb2, admin_pb2_grpc
+from settings import settings
+
+
+async def main(args) -> None:
+    token = args.token or jwt.encode({'sub': 'admin'}, settings.SECRET_KEY, algorithm='HS256')
+    metadata = [('rpc-auth', token)]
+    async with grpc.aio.insecure_channel(args.target) as channel:
+        stub = admin_pb2_grpc.AdminServiceStub(channel)
+        if args.command == 'profile':
+            request = admin_pb2.ProfileRequest(
+                duration=args.duration,
+                profiler=admin_pb2.Profiler.Value(args.profiler.upper()),
+                sort=args.sort,
+                limit=args.limit,
+                interval_ms=args.interval_ms,
+            )
+            async for chunk in stub.Profile(request, metadata=metadata):
+                sys.stdout.write(chunk.data)
+            sys.stdout.write('\n')
+        elif args.command == 'tracemalloc':
+            request = admin_pb2.TraceMallocRequest(duration=args.duration, group_by=args.group_by, limit=args.limit)
+            response = await stub.TraceMalloc(request, metadata=metadata)
+            print(f'traced current={response.traced_current} peak={response.traced_peak}')
+            for allocation in response.allocations:
+                print(f'{allocation.size:>12} B {allocation.count:>8} blocks  {allocation.location}')
+        else:
+            response = await stub.TaskStacks(admin_pb2.TaskStacksRequest(limit=args.limit), metadata=metadata)
+            for task in response.tasks:
+                print(f'--- {task.name} ({task.coroutine})\n{task.stack}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.clients.admin', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--target', default=f'127.0.0.1:{settings.GRPC_PORT}', help='адрес сервера host:port')
+    parser.add_argument('--token', help='JWT токен для заголовка rpc-auth')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    profile = commands.add_parser('profile', help='профилирование цикла событий')
+    profile.add_argument('--duration', type=float, default=10.0)
+    profile.add_argument('--profiler', choices=('cprofile', 'sampling'), default='cprofile')
+    profile.add_argument('--sort', default='', help='сортировка pstats (cumulative, tottime, ...)')
+    profile.add_argument('--limit', type=int, default=0, help='число строк pstats')
+    profile.add_argument('--interval-ms', type=float, default=0.0, help='интервал выборки sampling, мс')
+
+    malloc = commands.add_parser('tracemalloc', help='источники выделений памяти')
+    malloc.add_argument('--duration', type=float, default=10.0)
+    malloc.add_argument('--group-by', choices=('lineno', 'filename', 'traceback'), default='lineno')
+    malloc.add_argument('--limit', type=int, default=0)
+
+    tasks = commands.add_parser('tasks', help='стеки задач asyncio')
+    tasks.add_argument('--limit', type=int, default=0, help='число кадров стека задачи')
+
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except grpc.aio.AioRpcError as e:
+        sys.exit(f'{e.code().name}: {e.details()}')
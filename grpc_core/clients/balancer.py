@@ -0,0 +1,464 @@
+import asyncio
+import itertools
+import time
+import typing as t
+from functools import partial
+
+import grpc
+from grpc.aio import ClientCallDetails
+from grpc_health.v1 import health_pb2
+from grpc_health.v1 import health_pb2_grpc
+from loguru import logger
+
+from grpc_core.clients.channel import SERVICE_CONFIG, channel_options, hedging_interceptor
+from grpc_core.health import registry
+from grpc_core.metrics import RpcMethodMetrics, RpcMetrics
+from settings import settings
+
+CLIENT_METRICS = RpcMetrics('client')
+
+# Коды ответов, которые говорят о проблеме бэкенда, а не о прикладной ошибке запроса
+OUTLIER_STATUS_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+})
+# Сколько ответов метода нужно бэкенду, прежде чем его задержка сравнивается с другими
+LATENCY_MIN_SAMPLES = 5
+
+
+class Backend:
+    """
+    Отдельный экземпляр OrderService с собственным долгоживущим каналом.
+
+    Атрибуты:
+    ---------
+    address : str
+        Адрес бэкенда в формате 'host:port'.
+    channel : grpc.aio.Channel
+        Канал к бэкенду с политиками повторов из service config.
+    healthy : bool
+        Последний статус, полученный через Health.Watch.
+    outstanding : int
+        Число выполняющихся в данный момент запросов.
+    consecutive_failures : int
+        Число ошибок подряд, используется для outlier detection.
+    latency : dict[str, float]
+        Экспоненциально сглаженная задержка успешных ответов по методам, с.
+    samples : dict[str, int]
+        Число успешных ответов по методам, учтенных в latency.
+    ejected_until : float
+        Момент (time.monotonic), до которого бэкенд исключен из ротации.
+    ejections : int
+        Сколько раз бэкенд исключался; время исключения растет пропорционально.
+    """
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.channel = grpc.aio.insecure_channel(address, options=channel_options(SERVICE_CONFIG))
+        self.healthy = True
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.latency: dict[str, float] = {}
+        self.samples: dict[str, int] = {}
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self._multicallables: dict[str, t.Union[grpc.aio.UnaryUnaryMultiCallable, grpc.aio.UnaryStreamMultiCallable]] = {}
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+    def multicallable(self, method: str, request_serializer, response_deserializer, streaming: bool = False):
+        if (multicallable := self._multicallables.get(method)) is None:
+            factory = self.channel.unary_stream if streaming else self.channel.unary_unary
+            multicallable = factory(
+                method,
+                request_serializer=request_serializer,
+                response_deserializer=response_deserializer,
+            )
+            self._multicallables[method] = multicallable
+        return multicallable
+
+
+class LoadBalancer:
+    """
+    Клиентская балансировка запросов между несколькими бэкендами OrderService.
+
+    Поддерживает политики round_robin и least_request (бэкенд с наименьшим числом выполняющихся запросов).
+    Для каждого бэкенда открыта подписка Health.Watch: бэкенды в статусе, отличном от SERVING, не получают
+    запросов. Outlier detection исключает из ротации бэкенды, вернувшие несколько ошибок подряд или
+    отвечающие медленнее остальных, но не больше GRPC_OUTLIER_MAX_EJECTION_PERCENT от общего числа.
+    Задержка сравнивается по каждому методу отдельно: у разных методов разное обычное время ответа,
+    и медленный по своей природе метод не должен исключать бэкенд.
+    Если задан health_component, наличие хотя бы одного здорового бэкенда сообщается в реестр
+    grpc_core.health как состояние этого компонента.
+    """
+
+    def __init__(
+        self, addresses: t.Sequence[str], policy: str = 'round_robin', health_component: t.Optional[str] = None
+    ) -> None:
+        if policy not in ('round_robin', 'least_request'):
+            raise ValueError(f'Неизвестная политика балансировки: {policy}')
+        self.backends = [Backend(address) for address in addresses]
+        self.policy = policy
+        self.health_component = health_component
+        self._loop = asyncio.get_running_loop()
+        self._counter = itertools.count()
+        self._watchers = [asyncio.create_task(self._watch_health(backend)) for backend in self.backends]
+
+    def channel(self, interceptors: t.Sequence[grpc.aio.UnaryUnaryClientInterceptor] = ()) -> 'BalancedChannel':
+        """
+        Возвращает канал для создания клиентских заглушек поверх балансировщика.
+
+        Интерцепторы выполняются до выбора бэкенда, поэтому каждая хеджированная попытка
+        может уйти на другой бэкенд.
+        """
+        return BalancedChannel(self, [*interceptors, hedging_interceptor])
+
+    def pick(self) -> Backend:
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend.available(now)]
+        if not candidates:
+            # Все бэкенды исключены: лучше попробовать здоровый бэкенд, чем сразу вернуть ошибку
+            candidates = [backend for backend in self.backends if backend.healthy]
+        if not candidates:
+            # Здоровых бэкендов нет: отправляем запрос на любой, чтобы клиент получил реальную ошибку gRPC
+            candidates = self.backends
+        if self.policy == 'least_request':
+            return min(candidates, key=lambda backend: backend.outstanding)
+        return candidates[next(self._counter) % len(candidates)]
+
+    async def unary_unary(self, method: str, request_serializer, response_deserializer, details, request):
+        backend = self.pick()
+        multicallable = backend.multicallable(method, request_serializer, response_deserializer)
+        backend.outstanding += 1
+        started = time.monotonic()
+        try:
+            call = multicallable(
+                request,
+                timeout=details.timeout,
+                metadata=details.metadata,
+                credentials=details.credentials,
+                wait_for_ready=details.wait_for_ready,
+            )
+            await call
+        except grpc.aio.AioRpcError as e:
+            if e.code() in OUTLIER_STATUS_CODES:
+                self._on_failure(backend)
+            raise
+        else:
+            self._on_success(backend, method, time.monotonic() - started)
+            # Завершенный вызов бэкенда: из него доступны ответ, код и метаданные
+            return call
+        finally:
+            backend.outstanding -= 1
+
+    async def unary_stream(self, method: str, request_serializer, response_deserializer, details, request):
+        # Время стрима зависит от числа ответов, а не от бэкенда, поэтому в оценку задержки не входит
+        backend = self.pick()
+        multicallable = backend.multicallable(method, request_serializer, response_deserializer, streaming=True)
+        backend.outstanding += 1
+        try:
+            call = multicallable(
+                request,
+                timeout=details.timeout,
+                metadata=details.metadata,
+                credentials=details.credentials,
+                wait_for_ready=details.wait_for_ready,
+            )
+            async for response in call:
+                yield response
+        except grpc.aio.AioRpcError as e:
+            if e.code() in OUTLIER_STATUS_CODES:
+                self._on_failure(backend)
+            raise
+        else:
+            backend.consecutive_failures = 0
+        finally:
+            backend.outstanding -= 1
+
+    def _on_success(self, backend: Backend, method: str, latency: float) -> None:
+        backend.consecutive_failures = 0
+        if method in settings.GRPC_OUTLIER_LATENCY_EXCLUDED_METHODS:
+            return
+        previous = backend.latency.get(method)
+        backend.latency[method] = latency if previous is None else 0.8 * previous + 0.2 * latency
+        backend.samples[method] = backend.samples.get(method, 0) + 1
+        current = backend.latency[method]
+        if backend.samples[method] < LATENCY_MIN_SAMPLES or current <= settings.GRPC_OUTLIER_LATENCY_THRESHOLD:
+            return
+        # Без ответов того же метода от других бэкендов не с чем сравнить: метод может быть медленным везде
+        baseline = min((
+            other.latency[method] for other in self.backends
+            if other is not backend and other.samples.get(method, 0) >= LATENCY_MIN_SAMPLES
+        ), default=None)
+        if baseline is not None and current > baseline * settings.GRPC_OUTLIER_LATENCY_RATIO:
+            self._eject(backend, f'задержка {method} {current:.3f} с при {baseline:.3f} с на других бэкендах')
+
+    def _on_failure(self, backend: Backend) -> None:
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= settings.GRPC_OUTLIER_CONSECUTIVE_FAILURES:
+            self._eject(backend, f'{backend.consecutive_failures} ошибок подряд')
+
+    def _eject(self, backend: Backend, reason: str) -> None:
+        now = time.monotonic()
+        if backend.ejected_until > now:
+            return
+        ejected = sum(1 for other in self.backends if other.ejected_until > now)
+        if (ejected + 1) * 100 > settings.GRPC_OUTLIER_MAX_EJECTION_PERCENT * len(self.backends):
+            return
+        backend.ejections += 1
+        backend.ejected_until = now + settings.GRPC_OUTLIER_EJECTION_TIME * backend.ejections
+        # После возвращения в ротацию бэкенд оценивается заново
+        backend.consecutive_failures = 0
+        backend.latency.clear()
+        backend.samples.clear()
+        logger.warning('Бэкенд {} исключен из ротации: {}', backend.address, reason)
+
+    async def _watch_health(self, backend: Backend) -> None:
+        stub = health_pb2_grpc.HealthStub(backend.channel)
+        request = health_pb2.HealthCheckRequest(service=settings.GRPC_HEALTH_CHECK_SERVICE)
+        while True:
+            try:
+                async for response in stub.Watch(request):
+                    healthy = response.status == health_pb2.HealthCheckResponse.SERVING
+                    if healthy != backend.healthy:
+                        logger.info('Бэкенд {}: статус {}', backend.address, response.status)
+                    self._set_healthy(backend, healthy)
+            except grpc.aio.AioRpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    # Бэкенд без сервиса Health считаем здоровым, полагаясь на outlier detection
+                    self._set_healthy(backend, True)
+                    return
+                self._set_healthy(backend, False)
+            await asyncio.sleep(settings.GRPC_HEALTH_CHECK_RETRY_INTERVAL)
+
+    def _set_healthy(self, backend: Backend, healthy: bool) -> None:
+        backend.healthy = healthy
+        if self.health_component is not None:
+            registry.set_component(self.health_component, any(backend.healthy for backend in self.backends))
+
+    async def close(self) -> None:
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        await asyncio.gather(*(backend.channel.close() for backend in self.backends))
+
+
+class BalancedChannel:
+    """
+    Канал, совместимый с генерируемыми клиентскими заглушками для unary-unary и unary-stream методов.
+
+    Каждый вызов проходит цепочку интерцепторов, а затем отправляется на бэкенд, выбранный LoadBalancer.
+    Как и у grpc.aio.Channel, вызов метода и продолжение цепочки для интерцептора возвращают объект вызова
+    (grpc.aio.UnaryUnaryCall) с кодом, метаданными и отменой.
+    Вызовы записываются в клиентские метрики CLIENT_METRICS: код ответа, выполняющиеся вызовы, время
+    вызова целиком (с повторами и хеджированием) и размеры сериализованных сообщений каждой попытки.
+    Серверный стрим проходит только интерцепторы grpc.aio.UnaryStreamClientInterceptor и не хеджируется:
+    повторная попытка продублировала бы уже полученные ответы.
+    """
+
+    def __init__(self, balancer: LoadBalancer, interceptors: t.Sequence[grpc.aio.UnaryUnaryClientInterceptor]) -> None:
+        self._balancer = balancer
+        self._interceptors = interceptors
+
+    def unary_unary(self, method: str, request_serializer=None, response_deserializer=None, **kwargs):
+        metrics = CLIENT_METRICS.method(method)
+        return _BalancedUnaryUnaryMultiCallable(
+            self,
+            method,
+            metrics.measured(request_serializer, metrics.request_bytes, True),
+            metrics.measured(response_deserializer, metrics.response_bytes, False),
+            metrics,
+        )
+
+    def unary_stream(self, method: str, request_serializer=None, response_deserializer=None, **kwargs):
+        metrics = CLIENT_METRICS.method(method)
+        return _BalancedUnaryStreamMultiCallable(
+            self,
+            method,
+            metrics.measured(request_serializer, metrics.request_bytes, True),
+            metrics.measured(response_deserializer, metrics.response_bytes, False),
+            metrics,
+        )
+
+
+class _BalancedUnaryUnaryMultiCallable:
+    def __init__(
+        self, channel: BalancedChannel, method: str, request_serializer, response_deserializer, metrics: RpcMethodMetrics
+    ) -> None:
+        self._channel = channel
+        self._method = method
+        self._request_serializer = request_serializer
+        self._response_deserializer = response_deserializer
+        self._metrics = metrics
+
+    def __call__(self, request, *, timeout=None, metadata=None, credentials=None, wait_for_ready=None, **kwargs):
+        details = ClientCallDetails(self._method, timeout, metadata, credentials, wait_for_ready)
+        return _BalancedUnaryUnaryCall(partial(self._intercept, 0, details, request), timeout, self._metrics)
+
+    async def _intercept(self, index: int, details, request):
+        interceptors = self._channel._interceptors
+        if index == len(interceptors):
+            return await self._channel._balancer.unary_unary(
+                self._method, self._request_serializer, self._response_deserializer, details, request
+            )
+        return await interceptors[index].intercept_unary_unary(self._continuation(index + 1), details, request)
+
+    def _continuation(self, index: int):
+        async def continuation(details, request) -> _BalancedUnaryUnaryCall:
+            return _BalancedUnaryUnaryCall(partial(self._intercept, index, details, request), details.timeout)
+
+        return continuation
+
+
+class _BalancedUnaryUnaryCall(grpc.aio.UnaryUnaryCall):
+    """
+    Вызов BalancedChannel: оставшаяся часть цепочки интерцепторов (invocation) выполняется в отдельной задаче.
+
+    Звено цепочки может вернуть как сам ответ, так и объект вызова (вызов бэкенда или следующего звена):
+    тогда метаданные берутся из него. Код и описание ответа определяются по результату задачи. Если передан
+    metrics, вызов записывается в клиентские метрики (вызов метода канала, а не отдельное звено цепочки).
+    """
+
+    def __init__(
+        self,
+        invocation: t.Callable[[], t.Awaitable],
+        timeout: t.Optional[float],
+        metrics: t.Optional[RpcMethodMetrics] = None,
+    ) -> None:
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        self._metrics = metrics
+        self._call: t.Optional[grpc.aio.Call] = None
+        self._task = asyncio.ensure_future(self._run(invocation))
+
+    async def _run(self, invocation: t.Callable[[], t.Awaitable]):
+        if self._metrics is not None:
+            self._metrics.start()
+        started = time.perf_counter()
+        code = 'OK'
+        try:
+            # Корутина создается в задаче: вызов, отмененный до запуска, не оставляет незапущенную корутину
+            result = await invocation()
+            if isinstance(result, grpc.aio.Call):
+                self._call = result
+                result = await result
+            return result
+        except grpc.aio.AioRpcError as e:
+            code = e.code().name
+            raise
+        except BaseException as e:
+            code = 'CANCELLED' if isinstance(e, asyncio.CancelledError) else 'UNKNOWN'
+            raise
+        finally:
+            if self._metrics is not None:
+                self._metrics.finish(code, time.perf_counter() - started)
+
+    def __await__(self):
+        return self._task.__await__()
+
+    async def _settled(self) -> t.Optional[BaseException]:
+        await asyncio.wait([self._task])
+        if self._task.cancelled():
+            return asyncio.CancelledError()
+        return self._task.exception()
+
+    def cancelled(self) -> bool:
+        return self._task.cancelled()
+
+    def done(self) -> bool:
+        return self._task.done()
+
+    def time_remaining(self) -> t.Optional[float]:
+        return None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+
+    def cancel(self) -> bool:
+        return self._task.cancel()
+
+    def add_done_callback(self, callback) -> None:
+        self._task.add_done_callback(lambda _: callback(self))
+
+    async def initial_metadata(self) -> grpc.aio.Metadata:
+        if await self._settled() is None and self._call is not None:
+            return await self._call.initial_metadata()
+        return grpc.aio.Metadata()
+
+    async def trailing_metadata(self) -> grpc.aio.Metadata:
+        error = await self._settled()
+        if isinstance(error, grpc.aio.AioRpcError):
+            return error.trailing_metadata() or grpc.aio.Metadata()
+        if error is None and self._call is not None:
+            return await self._call.trailing_metadata()
+        return grpc.aio.Metadata()
+
+    async def code(self) -> grpc.StatusCode:
+        error = await self._settled()
+        if error is None:
+            return grpc.StatusCode.OK
+        if isinstance(error, grpc.aio.AioRpcError):
+            return error.code()
+        return grpc.StatusCode.CANCELLED if isinstance(error, asyncio.CancelledError) else grpc.StatusCode.UNKNOWN
+
+    async def details(self) -> str:
+        error = await self._settled()
+        if isinstance(error, grpc.aio.AioRpcError):
+            return error.details() or ''
+        return '' if error is None else repr(error)
+
+    async def wait_for_connection(self) -> None:
+        await self._settled()
+
+
+class _BalancedUnaryStreamMultiCallable(_BalancedUnaryUnaryMultiCallable):
+    async def __call__(self, request, *, timeout=None, metadata=None, credentials=None, wait_for_ready=None, **kwargs):
+        details = ClientCallDetails(self._method, timeout, metadata, credentials, wait_for_ready)
+        self._metrics.start()
+        started = time.perf_counter()
+        try:
+            async for response in await self._intercept(0, details, request):
+                yield response
+        except grpc.aio.AioRpcError as e:
+            self._metrics.finish(e.code().name, time.perf_counter() - started)
+            raise
+        except BaseException as e:
+            code = 'CANCELLED' if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else 'UNKNOWN'
+            self._metrics.finish(code, time.perf_counter() - started)
+            raise
+        self._metrics.finish('OK', time.perf_counter() - started)
+
+    async def _intercept(self, index: int, details, request):
+        interceptors = [
+            interceptor for interceptor in self._channel._interceptors
+            if isinstance(interceptor, grpc.aio.UnaryStreamClientInterceptor)
+        ]
+        if index == len(interceptors):
+            return self._channel._balancer.unary_stream(
+                self._method, self._request_serializer, self._response_deserializer, details, request
+            )
+        return await interceptors[index].intercept_unary_stream(partial(self._intercept, index + 1), details, request)
+
+
+_balancer: t.Optional[LoadBalancer] = None
+
+
+def get_balancer() -> LoadBalancer:
+    """
+    Возвращает общий для процесса балансировщик по адресам из GRPC_BACKENDS.
+
+    Если GRPC_BACKENDS не задан, используется единственный бэкенд GRPC_HOST_LOCAL:GRPC_PORT.
+    Каналы gRPC привязаны к циклу событий, поэтому балансировщик создается заново при смене цикла.
+    """
+    global _balancer
+    if _balancer is None or _balancer._loop is not asyncio.get_running_loop():
+        addresses = settings.GRPC_BACKENDS or [f'{settings.GRPC_HOST_LOCAL}:{settings.GRPC_PORT}']
+        _balancer = LoadBalancer(addresses, policy=settings.GRPC_LB_POLICY, health_component='check_channel')
+    return _balancer
+
+
+async def close_balancer() -> None:
+    global _balancer
+    if _balancer is not None:
+        await _balancer.close()
+        _balancer = None
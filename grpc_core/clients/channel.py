@@ -0,0 +1,90 @@
+import json
+import typing as t
+
+import grpc
+
+from grpc_core.clients.hedging import HedgingClientInterceptor
+from settings import settings
+
+# Service config клиентских каналов по умолчанию (https://github.com/grpc/grpc/blob/master/doc/service_config.md).
+# retryPolicy и retryThrottling выполняет сам gRPC: повторы только для UNAVAILABLE, экспоненциальная
+# задержка с джиттером и бюджет повторов канала. hedgingPolicy gRPC для Python не поддерживает,
+# поэтому эти записи вырезаются из конфигурации канала и исполняются HedgingClientInterceptor с собственным
+# бюджетом (RetryBudget) по тем же параметрам retryThrottling. Бюджетов два: gRPC ограничивает только
+# повторы, RetryBudget - только копии хеджирования, но учитывает исходы вызовов всех методов.
+DEFAULT_SERVICE_CONFIG: dict = {
+    'methodConfig': [
+        {
+            'name': [
+                {'service': 'order.OrderService', 'method': 'ReadOrder'},
+                {'service': 'order.OrderService', 'method': 'ListOrders'},
+            ],
+            'hedgingPolicy': {
+                'maxAttempts': 2,
+                'hedgingDelay': '0.1s',
+                'nonFatalStatusCodes': ['UNAVAILABLE'],
+            },
+        },
+        {
+            'name': [
+                {'service': 'order.OrderService', 'method': 'UpdateOrder'},
+                {'service': 'order.OrderService', 'method': 'DeleteOrder'},
+                {'service': 'check.CheckStatusOrderService'},
+            ],
+            'retryPolicy': {
+                'maxAttempts': 4,
+                'initialBackoff': '0.05s',
+                'maxBackoff': '1s',
+                'backoffMultiplier': 2,
+                'retryableStatusCodes': ['UNAVAILABLE'],
+            },
+        },
+    ],
+    'retryThrottling': {
+        'maxTokens': 10,
+        'tokenRatio': 0.1,
+    },
+}
+
+SERVICE_CONFIG: dict = settings.GRPC_CLIENT_SERVICE_CONFIG or DEFAULT_SERVICE_CONFIG
+
+# Интерцептор общий для всех каналов процесса: статистика задержек и бюджет хеджирования
+# должны накапливаться между запросами, а не начинаться заново для каждого канала.
+hedging_interceptor = HedgingClientInterceptor.from_service_config(SERVICE_CONFIG)
+
+
+def channel_options(service_config: dict) -> list[tuple[str, t.Any]]:
+    """
+    Формирует опции gRPC канала с service config без записей hedgingPolicy.
+    """
+    method_config = [
+        {key: value for key, value in config.items() if key != 'hedgingPolicy'}
+        for config in service_config.get('methodConfig', [])
+    ]
+    return [
+        ('grpc.enable_retries', 1),
+        ('grpc.service_config', json.dumps({**service_config, 'methodConfig': method_config})),
+    ]
+
+
+def create_channel(target: str, interceptors: t.Sequence[grpc.aio.ClientInterceptor] = ()) -> grpc.aio.Channel:
+    """
+    Создает незащищенный асинхронный gRPC канал с политиками повторов и хеджирования.
+
+    Параметры:
+    ----------
+    target : str
+        Адрес сервера в формате 'host:port'.
+    interceptors : Sequence[grpc.aio.ClientInterceptor], optional
+        Интерцепторы, выполняемые до интерцептора хеджирования (например, авторизация).
+
+    Возвращает:
+    -----------
+    grpc.aio.Channel
+        Канал для создания клиентских заглушек (stubs).
+    """
+    return grpc.aio.insecure_channel(
+        target,
+        options=channel_options(SERVICE_CONFIG),
+        interceptors=[*interceptors, hedging_interceptor],
+    )
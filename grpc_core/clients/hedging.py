@@ -0,0 +1,186 @@
+import asyncio
+import time
+import typing as t
+from collections import deque
+from dataclasses import dataclass
+
+import grpc
+
+
+def parse_duration(value: str) -> float:
+    """ Переводит длительность из формата service config ('0.1s') в секунды. """
+    return float(value.rstrip('s'))
+
+
+class RetryBudget:
+    """
+    Бюджет хеджированных попыток по алгоритму retryThrottling из gRPC.
+
+    Каждая неудачная попытка уменьшает запас токенов на 1, каждый успешный ответ увеличивает на token_ratio.
+    Дополнительные попытки разрешены, только пока запас больше половины max_tokens, поэтому при перегрузке
+    сервера клиенты перестают умножать нагрузку копиями запросов.
+
+    Это отдельный от gRPC счетчик: повторы retryPolicy ограничивает retryThrottling самого gRPC (C-core),
+    у которого свой запас токенов с теми же параметрами, и доступа к нему из Python нет. Чтобы хеджирование
+    прекращалось и тогда, когда сервер отвечает ошибками на методы с retryPolicy, бюджет учитывает исходы
+    всех unary вызовов канала (см. HedgingClientInterceptor).
+    """
+
+    def __init__(self, max_tokens: float, token_ratio: float) -> None:
+        self.max_tokens = max_tokens
+        self.token_ratio = token_ratio
+        self.tokens = max_tokens
+
+    def allow(self) -> bool:
+        return self.tokens > self.max_tokens / 2
+
+    def on_success(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.token_ratio)
+
+    def on_failure(self) -> None:
+        self.tokens = max(0.0, self.tokens - 1)
+
+
+class LatencyTracker:
+    """
+    Скользящее окно задержек успешных вызовов метода для вычисления p95.
+
+    Перцентиль пересчитывается раз в recalc_every измерений, чтобы не сортировать окно на каждом вызове.
+    """
+
+    def __init__(self, window: int = 256, min_samples: int = 20, recalc_every: int = 16) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.recalc_every = recalc_every
+        self._since_recalc = 0
+        self._p95: t.Optional[float] = None
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._since_recalc += 1
+        if len(self.samples) >= self.min_samples and self._since_recalc >= self.recalc_every:
+            ordered = sorted(self.samples)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._since_recalc = 0
+
+    def p95(self) -> t.Optional[float]:
+        return self._p95
+
+
+@dataclass(frozen=True)
+class HedgingPolicy:
+    max_attempts: int
+    hedging_delay: float
+    non_fatal_status_codes: frozenset[grpc.StatusCode]
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'HedgingPolicy':
+        return cls(
+            max_attempts=int(config.get('maxAttempts', 2)),
+            hedging_delay=parse_duration(config.get('hedgingDelay', '0s')),
+            non_fatal_status_codes=frozenset(
+                grpc.StatusCode[code] for code in config.get('nonFatalStatusCodes', [])
+            ),
+        )
+
+
+class HedgingClientInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    Интерцептор хеджированных запросов для методов с hedgingPolicy в service config.
+
+    Если ответ не получен за время, равное p95 задержки метода (до накопления статистики используется
+    hedgingDelay из конфигурации), отправляется дополнительная копия запроса. Возвращается первый успешный
+    ответ, остальные попытки отменяются. Ошибка с кодом из nonFatalStatusCodes сразу запускает следующую
+    попытку. Число копий ограничено maxAttempts и бюджетом RetryBudget.
+
+    Вызовы остальных методов проходят без изменений, но их итог тоже учитывается в бюджете: ошибка с кодом
+    из retryableStatusCodes или nonFatalStatusCodes конфигурации (failure_codes) - неудача, успешный ответ -
+    успех. Для методов с retryPolicy это итог после всех повторов gRPC.
+    """
+
+    def __init__(
+            self,
+            policies: dict[str, HedgingPolicy],
+            budget: RetryBudget,
+            failure_codes: frozenset[grpc.StatusCode] = frozenset(),
+    ) -> None:
+        self.policies = policies
+        self.budget = budget
+        self.failure_codes = failure_codes
+        self.trackers = {method: LatencyTracker() for method in policies}
+
+    @classmethod
+    def from_service_config(cls, service_config: dict) -> 'HedgingClientInterceptor':
+        policies = {}
+        failure_codes = set()
+        for config in service_config.get('methodConfig', []):
+            codes = config.get('retryPolicy', {}).get('retryableStatusCodes', [])
+            failure_codes.update(grpc.StatusCode[code] for code in codes)
+            if 'hedgingPolicy' not in config:
+                continue
+            policy = HedgingPolicy.from_config(config['hedgingPolicy'])
+            failure_codes.update(policy.non_fatal_status_codes)
+            for name in config['name']:
+                policies[f"/{name['service']}/{name['method']}"] = policy
+        throttling = service_config.get('retryThrottling', {})
+        budget = RetryBudget(
+            max_tokens=float(throttling.get('maxTokens', 10)),
+            token_ratio=float(throttling.get('tokenRatio', 0.1)),
+        )
+        return cls(policies, budget, frozenset(failure_codes))
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = client_call_details.method
+        if isinstance(method, bytes):
+            method = method.decode()
+        if (policy := self.policies.get(method)) is None:
+            call = await continuation(client_call_details, request)
+            try:
+                response = await call
+            except grpc.aio.AioRpcError as e:
+                if e.code() in self.failure_codes:
+                    self.budget.on_failure()
+                raise
+            self.budget.on_success()
+            return response
+
+        tracker = self.trackers[method]
+        hedging_delay = tracker.p95() or policy.hedging_delay
+
+        async def attempt():
+            call = await continuation(client_call_details, request)
+            return await call
+
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(attempt())}
+        attempts = 1
+        error = None
+        try:
+            while pending:
+                can_hedge = attempts < policy.max_attempts and self.budget.allow()
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedging_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Ответ задерживается дольше обычного: отправляем копию запроса
+                    pending.add(asyncio.ensure_future(attempt()))
+                    attempts += 1
+                    continue
+
+                for task in done:
+                    if (error := task.exception()) is None:
+                        self.budget.on_success()
+                        tracker.add(time.monotonic() - started)
+                        return task.result()
+                    if not isinstance(error, grpc.aio.AioRpcError) or error.code() not in policy.non_fatal_status_codes:
+                        raise error
+                    self.budget.on_failure()
+                    if attempts < policy.max_attempts and self.budget.allow():
+                        pending.add(asyncio.ensure_future(attempt()))
+                        attempts += 1
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,219 @@
+"""
+Воспроизведение записанных вызовов gRPC (GRPC_CAPTURE_PATH) на сервере для нагрузочного тестирования.
+
+Вызовы отправляются в моменты, смещенные от начала записи так же, как в исходном трафике (с --speed 2
+вдвое чаще), поэтому одновременно выполняется столько же вызовов, сколько в записи. Каждый вызов
+повторяет метод, метаданные, дедлайн и сообщения запроса; токен rpc-auth в запись не попадает и
+добавляется заново. Сообщения передаются без разбора, поэтому воспроизводятся вызовы любого сервиса
+сервера. Стрим ответов читается до конца, а вызов, отмененный в записи клиентом (например, Health.Watch),
+отменяется после того же числа ответов. Сообщения стрима запросов отправляются сразу, без исходных пауз.
+
+Для каждого метода выводятся перцентили времени исходных вызовов (время обработки на сервере) и
+воспроизведенных (время на клиенте, включая сеть), их разность, а также вызовы, завершившиеся с другим
+кодом, чем в записи. Максимальная одновременность записи и воспроизведения показывается в итогах:
+если воспроизведение не успевает за расписанием, растет опоздание отправки (lag).
+
+Запуск:
+    GRPC_CAPTURE_PATH=capture.bin python -m grpc_core.servers
+    python -m grpc_core.clients.replay capture.bin --target 127.0.0.1:50091 --speed 2
+    python -m grpc_core.clients.replay capture.*.bin --method /order. --json
+
+Токен берется из --token или подписывается SECRET_KEY из настроек.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+
+import grpc
+import jwt
+
+from grpc_core.capture import read_capture
+from grpc_core.protos.capture.capture_pb2 import CapturedCall
+from settings import settings
+
+PERCENTILES = {'p50_ms': 0.5, 'p99_ms': 0.99}
+
+
+def percentile(values: list[float], q: float) -> float:
+    # Ближайший ранг: наименьшее значение, не меньше которого q доли замеров
+    return values[max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))]
+
+
+def peak_concurrency(intervals: list[tuple[float, float]]) -> int:
+    # Наибольшее число пересекающихся интервалов (начало, конец)
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def load_calls(paths: list[str], methods: list[str] | None) -> list[CapturedCall]:
+    # Записи нескольких процессов сервера объединяются по времени начала
+    calls = [
+        call for path in paths for call in read_capture(path)
+        if not methods or call.method.startswith(tuple(methods))
+    ]
+    calls.sort(key=lambda call: call.start_time)
+    return calls
+
+
+class Replayer:
+    """
+    Отправляет записанные вызовы по расписанию записи и собирает их результаты.
+
+    Атрибуты:
+    ---------
+    results : list[tuple[CapturedCall, float, float, str]]
+        Исходный вызов, время начала и длительность воспроизведения (perf_counter) и код ответа.
+    lag : float
+        Наибольшее опоздание отправки вызова относительно расписания, с.
+    """
+
+    def __init__(self, channel: grpc.aio.Channel, token: str) -> None:
+        self.channel = channel
+        self.token = token
+        self.results: list[tuple[CapturedCall, float, float, str]] = []
+        self.lag = 0.0
+
+    def _metadata(self, call: CapturedCall) -> tuple:
+        metadata = [
+            (entry.key, entry.binary_value if entry.key.endswith('-bin') else entry.value) for entry in call.metadata
+        ]
+        metadata.append(('rpc-auth', self.token))
+        return tuple(metadata)
+
+    async def _invoke(self, call: CapturedCall) -> str:
+        # Без сериализаторов канал передает сообщения как есть: запрос - записанные байты, ответ - байты
+        options = {
+            'metadata': self._metadata(call),
+            'timeout': call.timeout if call.HasField('timeout') else None,
+        }
+        requests = iter(call.requests) if call.request_streaming else call.requests[0]
+        if not call.response_streaming:
+            multicallable = (self.channel.stream_unary if call.request_streaming else self.channel.unary_unary)(call.method)
+            await multicallable(requests, **options)
+            return 'OK'
+        multicallable = (self.channel.stream_stream if call.request_streaming else self.channel.unary_stream)(call.method)
+        rpc = multicallable(requests, **options)
+        received = 0
+        async for _ in rpc:
+            received += 1
+            if call.code == 'CANCELLED' and received >= call.responses:
+                rpc.cancel()
+                return 'CANCELLED'
+        return 'OK'
+
+    async def _replay(self, call: CapturedCall) -> None:
+        started = time.perf_counter()
+        try:
+            code = await self._invoke(call)
+        except grpc.aio.AioRpcError as e:
+            code = e.code().name
+        except asyncio.CancelledError:
+            code = 'CANCELLED'
+        self.results.append((call, started, time.perf_counter() - started, code))
+
+    async def run(self, calls: list[CapturedCall], speed: float) -> float:
+        """
+        Воспроизводит вызовы и возвращает время воспроизведения, с.
+        """
+        origin = calls[0].start_time
+        started = time.perf_counter()
+        tasks = []
+        for call in calls:
+            delay = started + (call.start_time - origin) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.lag = max(self.lag, -delay)
+            tasks.append(asyncio.create_task(self._replay(call)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+def summarize(replayer: Replayer, calls: list[CapturedCall], elapsed: float) -> dict:
+    by_method = defaultdict(list)
+    for call, _, duration, code in replayer.results:
+        by_method[call.method].append((call, duration, code))
+    methods = []
+    for method, results in sorted(by_method.items()):
+        original = sorted(call.duration for call, _, _ in results)
+        replayed = sorted(duration for _, duration, _ in results)
+        summary = {
+            'method': method,
+            'calls': len(results),
+            'codes': dict(Counter(code for _, _, code in results)),
+            'mismatched_codes': sum(call.code != code for call, _, code in results),
+        }
+        for key, q in PERCENTILES.items():
+            summary[f'original_{key}'] = round(percentile(original, q) * 1e3, 3)
+            summary[f'replay_{key}'] = round(percentile(replayed, q) * 1e3, 3)
+            summary[f'delta_{key}'] = round(summary[f'replay_{key}'] - summary[f'original_{key}'], 3)
+        methods.append(summary)
+    return {
+        'calls': len(calls),
+        'original_seconds': round(calls[-1].start_time - calls[0].start_time, 3),
+        'replay_seconds': round(elapsed, 3),
+        'original_peak_concurrency': peak_concurrency([(call.start_time, call.start_time + call.duration) for call in calls]),
+        'replay_peak_concurrency': peak_concurrency(
+            [(started, started + duration) for _, started, duration, _ in replayer.results]
+        ),
+        'max_lag_ms': round(replayer.lag * 1e3, 3),
+        'methods': methods,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"calls={report['calls']} original={report['original_seconds']}s replay={report['replay_seconds']}s "
+        f"concurrency original={report['original_peak_concurrency']} replay={report['replay_peak_concurrency']} "
+        f"max_lag={report['max_lag_ms']}ms"
+    )
+    columns = [
+        'calls', 'mismatched_codes', 'original_p50_ms', 'replay_p50_ms', 'delta_p50_ms',
+        'original_p99_ms', 'replay_p99_ms', 'delta_p99_ms',
+    ]
+    print(f"{'method':<50}" + ''.join(f'{column:>17}' for column in columns))
+    for method in report['methods']:
+        print(f"{method['method']:<50}" + ''.join(f'{method[column]:>17}' for column in columns))
+
+
+async def main(args) -> None:
+    calls = load_calls(args.files, args.method)
+    if args.limit:
+        calls = calls[:args.limit]
+    if not calls:
+        sys.exit('Нет записанных вызовов для воспроизведения')
+    token = args.token or jwt.encode({'sub': 'replay'}, settings.SECRET_KEY, algorithm='HS256')
+    options = [
+        ('grpc.max_receive_message_length', settings.GRPC_MAX_RECEIVE_MESSAGE_LENGTH),
+        ('grpc.max_send_message_length', settings.GRPC_MAX_SEND_MESSAGE_LENGTH),
+    ]
+    async with grpc.aio.insecure_channel(args.target, options=options) as channel:
+        replayer = Replayer(channel, token)
+        elapsed = await replayer.run(calls, args.speed)
+    report = summarize(replayer, calls, elapsed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.clients.replay', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('files', nargs='+', help='файлы записи GRPC_CAPTURE_PATH')
+    parser.add_argument('--target', default=f'127.0.0.1:{settings.GRPC_PORT}', help='адрес сервера host:port')
+    parser.add_argument('--token', help='JWT токен для заголовка rpc-auth')
+    parser.add_argument('--speed', type=float, default=1.0, help='ускорение относительно записи')
+    parser.add_argument('--method', action='append', help='префикс полного имени метода (можно указать несколько раз)')
+    parser.add_argument('--limit', type=int, default=0, help='число первых вызовов записи')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в формате JSON')
+    asyncio.run(main(parser.parse_args()))
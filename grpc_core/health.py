@@ -0,0 +1,153 @@
+"""
+Реестр состояния сервисов для gRPC Health.
+
+Компоненты процесса сообщают о своем состоянии в реестр: доступность БД (database), наличие здорового
+бэкенда у общего клиентского балансировщика (check_channel), перегрузка цикла событий (event_loop).
+Статус каждого сервиса gRPC вычисляется из состояния компонентов, от которых он зависит
+(SERVICE_DEPENDENCIES): SERVING, если все они исправны. Компонент, еще не сообщивший о себе, считается
+исправным.
+
+Статусы пересчитываются только при изменении состояния компонента, а подписчики Health.Watch получают
+сообщение только при смене статуса своего сервиса. У каждого подписчика своя очередь из одного элемента:
+медленный подписчик получает последний статус, а не копит устаревшие.
+"""
+import asyncio
+import typing as t
+
+from grpc_health.v1 import health_pb2
+from loguru import logger
+
+from grpc_core import metrics
+
+SERVING = health_pb2.HealthCheckResponse.SERVING
+NOT_SERVING = health_pb2.HealthCheckResponse.NOT_SERVING
+SERVICE_UNKNOWN = health_pb2.HealthCheckResponse.SERVICE_UNKNOWN
+
+# Компоненты, от которых зависит статус сервиса; '' - статус сервера целиком.
+# Статус '' не зависит от check_channel: балансировщик по умолчанию (GRPC_HEALTH_CHECK_SERVICE) следит
+# именно за ним и может смотреть на этот же сервер, а статус, зависящий от самого себя, не вернулся бы в SERVING.
+SERVICE_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    '': ('database', 'event_loop'),
+    'order.OrderService': ('database', 'event_loop', 'check_channel'),
+    'check.CheckStatusOrderService': ('event_loop',),
+    'echo.EchoService': ('event_loop',),
+}
+
+HEALTH_STATUS = metrics.gauge(
+    'grpc_health_serving', 'Статус сервиса в Health: 1 - SERVING, 0 - нет', ('grpc_service',)
+)
+COMPONENT_STATUS = metrics.gauge(
+    'health_component_up', 'Состояние компонента, от которого зависит Health: 1 - исправен, 0 - нет', ('component',)
+)
+
+
+class HealthRegistry:
+    """
+    Статусы сервисов gRPC и подписки на их изменения.
+
+    Атрибуты:
+    ---------
+    components : dict[str, bool]
+        Последнее известное состояние компонентов.
+    """
+
+    def __init__(self, dependencies: dict[str, tuple[str, ...]] | None = None) -> None:
+        self._dependencies = SERVICE_DEPENDENCIES if dependencies is None else dependencies
+        self.components: dict[str, bool] = {}
+        self._statuses: dict[str, int] = {}
+        self._watchers: dict[str, set[asyncio.Queue]] = {}
+        self._shutdown = False
+
+    def serve(self, services: t.Iterable[str]) -> None:
+        """
+        Регистрирует сервисы и вычисляет их статус; сервисы без зависимостей всегда SERVING.
+        """
+        self._shutdown = False
+        for service in ('', *services):
+            self._set(service, self._evaluate(service))
+
+    def shutdown(self) -> None:
+        """
+        Переводит все сервисы в NOT_SERVING до следующего serve: сервер останавливается,
+        и балансировщики должны перестать направлять на него запросы.
+        """
+        self._shutdown = True
+        for service in list(self._statuses):
+            self._set(service, NOT_SERVING)
+
+    def set_component(self, component: str, healthy: bool) -> None:
+        """
+        Сообщает состояние компонента и пересчитывает статусы зависящих от него сервисов.
+        """
+        if self.components.get(component) == healthy:
+            return
+        self.components[component] = healthy
+        COMPONENT_STATUS.set(int(healthy), component=component)
+        logger.info('Компонент {}: {}', component, 'исправен' if healthy else 'неисправен')
+        for service in list(self._statuses):
+            if component in self._dependencies.get(service, ()):
+                self._set(service, self._evaluate(service))
+
+    def status(self, service: str) -> t.Optional[int]:
+        """ Текущий статус сервиса или None, если сервис не зарегистрирован. """
+        return self._statuses.get(service)
+
+    def subscribe(self, service: str) -> asyncio.Queue:
+        """
+        Создает очередь подписчика, в которой уже лежит текущий статус сервиса
+        (SERVICE_UNKNOWN для незарегистрированного). Очередь нужно освободить через unsubscribe.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait(self._statuses.get(service, SERVICE_UNKNOWN))
+        self._watchers.setdefault(service, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, service: str, queue: asyncio.Queue) -> None:
+        watchers = self._watchers.get(service)
+        if watchers is not None:
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[service]
+
+    def _evaluate(self, service: str) -> int:
+        if self._shutdown:
+            return NOT_SERVING
+        healthy = all(self.components.get(component, True) for component in self._dependencies.get(service, ()))
+        return SERVING if healthy else NOT_SERVING
+
+    def _set(self, service: str, status: int) -> None:
+        if self._statuses.get(service) == status:
+            return
+        self._statuses[service] = status
+        HEALTH_STATUS.set(int(status == SERVING), grpc_service=service)
+        logger.info('Статус сервиса {!r}: {}', service, health_pb2.HealthCheckResponse.ServingStatus.Name(status))
+        for queue in self._watchers.get(service, ()):
+            # В очереди хранится только последний статус, который подписчик еще не отправил
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+
+async def probe(component: str, check: t.Callable[[], t.Awaitable[t.Any]], interval: float, timeout: float) -> None:
+    """
+    Периодически выполняет проверку компонента и сообщает результат в реестр.
+
+    Компонент исправен, если check завершилась без исключения за timeout секунд.
+    Выполняется до отмены задачи.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(check(), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if registry.components.get(component, True):
+                logger.warning('Проверка компонента {} не прошла: {!r}', component, e)
+            registry.set_component(component, False)
+        else:
+            registry.set_component(component, True)
+        await asyncio.sleep(interval)
+
+
+# Реестр процесса: его обновляют компоненты и читает HealthService
+registry = HealthRegistry()
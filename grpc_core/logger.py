@@ -0,0 +1,31 @@
+"""
+Настройка loguru для процессов шлюза и gRPC сервера.
+
+Запись в sink выполняется в отдельном потоке (enqueue=True), поэтому обработчик запроса только ставит
+сообщение в очередь и не ждет вывода в stderr. Уровень задается настройкой LOG_LEVEL. В горячих путях
+сообщения передаются с аргументами ('... {}', value), а не f-строками: loguru форматирует их, только если
+уровень сообщения проходит фильтр. Вместо полного содержимого запросов и ответов логируются краткие
+сводки (идентификатор, число записей, размер).
+"""
+import sys
+
+from loguru import logger
+
+from settings import settings
+
+
+def setup_logging() -> None:
+    """
+    Заменяет обработчик loguru по умолчанию на обработчик stderr с уровнем LOG_LEVEL.
+
+    Вызывается один раз при старте процесса. Перед завершением процесса следует дождаться
+    записи сообщений из очереди: await logger.complete().
+    """
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=settings.LOG_LEVEL,
+        enqueue=settings.LOG_ENQUEUE,
+        # Значения переменных в трассировке исключений могут содержать данные запросов
+        diagnose=False,
+    )
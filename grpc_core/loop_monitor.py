@@ -0,0 +1,126 @@
+"""
+Мониторинг задержки цикла событий.
+
+gRPC сервер, шлюз FastAPI и синхронные вызовы внутри обработчиков (jwt.decode, валидация pydantic)
+выполняются в одном цикле событий: любой блокирующий вызов задерживает все запросы процесса.
+
+LoopMonitor запускает в цикле задачу-зонд, которая засыпает на LOOP_MONITOR_INTERVAL секунд и измеряет,
+насколько позже положенного она проснулась; задержка записывается в гистограмму event_loop_lag_seconds.
+Сторожевой поток следит за тем же сроком пробуждения: если зонд опаздывает больше чем на
+LOOP_SLOW_CALLBACK_THRESHOLD секунд, значит цикл занят одним обратным вызовом, и поток снимает стек потока
+цикла прямо во время блокировки. Стек пишется в лог, а счетчик event_loop_slow_callbacks_total
+увеличивается - один раз на каждую блокировку.
+
+Сглаженная задержка зонда определяет перегрузку процесса: пока она выше LOOP_SLOW_CALLBACK_THRESHOLD,
+компонент event_loop в реестре grpc_core.health неисправен, и сервисы, зависящие от него, получают
+статус NOT_SERVING. Единичная блокировка сглаживается и статус не меняет.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+from loguru import logger
+
+from grpc_core import metrics
+from grpc_core.health import registry
+from settings import settings
+
+LOOP_LAG = metrics.histogram(
+    'event_loop_lag_seconds',
+    'Задержка выполнения запланированных задач цикла событий, с',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SLOW_CALLBACKS = metrics.counter(
+    'event_loop_slow_callbacks_total', 'Блокировки цикла событий дольше LOOP_SLOW_CALLBACK_THRESHOLD'
+)
+
+
+class LoopMonitor:
+    """
+    Зонд задержки цикла событий и сторожевой поток, сообщающий о блокирующих обратных вызовах.
+
+    Атрибуты:
+    ---------
+    interval : float
+        Период зонда, с.
+    threshold : float
+        Опоздание зонда, после которого цикл считается заблокированным, с.
+    lag : grpc_core.metrics.HistogramValue
+        Гистограмма задержки зонда (значение метрики event_loop_lag_seconds).
+    slow_callbacks : list[str]
+        Стеки последних обнаруженных блокировок (не больше MAX_REPORTS), последний - в конце.
+    smoothed_lag : float
+        Экспоненциально сглаженная задержка зонда, с; выше threshold цикл считается перегруженным.
+    """
+    MAX_REPORTS = 10
+    # Вес нового замера в сглаженной задержке
+    SMOOTHING = 0.2
+
+    def __init__(self, interval: float | None = None, threshold: float | None = None) -> None:
+        self.interval = settings.LOOP_MONITOR_INTERVAL if interval is None else interval
+        self.threshold = settings.LOOP_SLOW_CALLBACK_THRESHOLD if threshold is None else threshold
+        self.slow_callbacks: list[str] = []
+        self.smoothed_lag = 0.0
+        self.lag = LOOP_LAG.labels()
+        self._slow = SLOW_CALLBACKS.labels()
+        # Время (time.monotonic), к которому зонд должен проснуться; None - зонд не ждет
+        self._deadline: t.Optional[float] = None
+        self._reported_deadline: t.Optional[float] = None
+        self._loop_thread_id: t.Optional[int] = None
+        self._probe: t.Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+
+    def start(self) -> None:
+        """ Запускает зонд в текущем цикле событий и сторожевой поток. """
+        self._loop_thread_id = threading.get_ident()
+        self._probe = asyncio.get_running_loop().create_task(self._run_probe(), name='loop-monitor')
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._probe is not None:
+            self._probe.cancel()
+            await asyncio.gather(self._probe, return_exceptions=True)
+        self._watchdog.join()
+
+    async def _run_probe(self) -> None:
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._deadline)
+            self.lag.observe(lag)
+            self.smoothed_lag += self.SMOOTHING * (lag - self.smoothed_lag)
+            registry.set_component('event_loop', self.smoothed_lag <= self.threshold)
+
+    def _watch(self) -> None:
+        # Проверяем в несколько раз чаще порога, чтобы снять стек, пока блокировка еще идет
+        while not self._stop.wait(self.threshold / 4):
+            deadline = self._deadline
+            if deadline is None or deadline == self._reported_deadline:
+                continue
+            overdue = time.monotonic() - deadline
+            if overdue > self.threshold:
+                self._reported_deadline = deadline
+                self._report(overdue)
+
+    def _report(self, overdue: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+        self._slow.inc()
+        self.slow_callbacks = [*self.slow_callbacks[-(self.MAX_REPORTS - 1):], stack]
+        logger.warning('Цикл событий заблокирован уже {:.3f} с, стек потока цикла:\n{}', overdue, stack)
+
+
+async def start_loop_monitor() -> t.Optional[LoopMonitor]:
+    """
+    Запускает LoopMonitor в текущем цикле событий, если LOOP_MONITOR_ENABLED, иначе возвращает None.
+    """
+    if not settings.LOOP_MONITOR_ENABLED:
+        return None
+    monitor = LoopMonitor()
+    monitor.start()
+    return monitor
@@ -0,0 +1,363 @@
+"""
+Минимальный реестр метрик процесса в текстовом формате Prometheus.
+
+Метрики хранятся в памяти процесса: при запуске нескольких процессов сервера каждый отдает свои значения.
+
+Значение метрики с конкретным набором меток хранится в отдельном объекте, который возвращает labels().
+Блокировка берется только при создании такого объекта, а запись значения выполняется без блокировок:
+обработчики запросов пишут метрики из потока цикла событий, и под GIL приращения не теряются, пока одну
+метрику не пишут одновременно несколько потоков. В горячем пути объект labels() стоит получить один раз
+и сохранить, чтобы не собирать ключ меток при каждом вызове.
+"""
+import asyncio
+import threading
+import typing as t
+from bisect import bisect_left
+
+# Границы корзин гистограмм по умолчанию: задержки в секундах и размеры сообщений в байтах
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labelnames: t.Sequence[str], values: t.Sequence[str]) -> str:
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return f'{{{pairs}}}'
+
+
+class Value:
+    """ Значение счетчика или gauge с конкретным набором меток. """
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    """ Корзины, сумма и число наблюдений гистограммы с конкретным набором меток. """
+    __slots__ = ('upper_bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self.upper_bounds = upper_bounds
+        # Последняя корзина - +Inf. Счетчики корзин не накопительные, сумма считается при выводе
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    Базовый класс метрики с набором меток.
+
+    Атрибуты:
+    ---------
+    name : str
+        Имя метрики в формате Prometheus.
+    documentation : str
+        Описание метрики (строка # HELP).
+    labelnames : tuple[str, ...]
+        Имена меток; значения меток передаются именованными аргументами.
+    """
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], t.Any] = {}
+        self._lock = threading.Lock()
+        # Метрика без меток отдается сразу, с нулевым значением
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        return Value()
+
+    def _key(self, labels: dict[str, t.Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels(self, **labels):
+        """ Возвращает объект значения метрики с указанными метками, создавая его при первом обращении. """
+        key = self._key(labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def value(self, **labels) -> float:
+        """ Текущее значение метрики с указанными метками. """
+        child = self._children.get(self._key(labels))
+        return child.value if child is not None else 0.0
+
+    def samples(self) -> t.Iterable[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(f'{name}{labels} {value}' for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """ Монотонно растущий счетчик. """
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+
+class Gauge(Metric):
+    """
+    Текущее значение. Вместо set/inc/dec можно задать функцию, вызываемую при каждом чтении метрики.
+    """
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._function: t.Optional[t.Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        self.labels(**labels).set(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).dec(amount)
+
+    def set_function(self, function: t.Callable[[], float]) -> None:
+        self._function = function
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return super().value(**labels)
+
+    def samples(self) -> t.Iterable[tuple[str, str, float]]:
+        if self._function is not None:
+            yield self.name, '', self._function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    """
+    Распределение наблюдений по корзинам (задержки, размеры сообщений).
+
+    Атрибуты:
+    ---------
+    buckets : tuple[float, ...]
+        Верхние границы корзин по возрастанию; корзина +Inf добавляется автоматически.
+    """
+    type_name = 'histogram'
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: t.Sequence[str] = (), buckets: t.Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def value(self, **labels) -> float:
+        """ Число наблюдений с указанными метками. """
+        child = self._children.get(self._key(labels))
+        return child.count if child is not None else 0
+
+    def samples(self) -> t.Iterable[tuple[str, str, float]]:
+        bounds = [*(repr(float(bound)) for bound in self.buckets), '+Inf']
+        labelnames = (*self.labelnames, 'le')
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, list(child.counts)):
+                cumulative += count
+                yield f'{self.name}_bucket', _format_labels(labelnames, (*values, bound)), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum', labels, child.sum
+            yield f'{self.name}_count', labels, child.count
+
+
+class Registry:
+    """
+    Реестр метрик процесса. Повторная регистрация метрики с тем же именем возвращает уже существующую.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric):
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована с типом {existing.type_name}')
+        return existing
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def counter(name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str, documentation: str, labelnames: t.Sequence[str] = (), buckets: t.Sequence[float] = LATENCY_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+class RpcMethodMetrics:
+    """
+    Значения метрик RPC одного метода, полученные заранее, чтобы запись не искала их по меткам.
+
+    Атрибуты:
+    ---------
+    in_flight : Value
+        Число выполняющихся вызовов.
+    latency : HistogramValue
+        Время вызова, с.
+    request_bytes, response_bytes : HistogramValue
+        Размеры сообщений запроса и ответа в сериализованном виде, байт.
+    """
+    __slots__ = ('_rpc', '_labels', '_handled', '_measured', 'in_flight', 'latency', 'request_bytes', 'response_bytes')
+
+    def __init__(self, rpc: 'RpcMetrics', method: str) -> None:
+        # Полное имя метода: '/order.OrderService/CreateOrder'
+        service, _, name = method.lstrip('/').partition('/')
+        self._rpc = rpc
+        self._labels = {'grpc_service': service, 'grpc_method': name}
+        self._handled: dict[str, Value] = {}
+        self._measured: dict[t.Any, t.Callable] = {}
+        self.in_flight = rpc.in_flight.labels(**self._labels)
+        self.latency = rpc.latency.labels(**self._labels)
+        self.request_bytes = rpc.request_bytes.labels(**self._labels)
+        self.response_bytes = rpc.response_bytes.labels(**self._labels)
+
+    def start(self) -> None:
+        self.in_flight.inc()
+
+    def finish(self, code: str, latency: float) -> None:
+        """ Записывает завершение вызова с кодом ответа code ('OK', 'NOT_FOUND', ...). """
+        handled = self._handled.get(code)
+        if handled is None:
+            handled = self._handled[code] = self._rpc.handled.labels(**self._labels, grpc_code=code)
+        handled.inc()
+        self.latency.observe(latency)
+        self.in_flight.dec()
+
+    def measured(self, function: t.Optional[t.Callable], sizes: HistogramValue, serializing: bool) -> t.Optional[t.Callable]:
+        """
+        Оборачивает сериализатор (serializing=True) или десериализатор сообщений так, чтобы размер каждого
+        сообщения в байтах записывался в sizes. Обертки кэшируются, поэтому для одной функции возвращается
+        один и тот же объект.
+        """
+        if function is None:
+            return None
+        wrapped = self._measured.get((function, serializing))
+        if wrapped is not None:
+            return wrapped
+
+        if serializing:
+            def wrapped(message):
+                data = function(message)
+                sizes.observe(len(data))
+                return data
+        else:
+            def wrapped(data):
+                sizes.observe(len(data))
+                return function(data)
+
+        self._measured[(function, serializing)] = wrapped
+        return wrapped
+
+
+class RpcMetrics:
+    """
+    Метрики gRPC вызовов одной стороны (server или client) в духе go-grpc-prometheus.
+
+    Метрики с префиксом grpc_{side}_: handled_total (с меткой grpc_code), in_flight, handling_seconds,
+    request_bytes и response_bytes с метками grpc_service и grpc_method.
+    """
+
+    def __init__(self, side: str) -> None:
+        labels = ('grpc_service', 'grpc_method')
+        prefix = f'grpc_{side}'
+        self.handled = counter(f'{prefix}_handled_total', 'Завершенные вызовы по коду ответа', [*labels, 'grpc_code'])
+        self.in_flight = gauge(f'{prefix}_in_flight', 'Выполняющиеся вызовы', labels)
+        self.latency = histogram(f'{prefix}_handling_seconds', 'Время вызова, с', labels, LATENCY_BUCKETS)
+        self.request_bytes = histogram(f'{prefix}_request_bytes', 'Размер сообщений запроса, байт', labels, SIZE_BUCKETS)
+        self.response_bytes = histogram(f'{prefix}_response_bytes', 'Размер сообщений ответа, байт', labels, SIZE_BUCKETS)
+        self._methods: dict[str, RpcMethodMetrics] = {}
+
+    def method(self, method: str) -> RpcMethodMetrics:
+        """ Возвращает метрики метода по полному имени ('/order.OrderService/CreateOrder'). """
+        metrics = self._methods.get(method)
+        if metrics is None:
+            metrics = self._methods.setdefault(method, RpcMethodMetrics(self, method))
+        return metrics
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        # Заголовки запроса не нужны, но их нужно дочитать до пустой строки
+        while await reader.readline() not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, content_type, body = '200 OK', CONTENT_TYPE, REGISTRY.render().encode()
+        else:
+            status, content_type, body = '404 Not Found', 'text/plain', b'Not Found\n'
+        writer.write(
+            f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'.encode() + body
+        )
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.Server:
+    """
+    Запускает минимальный HTTP сервер, отдающий метрики процесса по GET /metrics.
+
+    Нужен процессам gRPC сервера, запущенным отдельно от шлюза FastAPI (python -m grpc_core.servers),
+    у которых нет маршрута /metrics.
+    """
+    return await asyncio.start_server(_serve_metrics, host, port)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: admin/admin.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import enum_type_wrapper
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x61\x64min/admin.proto\x12\x05\x61\x64min\"w\n\x0eProfileRequest\x12\x10\n\x08\x64uration\x18\x01 \x01(\x01\x12!\n\x08profiler\x18\x02 \x01(\x0e\x32\x0f.admin.Profiler\x12\x0c\n\x04sort\x18\x03 \x01(\t\x12\r\n\x05limit\x18\x04 \x01(\x05\x12\x13\n\x0binterval_ms\x18\x05 \x01(\x01\"\x1c\n\x0cProfileChunk\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\t\"G\n\x12TraceMallocRequest\x12\x10\n\x08\x64uration\x18\x01 \x01(\x01\x12\x10\n\x08group_by\x18\x02 \x01(\t\x12\r\n\x05limit\x18\x03 \x01(\x05\";\n\nAllocation\x12\x10\n\x08location\x18\x01 \x01(\t\x12\x0c\n\x04size\x18\x02 \x01(\x03\x12\r\n\x05\x63ount\x18\x03 \x01(\x03\"j\n\x13TraceMallocResponse\x12&\n\x0b\x61llocations\x18\x01 \x03(\x0b\x32\x11.admin.Allocation\x12\x16\n\x0etraced_current\x18\x02 \x01(\x03\x12\x13\n\x0btraced_peak\x18\x03 \x01(\x03\"\"\n\x11TaskStacksRequest\x12\r\n\x05limit\x18\x01 \x01(\x05\";\n\tTaskStack\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\tcoroutine\x18\x02 \x01(\t\x12\r\n\x05stack\x18\x03 \x01(\t\"5\n\x12TaskStacksResponse\x12\x1f\n\x05tasks\x18\x01 \x03(\x0b\x32\x10.admin.TaskStack*&\n\x08Profiler\x12\x0c\n\x08\x43PROFILE\x10\x00\x12\x0c\n\x08SAMPLING\x10\x01\x32\xd0\x01\n\x0c\x41\x64minService\x12\x37\n\x07Profile\x12\x15.admin.ProfileRequest\x1a\x13.admin.ProfileChunk0\x01\x12\x44\n\x0bTraceMalloc\x12\x19.admin.TraceMallocRequest\x1a\x1a.admin.TraceMallocResponse\x12\x41\n\nTaskStacks\x12\x18.admin.TaskStacksRequest\x1a\x19.admin.TaskStacksResponseb\x06proto3')
+
+_PROFILER = DESCRIPTOR.enum_types_by_name['Profiler']
+Profiler = enum_type_wrapper.EnumTypeWrapper(_PROFILER)
+CPROFILE = 0
+SAMPLING = 1
+
+
+_PROFILEREQUEST = DESCRIPTOR.message_types_by_name['ProfileRequest']
+_PROFILECHUNK = DESCRIPTOR.message_types_by_name['ProfileChunk']
+_TRACEMALLOCREQUEST = DESCRIPTOR.message_types_by_name['TraceMallocRequest']
+_ALLOCATION = DESCRIPTOR.message_types_by_name['Allocation']
+_TRACEMALLOCRESPONSE = DESCRIPTOR.message_types_by_name['TraceMallocResponse']
+_TASKSTACKSREQUEST = DESCRIPTOR.message_types_by_name['TaskStacksRequest']
+_TASKSTACK = DESCRIPTOR.message_types_by_name['TaskStack']
+_TASKSTACKSRESPONSE = DESCRIPTOR.message_types_by_name['TaskStacksResponse']
+ProfileRequest = _reflection.GeneratedProtocolMessageType('ProfileRequest', (_message.Message,), {
+  'DESCRIPTOR' : _PROFILEREQUEST,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.ProfileRequest)
+  })
+_sym_db.RegisterMessage(ProfileRequest)
+
+ProfileChunk = _reflection.GeneratedProtocolMessageType('ProfileChunk', (_message.Message,), {
+  'DESCRIPTOR' : _PROFILECHUNK,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.ProfileChunk)
+  })
+_sym_db.RegisterMessage(ProfileChunk)
+
+TraceMallocRequest = _reflection.GeneratedProtocolMessageType('TraceMallocRequest', (_message.Message,), {
+  'DESCRIPTOR' : _TRACEMALLOCREQUEST,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.TraceMallocRequest)
+  })
+_sym_db.RegisterMessage(TraceMallocRequest)
+
+Allocation = _reflection.GeneratedProtocolMessageType('Allocation', (_message.Message,), {
+  'DESCRIPTOR' : _ALLOCATION,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.Allocation)
+  })
+_sym_db.RegisterMessage(Allocation)
+
+TraceMallocResponse = _reflection.GeneratedProtocolMessageType('TraceMallocResponse', (_message.Message,), {
+  'DESCRIPTOR' : _TRACEMALLOCRESPONSE,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.TraceMallocResponse)
+  })
+_sym_db.RegisterMessage(TraceMallocResponse)
+
+TaskStacksRequest = _reflection.GeneratedProtocolMessageType('TaskStacksRequest', (_message.Message,), {
+  'DESCRIPTOR' : _TASKSTACKSREQUEST,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.TaskStacksRequest)
+  })
+_sym_db.RegisterMessage(TaskStacksRequest)
+
+TaskStack = _reflection.GeneratedProtocolMessageType('TaskStack', (_message.Message,), {
+  'DESCRIPTOR' : _TASKSTACK,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.TaskStack)
+  })
+_sym_db.RegisterMessage(TaskStack)
+
+TaskStacksResponse = _reflection.GeneratedProtocolMessageType('TaskStacksResponse', (_message.Message,), {
+  'DESCRIPTOR' : _TASKSTACKSRESPONSE,
+  '__module__' : 'admin.admin_pb2'
+  # @@protoc_insertion_point(class_scope:admin.TaskStacksResponse)
+  })
+_sym_db.RegisterMessage(TaskStacksResponse)
+
+_ADMINSERVICE = DESCRIPTOR.services_by_name['AdminService']
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _PROFILER._serialized_start=573
+  _PROFILER._serialized_end=611
+  _PROFILEREQUEST._serialized_start=28
+  _PROFILEREQUEST._serialized_end=147
+  _PROFILECHUNK._serialized_start=149
+  _PROFILECHUNK._serialized_end=177
+  _TRACEMALLOCREQUEST._serialized_start=179
+  _TRACEMALLOCREQUEST._serialized_end=250
+  _ALLOCATION._serialized_start=252
+  _ALLOCATION._serialized_end=311
+  _TRACEMALLOCRESPONSE._serialized_start=313
+  _TRACEMALLOCRESPONSE._serialized_end=419
+  _TASKSTACKSREQUEST._serialized_start=421
+  _TASKSTACKSREQUEST._serialized_end=455
+  _TASKSTACK._serialized_start=457
+  _TASKSTACK._serialized_end=516
+  _TASKSTACKSRESPONSE._serialized_start=518
+  _TASKSTACKSRESPONSE._serialized_end=571
+  _ADMINSERVICE._serialized_start=614
+  _ADMINSERVICE._serialized_end=822
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,135 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+
+from grpc_core.protos.admin import admin_pb2 as admin_dot_admin__pb2
+
+
+class AdminServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Profile = channel.unary_stream(
+                '/admin.AdminService/Profile',
+                request_serializer=admin_dot_admin__pb2.ProfileRequest.SerializeToString,
+                response_deserializer=admin_dot_admin__pb2.ProfileChunk.FromString,
+                )
+        self.TraceMalloc = channel.unary_unary(
+                '/admin.AdminService/TraceMalloc',
+                request_serializer=admin_dot_admin__pb2.TraceMallocRequest.SerializeToString,
+                response_deserializer=admin_dot_admin__pb2.TraceMallocResponse.FromString,
+                )
+        self.TaskStacks = channel.unary_unary(
+                '/admin.AdminService/TaskStacks',
+                request_serializer=admin_dot_admin__pb2.TaskStacksRequest.SerializeToString,
+                response_deserializer=admin_dot_admin__pb2.TaskStacksResponse.FromString,
+                )
+
+
+class AdminServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def Profile(self, request, context):
+        """Профилирует цикл событий сервера duration секунд и возвращает отчет частями
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TraceMalloc(self, request, context):
+        """Самые большие источники выделений памяти по tracemalloc
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TaskStacks(self, request, context):
+        """Стеки текущих задач asyncio
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_AdminServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Profile': grpc.unary_stream_rpc_method_handler(
+                    servicer.Profile,
+                    request_deserializer=admin_dot_admin__pb2.ProfileRequest.FromString,
+                    response_serializer=admin_dot_admin__pb2.ProfileChunk.SerializeToString,
+            ),
+            'TraceMalloc': grpc.unary_unary_rpc_method_handler(
+                    servicer.TraceMalloc,
+                    request_deserializer=admin_dot_admin__pb2.TraceMallocRequest.FromString,
+                    response_serializer=admin_dot_admin__pb2.TraceMallocResponse.SerializeToString,
+            ),
+            'TaskStacks': grpc.unary_unary_rpc_method_handler(
+                    servicer.TaskStacks,
+                    request_deserializer=admin_dot_admin__pb2.TaskStacksRequest.FromString,
+                    response_serializer=admin_dot_admin__pb2.TaskStacksResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'admin.AdminService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class AdminService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def Profile(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/admin.AdminService/Profile',
+            admin_dot_admin__pb2.ProfileRequest.SerializeToString,
+            admin_dot_admin__pb2.ProfileChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def TraceMalloc(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/admin.AdminService/TraceMalloc',
+            admin_dot_admin__pb2.TraceMallocRequest.SerializeToString,
+            admin_dot_admin__pb2.TraceMallocResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def TaskStacks(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/admin.AdminService/TaskStacks',
+            admin_dot_admin__pb2.TaskStacksRequest.SerializeToString,
+            admin_dot_admin__pb2.TaskStacksResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: capture/capture.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15\x63\x61pture/capture.proto\x12\x07\x63\x61pture\"A\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\x12\x14\n\x0c\x62inary_value\x18\x03 \x01(\x0c\"\xfa\x01\n\x0c\x43\x61pturedCall\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x12\n\nstart_time\x18\x02 \x01(\x01\x12\x14\n\x07timeout\x18\x03 \x01(\x01H\x00\x88\x01\x01\x12(\n\x08metadata\x18\x04 \x03(\x0b\x32\x16.capture.MetadataEntry\x12\x10\n\x08requests\x18\x05 \x03(\x0c\x12\x19\n\x11request_streaming\x18\x06 \x01(\x08\x12\x1a\n\x12response_streaming\x18\x07 \x01(\x08\x12\x10\n\x08\x64uration\x18\x08 \x01(\x01\x12\x0c\n\x04\x63ode\x18\t \x01(\t\x12\x11\n\tresponses\x18\n \x01(\x05\x42\n\n\x08_timeoutb\x06proto3')
+
+
+
+_METADATAENTRY = DESCRIPTOR.message_types_by_name['MetadataEntry']
+_CAPTUREDCALL = DESCRIPTOR.message_types_by_name['CapturedCall']
+MetadataEntry = _reflection.GeneratedProtocolMessageType('MetadataEntry', (_message.Message,), {
+  'DESCRIPTOR' : _METADATAENTRY,
+  '__module__' : 'capture.capture_pb2'
+  # @@protoc_insertion_point(class_scope:capture.MetadataEntry)
+  })
+_sym_db.RegisterMessage(MetadataEntry)
+
+CapturedCall = _reflection.GeneratedProtocolMessageType('CapturedCall', (_message.Message,), {
+  'DESCRIPTOR' : _CAPTUREDCALL,
+  '__module__' : 'capture.capture_pb2'
+  # @@protoc_insertion_point(class_scope:capture.CapturedCall)
+  })
+_sym_db.RegisterMessage(CapturedCall)
+
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _METADATAENTRY._serialized_start=34
+  _METADATAENTRY._serialized_end=99
+  _CAPTUREDCALL._serialized_start=102
+  _CAPTUREDCALL._serialized_end=352
+# @@protoc_insertion_point(module_scope)
@@ -14,11 +14,12 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\necho.proto\x12\x04\x65\x63ho\"0\n\x0b\x45\x63hoMessage\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"3\n\x0c\x44\x65layedReply\x12#\n\x08response\x18\x01 \x03(\x0b\x32\x11.echo.EchoMessage2\xb6\x01\n\x0b\x45\x63hoService\x12\x37\n\x0c\x43lientStream\x12\x11.echo.EchoMessage\x1a\x12.echo.DelayedReply(\x01\x12\x36\n\x0cServerStream\x12\x11.echo.EchoMessage\x1a\x11.echo.EchoMessage0\x01\x12\x36\n\nBothStream\x12\x11.echo.EchoMessage\x1a\x11.echo.EchoMessage(\x01\x30\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\necho.proto\x12\x04\x65\x63ho\"\x9d\x01\n\x0b\x45\x63hoMessage\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x07replies\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x15\n\x08interval\x18\x04 \x01(\x01H\x01\x88\x01\x01\x12\x14\n\x0cpayload_size\x18\x05 \x01(\x05\x12\x0f\n\x07payload\x18\x06 \x01(\x0c\x42\n\n\x08_repliesB\x0b\n\t_interval\"S\n\rStreamSummary\x12\x10\n\x08messages\x18\x01 \x01(\x03\x12\r\n\x05\x62ytes\x18\x02 \x01(\x03\x12\x0e\n\x06\x64igest\x18\x03 \x01(\t\x12\x11\n\ttruncated\x18\x04 \x01(\x08\"Y\n\x0c\x44\x65layedReply\x12#\n\x08response\x18\x01 \x03(\x0b\x32\x11.echo.EchoMessage\x12$\n\x07summary\x18\x02 \x01(\x0b\x32\x13.echo.StreamSummary2\xb6\x01\n\x0b\x45\x63hoService\x12\x37\n\x0c\x43lientStream\x12\x11.echo.EchoMessage\x1a\x12.echo.DelayedReply(\x01\x12\x36\n\x0cServerStream\x12\x11.echo.EchoMessage\x1a\x11.echo.EchoMessage0\x01\x12\x36\n\nBothStream\x12\x11.echo.EchoMessage\x1a\x11.echo.EchoMessage(\x01\x30\x01\x62\x06proto3')
 
 
 
 _ECHOMESSAGE = DESCRIPTOR.message_types_by_name['EchoMessage']
+_STREAMSUMMARY = DESCRIPTOR.message_types_by_name['StreamSummary']
 _DELAYEDREPLY = DESCRIPTOR.message_types_by_name['DelayedReply']
 EchoMessage = _reflection.GeneratedProtocolMessageType('EchoMessage', (_message.Message,), {
   'DESCRIPTOR' : _ECHOMESSAGE,
@@ -27,6 +28,13 @@ EchoMessage = _reflection.GeneratedProtocolMessageType('EchoMessage', (_message.
   })
 _sym_db.RegisterMessage(EchoMessage)
 
+StreamSummary = _reflection.GeneratedProtocolMessageType('StreamSummary', (_message.Message,), {
+  'DESCRIPTOR' : _STREAMSUMMARY,
+  '__module__' : 'echo_pb2'
+  # @@protoc_insertion_point(class_scope:echo.StreamSummary)
+  })
+_sym_db.RegisterMessage(StreamSummary)
+
 DelayedReply = _reflection.GeneratedProtocolMessageType('DelayedReply', (_message.Message,), {
   'DESCRIPTOR' : _DELAYEDREPLY,
   '__module__' : 'echo_pb2'
@@ -38,10 +46,12 @@ _ECHOSERVICE = DESCRIPTOR.services_by_name['EchoService']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
-  _ECHOMESSAGE._serialized_start=20
-  _ECHOMESSAGE._serialized_end=68
-  _DELAYEDREPLY._serialized_start=70
-  _DELAYEDREPLY._serialized_end=121
-  _ECHOSERVICE._serialized_start=124
-  _ECHOSERVICE._serialized_end=306
+  _ECHOMESSAGE._serialized_start=21
+  _ECHOMESSAGE._serialized_end=178
+  _STREAMSUMMARY._serialized_start=180
+  _STREAMSUMMARY._serialized_end=263
+  _DELAYEDREPLY._serialized_start=265
+  _DELAYEDREPLY._serialized_end=354
+  _ECHOSERVICE._serialized_start=357
+  _ECHOSERVICE._serialized_end=539
 # @@protoc_insertion_point(module_scope)
@@ -16,7 +16,7 @@ _sym_db = _symbol_database.Default()
 from grpc_core.protos.check import check_pb2 as check_dot_check__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11order/order.proto\x12\x05order\x1a\x11\x63heck/check.proto\"D\n\x05Order\x12\x0c\n\x04uuid\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tcompleted\x18\x03 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x04 \x01(\t\"C\n\x12\x43reateOrderRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\tcompleted\x18\x02 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x03 \x01(\t\"o\n\x13\x43reateOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\" \n\x10ReadOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\"m\n\x11ReadOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\"Q\n\x12UpdateOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tcompleted\x18\x03 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x04 \x01(\t\"o\n\x13UpdateOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\"\"\n\x12\x44\x65leteOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\"c\n\x13\x44\x65leteOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x0f\n\x07success\x18\x02 \x01(\x08\"\x13\n\x11ListOrdersRequest\"o\n\x12ListOrdersResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1c\n\x06orders\x18\x02 \x03(\x0b\x32\x0c.order.Order*n\n\x19OrderNotificationTypeEnum\x12,\n(ORDER_NOTIFICATION_TYPE_ENUM_UNSPECIFIED\x10\x00\x12#\n\x1fORDER_NOTIFICATION_TYPE_ENUM_OK\x10\x01\x32\xb8\x03\n\x0cOrderService\x12\x44\n\x0b\x43reateOrder\x12\x19.order.CreateOrderRequest\x1a\x1a.order.CreateOrderResponse\x12>\n\tReadOrder\x12\x17.order.ReadOrderRequest\x1a\x18.order.ReadOrderResponse\x12\x44\n\x0bUpdateOrder\x12\x19.order.UpdateOrderRequest\x1a\x1a.order.UpdateOrderResponse\x12\x44\n\x0b\x44\x65leteOrder\x12\x19.order.DeleteOrderRequest\x1a\x1a.order.DeleteOrderResponse\x12\x41\n\nListOrders\x12\x18.order.ListOrdersRequest\x1a\x19.order.ListOrdersResponse\x12S\n\x10\x43heckStatusOrder\x12\x1e.check.CheckStatusOrderRequest\x1a\x1f.check.CheckStatusOrderResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11order/order.proto\x12\x05order\x1a\x11\x63heck/check.proto\"D\n\x05Order\x12\x0c\n\x04uuid\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tcompleted\x18\x03 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x04 \x01(\t\"C\n\x12\x43reateOrderRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\tcompleted\x18\x02 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x03 \x01(\t\"o\n\x13\x43reateOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\" \n\x10ReadOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\"m\n\x11ReadOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\"Q\n\x12UpdateOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tcompleted\x18\x03 \x01(\x08\x12\x0c\n\x04\x64\x61te\x18\x04 \x01(\t\"o\n\x13UpdateOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1b\n\x05order\x18\x02 \x01(\x0b\x32\x0c.order.Order\"\"\n\x12\x44\x65leteOrderRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\"c\n\x13\x44\x65leteOrderResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x0f\n\x07success\x18\x02 \x01(\x08\"\x9a\x01\n\x11ListOrdersRequest\x12\x11\n\tdate_from\x18\x01 \x01(\t\x12\x0f\n\x07\x64\x61te_to\x18\x02 \x01(\t\x12\x16\n\tcompleted\x18\x03 \x01(\x08H\x00\x88\x01\x01\x12\r\n\x05limit\x18\x04 \x01(\x05\x12\x12\n\npage_token\x18\x05 \x01(\t\x12\x18\n\x10include_archived\x18\x06 \x01(\x08\x42\x0c\n\n_completed\"\x88\x01\n\x12ListOrdersResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\x1c\n\x06orders\x18\x02 \x03(\x0b\x32\x0c.order.Order\x12\x17\n\x0fnext_page_token\x18\x03 \x01(\t\"G\n\x13SearchOrdersRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x12\n\npage_token\x18\x03 \x01(\t\"Z\n\x14SearchOrdersResponse\x12\x1b\n\x05order\x18\x01 \x01(\x0b\x32\x0c.order.Order\x12\x0c\n\x04rank\x18\x02 \x01(\x01\x12\x17\n\x0fnext_page_token\x18\x03 \x01(\t\":\n\x14GetOrderStatsRequest\x12\x11\n\tdate_from\x18\x01 \x01(\t\x12\x0f\n\x07\x64\x61te_to\x18\x02 \x01(\t\"O\n\rOrderDayStats\x12\x0b\n\x03\x64\x61y\x18\x01 \x01(\t\x12\r\n\x05total\x18\x02 \x01(\x03\x12\x11\n\tcompleted\x18\x03 \x01(\x03\x12\x0f\n\x07pending\x18\x04 \x01(\x03\"\xab\x01\n\x15GetOrderStatsResponse\x12;\n\x11notification_type\x18\x01 \x01(\x0e\x32 .order.OrderNotificationTypeEnum\x12\r\n\x05total\x18\x02 \x01(\x03\x12\x11\n\tcompleted\x18\x03 \x01(\x03\x12\x0f\n\x07pending\x18\x04 \x01(\x03\x12\"\n\x04\x64\x61ys\x18\x05 \x03(\x0b\x32\x14.order.OrderDayStats*n\n\x19OrderNotificationTypeEnum\x12,\n(ORDER_NOTIFICATION_TYPE_ENUM_UNSPECIFIED\x10\x00\x12#\n\x1fORDER_NOTIFICATION_TYPE_ENUM_OK\x10\x01\x32\xcf\x04\n\x0cOrderService\x12\x44\n\x0b\x43reateOrder\x12\x19.order.CreateOrderRequest\x1a\x1a.order.CreateOrderResponse\x12>\n\tReadOrder\x12\x17.order.ReadOrderRequest\x1a\x18.order.ReadOrderResponse\x12\x44\n\x0bUpdateOrder\x12\x19.order.UpdateOrderRequest\x1a\x1a.order.UpdateOrderResponse\x12\x44\n\x0b\x44\x65leteOrder\x12\x19.order.DeleteOrderRequest\x1a\x1a.order.DeleteOrderResponse\x12\x41\n\nListOrders\x12\x18.order.ListOrdersRequest\x1a\x19.order.ListOrdersResponse\x12I\n\x0cSearchOrders\x12\x1a.order.SearchOrdersRequest\x1a\x1b.order.SearchOrdersResponse0\x01\x12J\n\rGetOrderStats\x12\x1b.order.GetOrderStatsRequest\x1a\x1c.order.GetOrderStatsResponse\x12S\n\x10\x43heckStatusOrder\x12\x1e.check.CheckStatusOrderRequest\x1a\x1f.check.CheckStatusOrderResponseb\x06proto3')
 
 _ORDERNOTIFICATIONTYPEENUM = DESCRIPTOR.enum_types_by_name['OrderNotificationTypeEnum']
 OrderNotificationTypeEnum = enum_type_wrapper.EnumTypeWrapper(_ORDERNOTIFICATIONTYPEENUM)
@@ -35,6 +35,11 @@ _DELETEORDERREQUEST = DESCRIPTOR.message_types_by_name['DeleteOrderRequest']
 _DELETEORDERRESPONSE = DESCRIPTOR.message_types_by_name['DeleteOrderResponse']
 _LISTORDERSREQUEST = DESCRIPTOR.message_types_by_name['ListOrdersRequest']
 _LISTORDERSRESPONSE = DESCRIPTOR.message_types_by_name['ListOrdersResponse']
+_SEARCHORDERSREQUEST = DESCRIPTOR.message_types_by_name['SearchOrdersRequest']
+_SEARCHORDERSRESPONSE = DESCRIPTOR.message_types_by_name['SearchOrdersResponse']
+_GETORDERSTATSREQUEST = DESCRIPTOR.message_types_by_name['GetOrderStatsRequest']
+_ORDERDAYSTATS = DESCRIPTOR.message_types_by_name['OrderDayStats']
+_GETORDERSTATSRESPONSE = DESCRIPTOR.message_types_by_name['GetOrderStatsResponse']
 Order = _reflection.GeneratedProtocolMessageType('Order', (_message.Message,), {
   'DESCRIPTOR' : _ORDER,
   '__module__' : 'order.order_pb2'
@@ -112,12 +117,47 @@ ListOrdersResponse = _reflection.GeneratedProtocolMessageType('ListOrdersRespons
   })
 _sym_db.RegisterMessage(ListOrdersResponse)
 
+SearchOrdersRequest = _reflection.GeneratedProtocolMessageType('SearchOrdersRequest', (_message.Message,), {
+  'DESCRIPTOR' : _SEARCHORDERSREQUEST,
+  '__module__' : 'order.order_pb2'
+  # @@protoc_insertion_point(class_scope:order.SearchOrdersRequest)
+  })
+_sym_db.RegisterMessage(SearchOrdersRequest)
+
+SearchOrdersResponse = _reflection.GeneratedProtocolMessageType('SearchOrdersResponse', (_message.Message,), {
+  'DESCRIPTOR' : _SEARCHORDERSRESPONSE,
+  '__module__' : 'order.order_pb2'
+  # @@protoc_insertion_point(class_scope:order.SearchOrdersResponse)
+  })
+_sym_db.RegisterMessage(SearchOrdersResponse)
+
+GetOrderStatsRequest = _reflection.GeneratedProtocolMessageType('GetOrderStatsRequest', (_message.Message,), {
+  'DESCRIPTOR' : _GETORDERSTATSREQUEST,
+  '__module__' : 'order.order_pb2'
+  # @@protoc_insertion_point(class_scope:order.GetOrderStatsRequest)
+  })
+_sym_db.RegisterMessage(GetOrderStatsRequest)
+
+OrderDayStats = _reflection.GeneratedProtocolMessageType('OrderDayStats', (_message.Message,), {
+  'DESCRIPTOR' : _ORDERDAYSTATS,
+  '__module__' : 'order.order_pb2'
+  # @@protoc_insertion_point(class_scope:order.OrderDayStats)
+  })
+_sym_db.RegisterMessage(OrderDayStats)
+
+GetOrderStatsResponse = _reflection.GeneratedProtocolMessageType('GetOrderStatsResponse', (_message.Message,), {
+  'DESCRIPTOR' : _GETORDERSTATSRESPONSE,
+  '__module__' : 'order.order_pb2'
+  # @@protoc_insertion_point(class_scope:order.GetOrderStatsResponse)
+  })
+_sym_db.RegisterMessage(GetOrderStatsResponse)
+
 _ORDERSERVICE = DESCRIPTOR.services_by_name['OrderService']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
-  _ORDERNOTIFICATIONTYPEENUM._serialized_start=911
-  _ORDERNOTIFICATIONTYPEENUM._serialized_end=1021
+  _ORDERNOTIFICATIONTYPEENUM._serialized_start=1553
+  _ORDERNOTIFICATIONTYPEENUM._serialized_end=1663
   _ORDER._serialized_start=47
   _ORDER._serialized_end=115
   _CREATEORDERREQUEST._serialized_start=117
@@ -136,10 +176,20 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _DELETEORDERREQUEST._serialized_end=674
   _DELETEORDERRESPONSE._serialized_start=676
   _DELETEORDERRESPONSE._serialized_end=775
-  _LISTORDERSREQUEST._serialized_start=777
-  _LISTORDERSREQUEST._serialized_end=796
-  _LISTORDERSRESPONSE._serialized_start=798
-  _LISTORDERSRESPONSE._serialized_end=909
-  _ORDERSERVICE._serialized_start=1024
-  _ORDERSERVICE._serialized_end=1464
+  _LISTORDERSREQUEST._serialized_start=778
+  _LISTORDERSREQUEST._serialized_end=932
+  _LISTORDERSRESPONSE._serialized_start=935
+  _LISTORDERSRESPONSE._serialized_end=1071
+  _SEARCHORDERSREQUEST._serialized_start=1073
+  _SEARCHORDERSREQUEST._serialized_end=1144
+  _SEARCHORDERSRESPONSE._serialized_start=1146
+  _SEARCHORDERSRESPONSE._serialized_end=1236
+  _GETORDERSTATSREQUEST._serialized_start=1238
+  _GETORDERSTATSREQUEST._serialized_end=1296
+  _ORDERDAYSTATS._serialized_start=1298
+  _ORDERDAYSTATS._serialized_end=1377
+  _GETORDERSTATSRESPONSE._serialized_start=1380
+  _GETORDERSTATSRESPONSE._serialized_end=1551
+  _ORDERSERVICE._serialized_start=1666
+  _ORDERSERVICE._serialized_end=2257
 # @@protoc_insertion_point(module_scope)
@@ -92,13 +92,81 @@ class DeleteOrderResponse(_message.Message):
     def __init__(self, notification_type: _Optional[_Union[OrderNotificationTypeEnum, str]] = ..., success: bool = ...) -> None: ...
 
 class ListOrdersRequest(_message.Message):
-    __slots__ = ()
-    def __init__(self) -> None: ...
+    __slots__ = ("date_from", "date_to", "completed", "limit", "page_token", "include_archived")
+    DATE_FROM_FIELD_NUMBER: _ClassVar[int]
+    DATE_TO_FIELD_NUMBER: _ClassVar[int]
+    COMPLETED_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    INCLUDE_ARCHIVED_FIELD_NUMBER: _ClassVar[int]
+    date_from: str
+    date_to: str
+    completed: bool
+    limit: int
+    page_token: str
+    include_archived: bool
+    def __init__(self, date_from: _Optional[str] = ..., date_to: _Optional[str] = ..., completed: bool = ..., limit: _Optional[int] = ..., page_token: _Optional[str] = ..., include_archived: bool = ...) -> None: ...
 
 class ListOrdersResponse(_message.Message):
-    __slots__ = ("notification_type", "orders")
+    __slots__ = ("notification_type", "orders", "next_page_token")
     NOTIFICATION_TYPE_FIELD_NUMBER: _ClassVar[int]
     ORDERS_FIELD_NUMBER: _ClassVar[int]
+    NEXT_PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
     notification_type: OrderNotificationTypeEnum
     orders: _containers.RepeatedCompositeFieldContainer[Order]
-    def __init__(self, notification_type: _Optional[_Union[OrderNotificationTypeEnum, str]] = ..., orders: _Optional[_Iterable[_Union[Order, _Mapping]]] = ...) -> None: ...
+    next_page_token: str
+    def __init__(self, notification_type: _Optional[_Union[OrderNotificationTypeEnum, str]] = ..., orders: _Optional[_Iterable[_Union[Order, _Mapping]]] = ..., next_page_token: _Optional[str] = ...) -> None: ...
+
+class SearchOrdersRequest(_message.Message):
+    __slots__ = ("query", "limit", "page_token")
+    QUERY_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    query: str
+    limit: int
+    page_token: str
+    def __init__(self, query: _Optional[str] = ..., limit: _Optional[int] = ..., page_token: _Optional[str] = ...) -> None: ...
+
+class SearchOrdersResponse(_message.Message):
+    __slots__ = ("order", "rank", "next_page_token")
+    ORDER_FIELD_NUMBER: _ClassVar[int]
+    RANK_FIELD_NUMBER: _ClassVar[int]
+    NEXT_PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    order: Order
+    rank: float
+    next_page_token: str
+    def __init__(self, order: _Optional[_Union[Order, _Mapping]] = ..., rank: _Optional[float] = ..., next_page_token: _Optional[str] = ...) -> None: ...
+
+class GetOrderStatsRequest(_message.Message):
+    __slots__ = ("date_from", "date_to")
+    DATE_FROM_FIELD_NUMBER: _ClassVar[int]
+    DATE_TO_FIELD_NUMBER: _ClassVar[int]
+    date_from: str
+    date_to: str
+    def __init__(self, date_from: _Optional[str] = ..., date_to: _Optional[str] = ...) -> None: ...
+
+class OrderDayStats(_message.Message):
+    __slots__ = ("day", "total", "completed", "pending")
+    DAY_FIELD_NUMBER: _ClassVar[int]
+    TOTAL_FIELD_NUMBER: _ClassVar[int]
+    COMPLETED_FIELD_NUMBER: _ClassVar[int]
+    PENDING_FIELD_NUMBER: _ClassVar[int]
+    day: str
+    total: int
+    completed: int
+    pending: int
+    def __init__(self, day: _Optional[str] = ..., total: _Optional[int] = ..., completed: _Optional[int] = ..., pending: _Optional[int] = ...) -> None: ...
+
+class GetOrderStatsResponse(_message.Message):
+    __slots__ = ("notification_type", "total", "completed", "pending", "days")
+    NOTIFICATION_TYPE_FIELD_NUMBER: _ClassVar[int]
+    TOTAL_FIELD_NUMBER: _ClassVar[int]
+    COMPLETED_FIELD_NUMBER: _ClassVar[int]
+    PENDING_FIELD_NUMBER: _ClassVar[int]
+    DAYS_FIELD_NUMBER: _ClassVar[int]
+    notification_type: OrderNotificationTypeEnum
+    total: int
+    completed: int
+    pending: int
+    days: _containers.RepeatedCompositeFieldContainer[OrderDayStats]
+    def __init__(self, notification_type: _Optional[_Union[OrderNotificationTypeEnum, str]] = ..., total: _Optional[int] = ..., completed: _Optional[int] = ..., pending: _Optional[int] = ..., days: _Optional[_Iterable[_Union[OrderDayStats, _Mapping]]] = ...) -> None: ...
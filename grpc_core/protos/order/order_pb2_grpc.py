@@ -40,6 +40,16 @@ class OrderServiceStub(object):
                 request_serializer=order_dot_order__pb2.ListOrdersRequest.SerializeToString,
                 response_deserializer=order_dot_order__pb2.ListOrdersResponse.FromString,
                 )
+        self.SearchOrders = channel.unary_stream(
+                '/order.OrderService/SearchOrders',
+                request_serializer=order_dot_order__pb2.SearchOrdersRequest.SerializeToString,
+                response_deserializer=order_dot_order__pb2.SearchOrdersResponse.FromString,
+                )
+        self.GetOrderStats = channel.unary_unary(
+                '/order.OrderService/GetOrderStats',
+                request_serializer=order_dot_order__pb2.GetOrderStatsRequest.SerializeToString,
+                response_deserializer=order_dot_order__pb2.GetOrderStatsResponse.FromString,
+                )
         self.CheckStatusOrder = channel.unary_unary(
                 '/order.OrderService/CheckStatusOrder',
                 request_serializer=check_dot_check__pb2.CheckStatusOrderRequest.SerializeToString,
@@ -80,6 +90,18 @@ class OrderServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SearchOrders(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetOrderStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def CheckStatusOrder(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -114,6 +136,16 @@ def add_OrderServiceServicer_to_server(servicer, server):
                     request_deserializer=order_dot_order__pb2.ListOrdersRequest.FromString,
                     response_serializer=order_dot_order__pb2.ListOrdersResponse.SerializeToString,
             ),
+            'SearchOrders': grpc.unary_stream_rpc_method_handler(
+                    servicer.SearchOrders,
+                    request_deserializer=order_dot_order__pb2.SearchOrdersRequest.FromString,
+                    response_serializer=order_dot_order__pb2.SearchOrdersResponse.SerializeToString,
+            ),
+            'GetOrderStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetOrderStats,
+                    request_deserializer=order_dot_order__pb2.GetOrderStatsRequest.FromString,
+                    response_serializer=order_dot_order__pb2.GetOrderStatsResponse.SerializeToString,
+            ),
             'CheckStatusOrder': grpc.unary_unary_rpc_method_handler(
                     servicer.CheckStatusOrder,
                     request_deserializer=check_dot_check__pb2.CheckStatusOrderRequest.FromString,
@@ -214,6 +246,40 @@ class OrderService(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def SearchOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/order.OrderService/SearchOrders',
+            order_dot_order__pb2.SearchOrdersRequest.SerializeToString,
+            order_dot_order__pb2.SearchOrdersResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetOrderStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderService/GetOrderStats',
+            order_dot_order__pb2.GetOrderStatsRequest.SerializeToString,
+            order_dot_order__pb2.GetOrderStatsResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def CheckStatusOrder(request,
             target,
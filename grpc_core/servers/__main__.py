@@ -0,0 +1,43 @@
+"""
+Самостоятельный запуск gRPC сервера, отдельно от HTTP шлюза FastAPI.
+
+Сервер получает собственный цикл событий (стандартный asyncio или uvloop) и масштабируется числом
+процессов независимо от шлюза. При --workers 1 сервер работает в текущем процессе, иначе процессы
+запускает и перезапускает WorkerSupervisor. SIGTERM и SIGINT останавливают сервер, дожидаясь
+выполняющихся запросов до GRPC_SHUTDOWN_GRACE секунд.
+
+Шлюз при этом запускается с GRPC_EMBEDDED=false: python main.py
+
+Запуск:
+    python -m grpc_core.servers --workers 4 --loop uvloop
+"""
+import argparse
+from functools import partial
+
+from grpc_core.logger import setup_logging
+from grpc_core.servers.workers import WorkerSupervisor, run_worker
+from settings import settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.servers', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--workers', type=int, default=settings.GRPC_WORKERS, help='число процессов сервера')
+    parser.add_argument(
+        '--loop', choices=('asyncio', 'uvloop'), default=settings.GRPC_EVENT_LOOP, help='реализация цикла событий'
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers должно быть не меньше 1')
+
+    if args.workers == 1:
+        run_worker(0, event_loop=args.loop)
+    else:
+        # Рабочие процессы настраивают логирование сами в run_worker
+        setup_logging()
+        WorkerSupervisor(args.workers, target=partial(run_worker, event_loop=args.loop, reuse_port=True)).run()
+
+
+if __name__ == '__main__':
+    main()
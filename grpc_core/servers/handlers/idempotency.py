@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import json
+import time
+import typing as t
+
+from loguru import logger
+from pydantic import BaseModel
+
+from models.idempotency import IdempotencyKey
+from settings import settings
+
+ResponseT = t.TypeVar('ResponseT', bound=BaseModel)
+
+# Значение response зарезервированного ключа, операция по которому еще выполняется
+PENDING = ''
+# Интервал опроса БД в ожидании ответа, который формирует другой процесс
+PENDING_POLL_INTERVAL = 0.05
+# Столбцы, добавленные после создания таблицы: (имя, определение для ALTER TABLE)
+MIGRATED_COLUMNS = (
+    ('request_hash', "VARCHAR(64) NOT NULL DEFAULT ''"),
+    ('resource', "VARCHAR(255) NOT NULL DEFAULT ''"),
+)
+
+
+class IdempotencyKeyMismatchError(ValueError):
+    """ Ключ идемпотентности уже использован запросом с другими параметрами. """
+
+
+class IdempotencyHandler:
+    """
+    Обеспечивает идемпотентность мутирующих запросов по ключу, переданному клиентом.
+
+    Ответ на первый запрос с данным ключом сохраняется в таблице IdempotencyKey и возвращается
+    на все повторы в течение IDEMPOTENCY_KEY_TTL секунд без повторного выполнения операции.
+    Одновременные запросы с одинаковым ключом схлопываются в памяти процесса: операцию выполняет
+    только первый из них, остальные дожидаются его результата и не обращаются к БД.
+
+    Процессы сервера (см. grpc_core.servers.workers) не разделяют память, поэтому перед выполнением
+    операции ключ резервируется в БД строкой с пустым ответом. Запрос с тем же ключом в другом процессе
+    не выполняет операцию, а ждет, пока в строке появится ответ. Резерв, не заполненный за
+    IDEMPOTENCY_PENDING_TIMEOUT секунд (например, процесс завершился аварийно или не смог сохранить ответ),
+    считается брошенным.
+
+    Ключ привязан к запросу: вместе с ним хранится хеш параметров запроса (request_hash), и запрос с тем же
+    ключом, но другими параметрами отклоняется IdempotencyKeyMismatchError, а не получает чужой ответ.
+    В резерве записан и идентификатор создаваемого ресурса (resource). Запрос, занявший брошенный резерв,
+    сначала ищет ресурс с этим идентификатором (recover) и выполняет операцию только если его нет, причем
+    с тем же идентификатором: операция, успевшая выполниться до сбоя, не выполняется второй раз.
+
+    Атрибуты:
+    ---------
+    _in_flight : dict[str, tuple[str, asyncio.Future]]
+        Выполняющиеся в данный момент операции по ключу идемпотентности и хеш их запроса.
+    _purged_at : float
+        Время последней очистки просроченных ключей.
+    """
+    _in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+    _purged_at: float = float('-inf')
+
+    @classmethod
+    async def create_table(cls) -> None:
+        """
+        Создает таблицу IdempotencyKey или добавляет в существующую недостающие столбцы.
+        """
+        await IdempotencyKey.create_table(if_not_exists=True)
+        columns = {row['name'] for row in await IdempotencyKey.raw('PRAGMA table_info(idempotency_key)')}
+        for column, definition in MIGRATED_COLUMNS:
+            if column not in columns:
+                await IdempotencyKey.raw(f'ALTER TABLE idempotency_key ADD COLUMN {column} {definition}')
+
+    @staticmethod
+    def request_hash(request: dict) -> str:
+        """
+        Хеш параметров запроса, не зависящий от порядка ключей.
+        """
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    @classmethod
+    async def execute(
+            cls,
+            key: str,
+            request_hash: str,
+            resource: str,
+            operation: t.Callable[[str], t.Awaitable[ResponseT]],
+            recover: t.Callable[[str], t.Awaitable[t.Optional[ResponseT]]],
+            response_model: t.Type[ResponseT],
+    ) -> ResponseT:
+        """
+        Выполняет операцию не более одного раза для указанного ключа.
+
+        Параметры:
+        ----------
+        key : str
+            Ключ идемпотентности, переданный клиентом.
+        request_hash : str
+            Хеш параметров запроса (request_hash).
+        resource : str
+            Идентификатор ресурса, который создаст операция, если ключ еще не использован.
+        operation : Callable[[str], Awaitable[BaseModel]]
+            Фабрика корутины, выполняющей операцию для идентификатора ресурса и возвращающей ответ.
+        recover : Callable[[str], Awaitable[BaseModel | None]]
+            Фабрика корутины, возвращающей ответ по уже созданному ресурсу или None, если ресурса нет.
+        response_model : type[BaseModel]
+            Модель ответа, используемая для восстановления сохраненного результата.
+
+        Возвращает:
+        -----------
+        BaseModel
+            Результат первого выполнения операции с данным ключом.
+
+        Исключения:
+        -----------
+        IdempotencyKeyMismatchError
+            Ключ уже использован запросом с другими параметрами.
+        """
+        if (in_flight := cls._in_flight.get(key)) is not None:
+            cls._check_hash(key, in_flight[0], request_hash)
+            logger.info('Запрос с ключом идемпотентности {} уже выполняется, ожидаем результат', key)
+            return await asyncio.shield(in_flight[1])
+
+        future = asyncio.get_running_loop().create_future()
+        cls._in_flight[key] = (request_hash, future)
+        try:
+            response, resource, abandoned = await cls._claim_or_load(key, request_hash, resource, response_model)
+            if response is None:
+                try:
+                    # Операция брошенного резерва могла выполниться до сбоя
+                    if abandoned:
+                        response = await recover(resource)
+                    if response is None:
+                        response = await operation(resource)
+                except BaseException:
+                    # Снимаем резерв, чтобы повтор запроса мог выполнить операцию заново
+                    await asyncio.shield(cls._release(key))
+                    raise
+                await cls._save(key, request_hash, resource, response)
+            else:
+                logger.info('Повтор запроса с ключом идемпотентности {}, возвращаем сохраненный ответ', key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение будет выброшено в текущем вызове, ожидающих запросов может и не быть
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            del cls._in_flight[key]
+
+    @staticmethod
+    def _check_hash(key: str, stored: str, request_hash: str) -> None:
+        # Ключи, сохраненные до появления request_hash, хеша не содержат
+        if stored and stored != request_hash:
+            raise IdempotencyKeyMismatchError(
+                f'Ключ идемпотентности {key!r} уже использован запросом с другими параметрами'
+            )
+
+    @classmethod
+    async def _claim_or_load(
+            cls, key: str, request_hash: str, resource: str, response_model: t.Type[ResponseT]
+    ) -> tuple[t.Optional[ResponseT], str, bool]:
+        """
+        Резервирует ключ за текущим запросом или возвращает сохраненный ответ.
+
+        Возвращает (ответ, None, False), если ответ уже сохранен, и (None, идентификатор ресурса, брошен ли
+        резерв), если ключ зарезервирован и операцию нужно выполнить. Если операцию по ключу выполняет
+        другой процесс, ожидает появления ответа в БД.
+        """
+        while True:
+            if await cls._claim(key, request_hash, resource):
+                return None, resource, False
+            row = await IdempotencyKey.select(
+                IdempotencyKey.response, IdempotencyKey.created_at, IdempotencyKey.request_hash,
+                IdempotencyKey.resource,
+            ).where(IdempotencyKey.key == key).first()
+            if row is None:
+                # Резерв сняли между вставкой и чтением, пробуем занять ключ снова
+                continue
+            if row['response'] != PENDING and row['created_at'] < cls._expires_before():
+                await cls._delete(key, created_at=row['created_at'])
+                continue
+            cls._check_hash(key, row['request_hash'], request_hash)
+            if row['response'] != PENDING:
+                return response_model(**json.loads(row['response'])), None, False
+            if row['created_at'] < int(time.time()) - settings.IDEMPOTENCY_PENDING_TIMEOUT:
+                if await cls._take_over(key, request_hash, row['created_at']):
+                    logger.warning('Резерв ключа идемпотентности {} не заполнен вовремя, занимаем его', key)
+                    # Резерв без ресурса записан до появления столбца resource
+                    return None, row['resource'] or resource, bool(row['resource'])
+            else:
+                await asyncio.sleep(PENDING_POLL_INTERVAL)
+
+    @staticmethod
+    async def _claim(key: str, request_hash: str, resource: str) -> bool:
+        inserted = await IdempotencyKey.insert(
+            IdempotencyKey(
+                key=key, response=PENDING, created_at=int(time.time()), request_hash=request_hash, resource=resource
+            )
+        ).on_conflict(action='DO NOTHING')
+        return bool(inserted)
+
+    @staticmethod
+    async def _take_over(key: str, request_hash: str, created_at: int) -> bool:
+        # Условие по created_at: брошенный резерв занимает только один из повторов
+        updated = await IdempotencyKey.update(
+            {IdempotencyKey.created_at: int(time.time()), IdempotencyKey.request_hash: request_hash}
+        ).where(
+            (IdempotencyKey.key == key) & (IdempotencyKey.response == PENDING) & (IdempotencyKey.created_at == created_at)
+        ).returning(IdempotencyKey.key)
+        return bool(updated)
+
+    @staticmethod
+    async def _release(key: str) -> None:
+        await IdempotencyKey.delete().where(
+            (IdempotencyKey.key == key) & (IdempotencyKey.response == PENDING)
+        )
+
+    @staticmethod
+    async def _delete(key: str, created_at: int) -> None:
+        # Условие по created_at не дает удалить строку, которую уже успел перезаписать другой процесс
+        await IdempotencyKey.delete().where(
+            (IdempotencyKey.key == key) & (IdempotencyKey.created_at == created_at)
+        )
+
+    @classmethod
+    async def _save(cls, key: str, request_hash: str, resource: str, response: BaseModel) -> None:
+        await cls._purge_expired()
+        # Заполняем резерв ответом; upsert на случай, если резерв успели удалить как брошенный.
+        # Если запись не удалась, резерв остается незаполненным, и повтор после IDEMPOTENCY_PENDING_TIMEOUT
+        # найдет созданный ресурс через recover
+        row = IdempotencyKey(
+            key=key,
+            response=json.dumps(response.dict(exclude_none=True)),
+            created_at=int(time.time()),
+            request_hash=request_hash,
+            resource=resource,
+        )
+        await IdempotencyKey.insert(row).on_conflict(
+            target=IdempotencyKey.key,
+            action='DO UPDATE',
+            values=[IdempotencyKey.response, IdempotencyKey.created_at, IdempotencyKey.request_hash],
+        )
+
+    @classmethod
+    async def _purge_expired(cls) -> None:
+        # Удаляем просроченные ключи не чаще одного раза за период TTL, чтобы не нагружать запись
+        now = time.monotonic()
+        if now - cls._purged_at < settings.IDEMPOTENCY_KEY_TTL:
+            return
+        cls._purged_at = now
+        await IdempotencyKey.delete().where(IdempotencyKey.created_at < cls._expires_before())
+
+    @staticmethod
+    def _expires_before() -> int:
+        return int(time.time()) - settings.IDEMPOTENCY_KEY_TTL
@@ -2,51 +2,194 @@ import datetime
 
 from loguru import logger
 
-from models.order import Order
-from grpc_core.servers.schemas.order import (OrderResponse, OrderCreateResponse, OrderListResponse, OrderReadResponse,
-                                             OrderDeleteResponse)
+from grpc_core.servers.repositories.order import get_order_repository
+from grpc_core.servers.repositories.schema import date_to_micros, search_terms
+from grpc_core.servers.schemas.order import (OrderResponse, OrderCreateResponse, OrderListRequest, OrderListResponse,
+                                             OrderReadResponse, OrderDeleteResponse, OrderSearchRequest,
+                                             OrderSearchResponse, OrderSearchResult, OrderStatsRequest,
+                                             OrderStatsResponse, OrderDayStats)
+from settings import settings
+
+
+class OrderNotFoundError(LookupError):
+    """ Заказа с таким uuid нет ни среди текущих, ни в архиве. """
+
+
+class OrderArchivedError(ValueError):
+    """ Заказ перенесен в архив и не изменяется (архив только для чтения и удаления). """
+
+
+def _parse_date(name: str, value: str) -> int | None:
+    if not value:
+        return None
+    micros = date_to_micros(value)
+    if micros is None:
+        raise ValueError(f'Неверная дата {name}: {value!r}')
+    return micros
+
+
+def _parse_page_token(token: str) -> tuple[int, str] | None:
+    # Токен страницы - ключ (timestamp, uuid) последнего заказа предыдущей страницы
+    if not token:
+        return None
+    timestamp, _, uuid = token.partition(':')
+    try:
+        return int(timestamp), uuid
+    except ValueError:
+        raise ValueError(f'Неверный page_token: {token!r}') from None
+
+
+def _parse_day(name: str, value: str) -> str | None:
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f'Неверная дата {name}: {value!r}, ожидается YYYY-MM-DD') from None
+
+
+def _parse_search_page_token(token: str) -> int:
+    # Токен страницы поиска - число уже выданных результатов
+    if not token:
+        return 0
+    if not token.isdigit():
+        raise ValueError(f'Неверный page_token: {token!r}')
+    return int(token)
 
 
 class OrderHandler:
+    """
+    Операции с заказами поверх хранилища процесса (get_order_repository, настройка ORDER_STORAGE).
+    """
     def __init__(self):
         pass
 
     @staticmethod
-    async def list_orders():
-        orders = await Order.select()
-        logger.success(f'List orders: {orders}')
+    async def list_orders(request: OrderListRequest | None = None):
+        """
+        Все заказы или, если в request есть фильтры, страница заказов по диапазону дат и статусу
+        в порядке даты. Архивные заказы включаются, если задан include_archived. Неверная дата
+        или page_token - ValueError.
+        """
+        next_page_token = ''
+        include_archived = request is not None and request.include_archived
+        if request is None or not request.filtered:
+            orders = await get_order_repository().list(include_archived=include_archived)
+        else:
+            orders = await get_order_repository().query(
+                date_from=_parse_date('date_from', request.date_from),
+                date_to=_parse_date('date_to', request.date_to),
+                completed=request.completed,
+                after=_parse_page_token(request.page_token),
+                limit=request.limit,
+                include_archived=include_archived,
+            )
+            if request.limit and len(orders) == request.limit:
+                next_page_token = f"{orders[-1]['timestamp']}:{orders[-1]['uuid']}"
+        logger.success('List orders: {} orders', len(orders))
         response = OrderListResponse(
-            orders=[OrderResponse(**order) for order in orders]
+            orders=[OrderResponse(**order) for order in orders],
+            next_page_token=next_page_token,
         )
         return response
 
+    @staticmethod
+    async def search_orders(request: OrderSearchRequest) -> OrderSearchResponse:
+        """
+        Страница результатов поиска по названию в порядке релевантности. limit 0 - ORDER_SEARCH_DEFAULT_LIMIT,
+        больше ORDER_SEARCH_MAX_LIMIT - ORDER_SEARCH_MAX_LIMIT. Запрос без слов, отрицательный limit
+        или неверный page_token - ValueError.
+        """
+        if request.limit < 0:
+            raise ValueError(f'Неверный limit: {request.limit}')
+        terms = search_terms(request.query)
+        limit = min(request.limit or settings.ORDER_SEARCH_DEFAULT_LIMIT, settings.ORDER_SEARCH_MAX_LIMIT)
+        offset = _parse_search_page_token(request.page_token)
+        # Лишняя строка показывает, есть ли следующая страница
+        orders = await get_order_repository().search(terms, limit + 1, offset)
+        next_page_token = str(offset + limit) if len(orders) > limit else ''
+        logger.success('Search orders: {} orders', min(len(orders), limit))
+        return OrderSearchResponse(
+            results=[OrderSearchResult(order=OrderResponse(**order), rank=order['rank']) for order in orders[:limit]],
+            next_page_token=next_page_token,
+        )
+
+    @staticmethod
+    async def get_order_stats(request: OrderStatsRequest) -> OrderStatsResponse:
+        """
+        Число всех, выполненных и невыполненных заказов и гистограмма по дням UTC в [date_from, date_to).
+        Неверная дата - ValueError.
+        """
+        stats = await get_order_repository().stats(
+            day_from=_parse_day('date_from', request.date_from),
+            day_to=_parse_day('date_to', request.date_to),
+        )
+        logger.success('Order stats: {} orders, {} days', stats['total'], len(stats['days']))
+        return OrderStatsResponse(
+            total=stats['total'],
+            completed=stats['completed'],
+            pending=stats['total'] - stats['completed'],
+            days=[OrderDayStats(**day, pending=day['total'] - day['completed']) for day in stats['days']],
+        )
+
     @staticmethod
     async def create_order(request):
-        order = await Order.insert(Order(**request.dict()))
-        logger.success(f'Created order: {order}')
+        order = await get_order_repository().insert(request.dict())
+        logger.success('Created order: {}', order['uuid'])
         response = OrderCreateResponse(
-            order=OrderResponse(**order[0])
+            order=OrderResponse(**order)
         )
         return response
 
+    @staticmethod
+    async def created_order(uuid: str) -> OrderCreateResponse | None:
+        """
+        Ответ CreateOrder по уже созданному заказу или None, если заказа нет (см. IdempotencyHandler).
+        """
+        repository = get_order_repository()
+        order = await repository.get(uuid) or await repository.get_archived(uuid)
+        return OrderCreateResponse(order=OrderResponse(**order)) if order is not None else None
+
     @staticmethod
     async def read_order(request):
-        order = await Order.select().where(Order.uuid == request.uuid).first()
-        logger.success(f'Read order: {order}')
+        """
+        Заказ по uuid среди текущих или в архиве; OrderNotFoundError, если заказа нет.
+        """
+        repository = get_order_repository()
+        # Выполненный заказ мог быть перенесен в архив
+        order = await repository.get(request.uuid) or await repository.get_archived(request.uuid)
+        if order is None:
+            raise OrderNotFoundError(f'Заказ {request.uuid} не найден')
+        logger.success('Read order: {}', request.uuid)
         response = OrderReadResponse(order=OrderResponse(**order))
         return response
 
+    @staticmethod
+    async def _update(uuid: str, values: dict) -> dict:
+        # Изменяет текущий заказ; OrderArchivedError, если заказ в архиве, и OrderNotFoundError, если его нет
+        repository = get_order_repository()
+        order = await repository.update(uuid, values)
+        if order is not None:
+            return order
+        if await repository.get_archived(uuid) is not None:
+            raise OrderArchivedError(f'Заказ {uuid} перенесен в архив и не может быть изменен')
+        raise OrderNotFoundError(f'Заказ {uuid} не найден')
+
     @staticmethod
     async def update_order(request):
-        await Order.update(
+        """
+        Изменяет текущий заказ. OrderArchivedError, если заказ перенесен в архив, и OrderNotFoundError,
+        если заказа нет.
+        """
+        order = await OrderHandler._update(
+            request.uuid,
             {
-                Order.name: request.name,
-                Order.completed: request.completed,
-                Order.date: request.date
+                'name': request.name,
+                'completed': request.completed,
+                'date': request.date
             }
-        ).where(Order.uuid == request.uuid)
-        order = await Order.select().where(Order.uuid == request.uuid).first()
-        logger.success(f'Update order: {order}')
+        )
+        logger.success('Update order: {}', request.uuid)
         response = OrderReadResponse(
             order=OrderResponse(**order)
         )
@@ -54,9 +197,8 @@ class OrderHandler:
 
     @staticmethod
     async def delete_order(request):
-        if (order := await Order.select().where(Order.uuid == request.uuid).first()):
-            await Order.delete().where(Order.uuid == request.uuid)
-            logger.success(f'Delete order: {order}')
+        if await get_order_repository().delete(request.uuid):
+            logger.success('Delete order: {}', request.uuid)
             response = OrderDeleteResponse(
                 success=True
             )
@@ -69,14 +211,17 @@ class OrderHandler:
 
     @staticmethod
     async def update_after_check_order(request):
-        await Order.update(
+        """
+        Записывает статус заказа, полученный от CheckStatusOrderService; исключения - как у update_order.
+        """
+        order = await OrderHandler._update(
+            request.uuid,
             {
-                Order.completed: request.completed.value,
-                Order.date: f"{datetime.datetime.utcnow()}Z"
+                'completed': request.completed.value,
+                'date': f"{datetime.datetime.utcnow()}Z"
             }
-        ).where(Order.uuid == request.uuid)
-        order = await Order.select().where(Order.uuid == request.uuid).first()
-        logger.success(f'Update order: {order}')
+        )
+        logger.success('Update order: {}', request.uuid)
         response = OrderReadResponse(
             order=OrderResponse(**order)
         )
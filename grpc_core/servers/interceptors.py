@@ -1,15 +1,32 @@
+import asyncio
+import contextvars
+import inspect
+import time
 from functools import partial
 
 import grpc
 import jwt
 from grpc.aio import ClientCallDetails
 
+from grpc_core.capture import CaptureWriter
+from grpc_core.metrics import RpcMetrics, RpcMethodMetrics
+from grpc_core.protos.capture.capture_pb2 import CapturedCall, MetadataEntry
+
+SERVER_METRICS = RpcMetrics('server')
+
 
 class AuthInterceptor(grpc.aio.ServerInterceptor):
-    def __init__(self, key):
+    def __init__(self, key, public_services=()):
         # При инициализации создаем атрибут _valid_metadata,
         # который будет хранить секретный ключ для валидации токена пользователя
         self._valid_metadata = key
+        # Префиксы методов сервисов, доступных без токена (например, проверки состояния для балансировщиков)
+        self._public_prefixes = tuple(f'/{service}/' for service in public_services)
+        # Обработчики отказа создаются один раз: MetricsInterceptor кэширует обертки по объекту обработчика
+        self._deny_handlers = {
+            details: grpc.unary_unary_rpc_method_handler(partial(self.deny, details=details))
+            for details in ("Токен не найден", "Время жизни токена истекло", "Токен не валиден")
+        }
 
     @staticmethod
     async def deny(_, context, details):
@@ -17,6 +34,8 @@ class AuthInterceptor(grpc.aio.ServerInterceptor):
         await context.abort(grpc.StatusCode.UNAUTHENTICATED, details)
 
     async def intercept_service(self, continuation, handler_call_details):
+        if handler_call_details.method.startswith(self._public_prefixes):
+            return await continuation(handler_call_details)
         # Получаем кортеж, содержащий метаданные
         metadatums = handler_call_details.invocation_metadata
         try:
@@ -25,30 +44,275 @@ class AuthInterceptor(grpc.aio.ServerInterceptor):
             if jwt.decode(resault.value, self._valid_metadata, algorithms=['HS256']):
                 return await continuation(handler_call_details)
         except StopIteration:
-            return grpc.unary_unary_rpc_method_handler(partial(self.deny, details="Токен не найден"))
+            return self._deny_handlers["Токен не найден"]
         except jwt.ExpiredSignatureError:
-            return grpc.unary_unary_rpc_method_handler(partial(self.deny, details="Время жизни токена истекло"))
+            return self._deny_handlers["Время жизни токена истекло"]
         except jwt.InvalidTokenError:
-            return grpc.unary_unary_rpc_method_handler(partial(self.deny, details="Токен не валиден"))
+            return self._deny_handlers["Токен не валиден"]
+
+
+class MetricsInterceptor(grpc.aio.ServerInterceptor):
+    """
+    Серверный интерцептор, записывающий метрики каждого метода (см. grpc_core.metrics.RpcMetrics):
+    число вызовов по коду ответа, выполняющиеся вызовы, время обработки и размеры сообщений.
+
+    Размеры берутся из длины сериализованных сообщений в обертках сериализатора и десериализатора
+    обработчика, поэтому сообщения повторно не сериализуются. Обертка обработчика создается один раз
+    на метод и переиспользуется, пока продолжение цепочки возвращает тот же обработчик (сервисы и
+    AuthInterceptor возвращают заранее созданные обработчики).
+    Интерцептор ставится первым, чтобы учитывать и вызовы, отклоненные AuthInterceptor.
+    """
+
+    def __init__(self, metrics: RpcMetrics = SERVER_METRICS):
+        self._metrics = metrics
+        # Полное имя метода -> (исходный обработчик, обертка)
+        self._handlers: dict[str, tuple[grpc.RpcMethodHandler, grpc.RpcMethodHandler]] = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = handler_call_details.method
+        cached = self._handlers.get(method)
+        if cached is None or cached[0] is not handler:
+            cached = self._handlers[method] = (handler, self._wrap(handler, self._metrics.method(method)))
+        return cached[1]
+
+    @staticmethod
+    def _wrap(handler: grpc.RpcMethodHandler, metrics: RpcMethodMetrics) -> grpc.RpcMethodHandler:
+        replaced = {
+            'request_deserializer': metrics.measured(handler.request_deserializer, metrics.request_bytes, False),
+            'response_serializer': metrics.measured(handler.response_serializer, metrics.response_bytes, True),
+        }
+        if handler.unary_unary is not None:
+            replaced['unary_unary'] = _measured_unary(handler.unary_unary, metrics)
+        elif handler.stream_unary is not None:
+            replaced['stream_unary'] = _measured_unary(handler.stream_unary, metrics)
+        elif handler.unary_stream is not None:
+            replaced['unary_stream'] = _measured_stream(handler.unary_stream, metrics)
+        else:
+            replaced['stream_stream'] = _measured_stream(handler.stream_stream, metrics)
+        return handler._replace(**replaced)
+
 
+def _status_code(context, error: BaseException | None = None) -> str:
+    # Код, установленный обработчиком (set_code или abort), иначе код по исключению
+    code = context.code()
+    if code is not None:
+        return code.name if isinstance(code, grpc.StatusCode) else grpc.StatusCode(code).name
+    if error is None:
+        return 'OK'
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return 'CANCELLED'
+    return 'UNKNOWN'
+
+
+def _measured_unary(behavior, metrics: RpcMethodMetrics):
+    # Обработчик с одним ответом: время от вызова до возврата ответа
+    async def wrapper(request, context):
+        metrics.start()
+        started = time.perf_counter()
+        try:
+            response = behavior(request, context)
+            if inspect.isawaitable(response):
+                response = await response
+        except BaseException as e:
+            metrics.finish(_status_code(context, e), time.perf_counter() - started)
+            raise
+        metrics.finish(_status_code(context), time.perf_counter() - started)
+        return response
+
+    return wrapper
+
+
+def _measured_stream(behavior, metrics: RpcMethodMetrics):
+    # Обработчик со стримом ответов: время до отправки последнего сообщения. Обработчик может быть
+    # асинхронным генератором, корутиной, отправляющей ответы через context.write, или обычным генератором
+    async def wrapper(request, context):
+        metrics.start()
+        started = time.perf_counter()
+        try:
+            responses = behavior(request, context)
+            if hasattr(responses, '__aiter__'):
+                async for response in responses:
+                    yield response
+            elif inspect.isawaitable(responses):
+                await responses
+            else:
+                for response in responses:
+                    yield response
+        except BaseException as e:
+            metrics.finish(_status_code(context, e), time.perf_counter() - started)
+            raise
+        metrics.finish(_status_code(context), time.perf_counter() - started)
+
+    return wrapper
+
+
+class CaptureInterceptor(grpc.aio.ServerInterceptor):
+    """
+    Серверный интерцептор, записывающий вызовы в файл для воспроизведения (grpc_core.clients.replay).
+
+    Для каждого вызова сохраняются имя метода, время начала, оставшееся до дедлайна время, метаданные
+    без токена и служебных заголовков, сериализованные сообщения запроса (для стрима запросов - все по
+    порядку), время обработки, код ответа и число сообщений ответа. Работает с любым сервисом сервера:
+    сообщения запроса берутся уже разобранными и сериализуются повторно, их тип знать не нужно.
+    Ставится после AuthInterceptor, чтобы записывались только вызовы с действительным токеном.
+    Обертки обработчиков кэшируются по методу, как в MetricsInterceptor.
+    """
+
+    # Заголовки, которые не записываются: токен, адрес и служебные заголовки gRPC и HTTP/2
+    EXCLUDED_METADATA = ('rpc-auth', 'authorization', 'user-agent')
+
+    def __init__(self, writer: CaptureWriter):
+        self.writer = writer
+        self._handlers: dict[str, tuple[grpc.RpcMethodHandler, grpc.RpcMethodHandler]] = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = handler_call_details.method
+        cached = self._handlers.get(method)
+        if cached is None or cached[0] is not handler:
+            cached = self._handlers[method] = (handler, self._wrap(handler, method))
+        return cached[1]
 
-class KeyAuthClientInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    def _wrap(self, handler: grpc.RpcMethodHandler, method: str) -> grpc.RpcMethodHandler:
+        start = partial(self._start, method, handler.request_streaming, handler.response_streaming)
+        if handler.unary_unary is not None:
+            return handler._replace(unary_unary=_captured_unary(handler.unary_unary, start, self._finish))
+        if handler.stream_unary is not None:
+            return handler._replace(stream_unary=_captured_unary(handler.stream_unary, start, self._finish))
+        # Ответы стрима считаются в сериализаторе: так учитываются и сообщения, отправленные через context.write
+        serializer = _counted_serializer(handler.response_serializer)
+        if handler.unary_stream is not None:
+            return handler._replace(
+                unary_stream=_captured_stream(handler.unary_stream, start, self._finish), response_serializer=serializer
+            )
+        return handler._replace(
+            stream_stream=_captured_stream(handler.stream_stream, start, self._finish), response_serializer=serializer
+        )
+
+    def _start(self, method: str, request_streaming: bool, response_streaming: bool, context) -> CapturedCall:
+        # Запись создается в начале вызова; время, код и ответы дописываются при завершении
+        call = CapturedCall(
+            method=method,
+            start_time=time.time(),
+            request_streaming=request_streaming,
+            response_streaming=response_streaming,
+        )
+        timeout = context.time_remaining()
+        if timeout is not None:
+            call.timeout = timeout
+        for key, value in context.invocation_metadata() or ():
+            if key in self.EXCLUDED_METADATA or key.startswith((':', 'grpc-')):
+                continue
+            if isinstance(value, bytes):
+                call.metadata.append(MetadataEntry(key=key, binary_value=value))
+            else:
+                call.metadata.append(MetadataEntry(key=key, value=value))
+        return call
+
+    def _finish(self, call: CapturedCall, context, started: float, error: BaseException | None = None) -> None:
+        call.duration = time.perf_counter() - started
+        call.code = _status_code(context, error)
+        self.writer.write(call)
+
+
+# Запись выполняющегося вызова: обработчик и сериализатор ответов работают в задаче вызова
+_CAPTURED_CALL: contextvars.ContextVar[CapturedCall] = contextvars.ContextVar('captured_call')
+
+
+def _counted_serializer(serializer):
+    def serialize(message):
+        call = _CAPTURED_CALL.get(None)
+        if call is not None:
+            call.responses += 1
+        return serializer(message) if serializer is not None else message
+
+    return serialize
+
+
+async def _recorded_requests(requests, call: CapturedCall):
+    # Стрим запросов: каждое сообщение сохраняется по мере чтения обработчиком
+    async for request in requests:
+        call.requests.append(request.SerializeToString())
+        yield request
+
+
+def _captured_unary(behavior, start, finish):
+    async def wrapper(request, context):
+        call = start(context)
+        if call.request_streaming:
+            request = _recorded_requests(request, call)
+        else:
+            call.requests.append(request.SerializeToString())
+        started = time.perf_counter()
+        try:
+            response = behavior(request, context)
+            if inspect.isawaitable(response):
+                response = await response
+        except BaseException as e:
+            finish(call, context, started, e)
+            raise
+        call.responses = 1
+        finish(call, context, started)
+        return response
+
+    return wrapper
+
+
+def _captured_stream(behavior, start, finish):
+    async def wrapper(request, context):
+        call = start(context)
+        _CAPTURED_CALL.set(call)
+        if call.request_streaming:
+            request = _recorded_requests(request, call)
+        else:
+            call.requests.append(request.SerializeToString())
+        started = time.perf_counter()
+        try:
+            responses = behavior(request, context)
+            if hasattr(responses, '__aiter__'):
+                async for response in responses:
+                    yield response
+            elif inspect.isawaitable(responses):
+                await responses
+            else:
+                for response in responses:
+                    yield response
+        except BaseException as e:
+            finish(call, context, started, e)
+            raise
+        finish(call, context, started)
+
+    return wrapper
+
+
+class KeyAuthClientInterceptor(grpc.aio.UnaryUnaryClientInterceptor, grpc.aio.UnaryStreamClientInterceptor):
     def __init__(self, user_token):
         # Получаем токен пользователя
         self.user_token: str = user_token
 
-    async def intercept_unary_unary(self, continuation, client_call_details, request):
-        # Добавляем токен в метаданные с ключом rpc-auth и отправляем запрос на сервер
+    def _with_token(self, client_call_details):
+        # Добавляем токен в метаданные с ключом rpc-auth
         metadata = []
         if client_call_details.metadata is not None:
             metadata = list(client_call_details.metadata)
         metadata.append(("rpc-auth", self.user_token))
-        new_details = ClientCallDetails(
+        return ClientCallDetails(
             client_call_details.method,
             client_call_details.timeout,
             metadata,
             client_call_details.credentials,
             client_call_details.wait_for_ready,
         )
-        response = await continuation(new_details, request)
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        # Отправляем запрос на сервер с токеном
+        response = await continuation(self._with_token(client_call_details), request)
         return response
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        return await continuation(self._with_token(client_call_details), request)
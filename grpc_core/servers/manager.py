@@ -1,3 +1,4 @@
+import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 
@@ -6,26 +7,28 @@ from grpc_reflection.v1alpha import reflection
 from grpc_health.v1 import health_pb2
 from grpc_health.v1 import health_pb2_grpc
 
-from opentelemetry import trace
 from opentelemetry.instrumentation.grpc import GrpcAioInstrumentorServer, GrpcAioInstrumentorClient
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.proto.grpc import JaegerExporter
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 
+from grpc_core.capture import CaptureWriter
+from grpc_core.health import probe, registry
+from grpc_core.protos.admin import admin_pb2, admin_pb2_grpc
 from grpc_core.protos.check import check_pb2_grpc, check_pb2
 from grpc_core.protos.order import order_pb2
 from grpc_core.protos.order import order_pb2_grpc
 from grpc_core.protos.echo import echo_pb2
 from grpc_core.protos.echo import echo_pb2_grpc
-from grpc_core.servers.interceptors import AuthInterceptor
+from grpc_core.servers.handlers.idempotency import IdempotencyHandler
+from grpc_core.servers.repositories.archive import archive_loop
+from grpc_core.servers.repositories.order import get_order_repository
+from grpc_core.servers.interceptors import AuthInterceptor, CaptureInterceptor, MetricsInterceptor
+from grpc_core.servers.tracing import setup_tracing
 
+from grpc_core.servers.services.admin import AdminService
 from grpc_core.servers.services.order import OrderService
 from grpc_core.servers.services.health import HealthService
 from grpc_core.servers.services.echo import EchoService
 from grpc_core.servers.services.check import CheckStatusOrderService
 
-from models.order import Order
 from settings import settings
 
 
@@ -43,6 +46,10 @@ class Server:
         Адрес сервера в формате 'host:port'.
     server : grpc.aio.Server
         Экземпляр асинхронного gRPC сервера.
+    service_names : tuple[str, ...]
+        Полные имена сервисов сервера; их статусы отдает Health.
+    capture : CaptureWriter | None
+        Файл записи вызовов, если задан GRPC_CAPTURE_PATH.
     initialized : bool
         Флаг, указывающий, была ли выполнена инициализация.
 
@@ -54,10 +61,12 @@ class Server:
         Инициализирует сервер, если он еще не инициализирован.
     register() -> None
         Регистрирует сервисы gRPC на сервере.
+    async start() -> None
+        Запускает сервер, не дожидаясь его завершения.
     async run() -> None
         Запускает сервер и ожидает его завершения.
-    async stop() -> None
-        Останавливает сервер.
+    async stop(grace=None) -> None
+        Останавливает сервер, дожидаясь выполняющихся запросов.
     """
     _instance = None
 
@@ -78,27 +87,8 @@ class Server:
         Устанавливает адрес сервера, создает сервер gRPC и добавляет незащищенный порт.
         """
         if not hasattr(self, 'initialized'):
-            # Создаем экспортёр для отправки трассировочных данных в Jaeger.
-            # Указываем адрес коллектора и разрешаем небезопасное соединение (без шифрования).
-            jaeger_exporter = JaegerExporter(
-                collector_endpoint=f'{settings.JAEGER_HOST}:{settings.JAEGER_PORT}',
-                insecure=True
-            )
-
-            # Создаем процессор для пакетной обработки трассировочных данных (спанов).
-            # Он будет собирать спаны и отправлять их в Jaeger с использованием созданного экспортёра.
-            span_processor = BatchSpanProcessor(jaeger_exporter)
-
-            # Устанавливаем глобальный провайдер трассировки.
-            # Указываем, что ресурс трассировки будет иметь имя "Order".
-            # Это имя будет использоваться для идентификации службы в системе трассировки.
-            trace.set_tracer_provider(
-                TracerProvider(resource=Resource.create({SERVICE_NAME: "Order"}))
-            )
-
-            # Добавляем созданный процессор спанов в провайдера трассировки.
-            # Это необходимо для того, чтобы спаны обрабатывались и отправлялись в Jaeger.
-            trace.get_tracer_provider().add_span_processor(span_processor)
+            # Настраиваем провайдер трассировки: сэмплер, экспортер и очередь спанов задаются в settings.py.
+            setup_tracing()
 
             # Создаем инструмент для автоматической трассировки gRPC сервера.
             grpc_server_instrumentor = GrpcAioInstrumentorServer()
@@ -115,11 +105,30 @@ class Server:
             grpc_client_instrumentor.instrument()
 
             self.SERVER_ADDRESS = f'{settings.GRPC_HOST_LOCAL}:{settings.GRPC_PORT}'
+            interceptors = [
+                # Метрики вызовов по методам, включая отклоненные без токена; отдаются маршрутом /metrics
+                MetricsInterceptor(),
+                # Проверки состояния доступны без токена, чтобы на них могли подписываться балансировщики
+                AuthInterceptor(
+                    settings.SECRET_KEY,
+                    public_services=(health_pb2.DESCRIPTOR.services_by_name["Health"].full_name,),
+                ),
+            ]
+            # Запись вызовов с действительным токеном для воспроизведения нагрузки
+            self.capture: CaptureWriter | None = None
+            if settings.GRPC_CAPTURE_PATH:
+                self.capture = CaptureWriter(settings.GRPC_CAPTURE_PATH, settings.GRPC_CAPTURE_MAX_QUEUE)
+                interceptors.append(CaptureInterceptor(self.capture))
             self.server = aio.server(
                 ThreadPoolExecutor(max_workers=10),
-                interceptors=[
-                    AuthInterceptor(settings.SECRET_KEY),
-                ]
+                interceptors=interceptors,
+                options=[
+                    # Несколько процессов сервера слушают один порт, ядро распределяет между ними соединения.
+                    # gRPC включает SO_REUSEPORT по умолчанию, поэтому опция задается явно и при False
+                    ('grpc.so_reuseport', int(settings.GRPC_SO_REUSEPORT)),
+                    ('grpc.max_receive_message_length', settings.GRPC_MAX_RECEIVE_MESSAGE_LENGTH),
+                    ('grpc.max_send_message_length', settings.GRPC_MAX_SEND_MESSAGE_LENGTH),
+                ],
             )
             self.server.add_insecure_port(self.SERVER_ADDRESS)
 
@@ -130,11 +139,15 @@ class Server:
                 echo_pb2.DESCRIPTOR.services_by_name["EchoService"].full_name,
                 health_pb2.DESCRIPTOR.services_by_name["Health"].full_name,
                 check_pb2.DESCRIPTOR.services_by_name["CheckStatusOrderService"].full_name,
+                admin_pb2.DESCRIPTOR.services_by_name["AdminService"].full_name,
                 # Добавление стандартного имени сервиса reflection (reflection service).
                 reflection.SERVICE_NAME,
             )
             # Включение отражения сервера для перечисленных в SERVICE_NAMES сервисов.
             reflection.enable_server_reflection(SERVICE_NAMES, self.server)
+            self.service_names = SERVICE_NAMES
+            self._database_probe: asyncio.Task | None = None
+            self._archive: asyncio.Task | None = None
 
             self.initialized = True
 
@@ -142,7 +155,8 @@ class Server:
         """
         Регистрирует сервисы gRPC на сервере.
 
-        Регистрирует сервис OrderService на gRPC сервере.
+        Регистрирует сервис OrderService на gRPC сервере, а также служебные сервисы Health и AdminService.
+        AdminService (профилирование, tracemalloc, стеки задач) защищен AuthInterceptor, как и прикладные сервисы.
         """
         order_pb2_grpc.add_OrderServiceServicer_to_server(
             OrderService(), self.server
@@ -154,26 +168,79 @@ class Server:
         check_pb2_grpc.add_CheckStatusOrderServiceServicer_to_server(
             CheckStatusOrderService(), self.server
         )
+        admin_pb2_grpc.add_AdminServiceServicer_to_server(AdminService(), self.server)
 
-    async def run(self) -> None:
+    async def start(self) -> None:
         """
-        Запускает сервер и ожидает его завершения.
-
-        Создает таблицу Order, если она еще не существует, регистрирует сервисы и запускает сервер.
+        Запускает сервер, не дожидаясь его завершения.
+
+        Открывает хранилище заказов (ORDER_STORAGE), создает или дополняет таблицу IdempotencyKey,
+        регистрирует сервисы и запускает сервер.
+        Сервисы регистрируются в реестре Health, а доступность БД проверяется в фоне каждые
+        HEALTH_DATABASE_PROBE_INTERVAL секунд. Если ORDER_ARCHIVE_AGE больше нуля, выполненные заказы
+        переносятся в архив в фоне каждые ORDER_ARCHIVE_INTERVAL секунд.
+        Ошибки запуска (например, занятый порт) выбрасываются вызывающему коду.
         Логгирует информацию о запуске сервера.
         """
-        await Order.create_table(if_not_exists=True)
+        await get_order_repository().open()
+        await IdempotencyHandler.create_table()
         self.register()
+        registry.serve(self.service_names)
+        self._database_probe = asyncio.create_task(probe(
+            'database',
+            self._ping_database,
+            settings.HEALTH_DATABASE_PROBE_INTERVAL,
+            settings.HEALTH_DATABASE_PROBE_TIMEOUT,
+        ))
+        if settings.ORDER_ARCHIVE_AGE > 0:
+            self._archive = asyncio.create_task(archive_loop(
+                get_order_repository(),
+                settings.ORDER_ARCHIVE_AGE,
+                settings.ORDER_ARCHIVE_INTERVAL,
+                settings.ORDER_ARCHIVE_BATCH,
+                settings.ORDER_ARCHIVE_PAUSE,
+            ))
         await self.server.start()
         logger.info(f'*** Сервис gRPC запущен: {self.SERVER_ADDRESS} ***')
+
+    @staticmethod
+    async def _ping_database() -> None:
+        await get_order_repository().ping()
+
+    async def run(self) -> None:
+        """
+        Запускает сервер и ожидает его завершения.
+        """
+        await self.start()
         await self.server.wait_for_termination()
 
-    async def stop(self) -> None:
+    async def stop(self, grace: float | None = None) -> None:
         """
         Останавливает сервер.
 
-        Останавливает gRPC сервер без периода ожидания (grace period).
+        Все сервисы сразу получают в Health статус NOT_SERVING. Сервер перестает принимать новые соединения
+        и запросы, а выполняющимся запросам дается grace секунд на завершение, после чего они отменяются.
         Логгирует информацию об остановке сервера.
+
+        Параметры:
+        ----------
+        grace : float, optional
+            Период ожидания выполняющихся запросов, по умолчанию GRPC_SHUTDOWN_GRACE.
         """
+        grace = settings.GRPC_SHUTDOWN_GRACE if grace is None else grace
+        logger.info(f'*** Сервис gRPC останавливается, ожидание запросов до {grace} с ***')
+        registry.shutdown()
+        await self.server.stop(grace=grace)
+        if self._database_probe is not None:
+            self._database_probe.cancel()
+            await asyncio.gather(self._database_probe, return_exceptions=True)
+            self._database_probe = None
+        if self._archive is not None:
+            self._archive.cancel()
+            await asyncio.gather(self._archive, return_exceptions=True)
+            self._archive = None
+        await get_order_repository().close()
+        if self.capture is not None:
+            # Записи завершившихся вызовов дописываются в файл
+            self.capture.close()
         logger.info('*** Сервис gRPC остановлен ***')
-        await self.server.stop(grace=False)
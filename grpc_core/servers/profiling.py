@@ -0,0 +1,195 @@
+"""
+Диагностика работающего сервера без перезапуска: профилирование цикла событий, tracemalloc и стеки задач asyncio.
+
+Обработчики gRPC выполняются в потоке цикла событий, поэтому профилируется именно он:
+cProfile включается в этом потоке на заданное время, а выборочный профилировщик из отдельного потока
+снимает его стек через sys._current_frames. Одновременно выполняется только одна сессия диагностики:
+два cProfile в одном потоке мешают друг другу, а tracemalloc общий для процесса.
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+# Типы группировки tracemalloc.Snapshot.statistics
+TRACEMALLOC_GROUPS = ('lineno', 'filename', 'traceback')
+# Глубина стека, сохраняемая tracemalloc при группировке traceback
+TRACEMALLOC_FRAMES = 25
+
+_session = threading.Lock()
+
+
+class DiagnosticsBusyError(RuntimeError):
+    """ Другая сессия профилирования или tracemalloc еще не завершена. """
+
+
+def _acquire_session() -> None:
+    if not _session.acquire(blocking=False):
+        raise DiagnosticsBusyError('Профилирование уже выполняется, дождитесь его завершения')
+
+
+def collapse_stack(frame) -> str:
+    """
+    Формирует стек в формате collapsed-stack: кадры от внешнего к внутреннему через ';',
+    каждый кадр - 'файл:функция:строка определения'.
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_filename}:{code.co_name}:{code.co_firstlineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+class SamplingProfiler:
+    """
+    Выборочный профилировщик: фоновый поток с интервалом снимает стек потока thread_id
+    и считает одинаковые стеки.
+
+    В отличие от cProfile не замедляет профилируемый поток на каждом вызове функции,
+    поэтому подходит для включения под нагрузкой.
+
+    Атрибуты:
+    ---------
+    thread_id : int
+        Идентификатор профилируемого потока.
+    interval : float
+        Интервал между выборками, с.
+    stacks : collections.Counter
+        Число выборок для каждого стека в формате collapsed-stack.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def collapsed(self) -> str:
+        """ Отчет в формате collapsed-stack ('стек число_выборок'), пригодный для flamegraph.pl и speedscope. """
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+async def profile_cprofile(duration: float, sort: str = 'cumulative', limit: int = 50) -> str:
+    """
+    Профилирует поток цикла событий cProfile в течение duration секунд.
+
+    Возвращает:
+    -----------
+    str
+        Отчет pstats, отсортированный по sort, не больше limit строк функций.
+    """
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        raise ValueError(f'Неизвестная сортировка pstats: {sort}')
+    _acquire_session()
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+    finally:
+        _session.release()
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+async def profile_sampling(duration: float, interval: float) -> str:
+    """
+    Профилирует поток цикла событий выборочным профилировщиком в течение duration секунд.
+
+    Возвращает:
+    -----------
+    str
+        Отчет в формате collapsed-stack.
+    """
+    _acquire_session()
+    try:
+        profiler = SamplingProfiler(threading.get_ident(), interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop()
+    finally:
+        _session.release()
+    return profiler.collapsed()
+
+
+async def tracemalloc_top(duration: float, group_by: str = 'lineno', limit: int = 20):
+    """
+    Возвращает самые большие источники памяти, выделенной и еще не освобожденной.
+
+    Если tracemalloc не запущен (например, переменной окружения PYTHONTRACEMALLOC), он запускается на
+    duration секунд и останавливается после снимка: учитываются только выделения за это время.
+
+    Возвращает:
+    -----------
+    tuple[list[tracemalloc.Statistic], int, int]
+        Статистика по группам, текущий и пиковый объем отслеживаемой памяти в байтах.
+    """
+    if group_by not in TRACEMALLOC_GROUPS:
+        raise ValueError(f'Неизвестная группировка tracemalloc: {group_by}')
+    _acquire_session()
+    try:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(TRACEMALLOC_FRAMES if group_by == 'traceback' else 1)
+        try:
+            if started:
+                await asyncio.sleep(duration)
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+    finally:
+        _session.release()
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    return snapshot.statistics(group_by)[:limit], current, peak
+
+
+def task_stacks(limit: int | None = None) -> list[tuple[str, str, str]]:
+    """
+    Возвращает имя, корутину и стек каждой задачи текущего цикла событий.
+
+    Параметры:
+    ----------
+    limit : int, optional
+        Максимальное число кадров стека задачи.
+    """
+    tasks = []
+    for task in asyncio.all_tasks():
+        # Кадры форматируются без чтения исходников: у кадров корутин расширений номер строки может отсутствовать
+        stack = '\n'.join(
+            f'  File "{frame.f_code.co_filename}", line {frame.f_lineno}, in {frame.f_code.co_name}'
+            for frame in task.get_stack(limit=limit)
+        )
+        coroutine = task.get_coro()
+        tasks.append((task.get_name(), getattr(coroutine, '__qualname__', repr(coroutine)), stack))
+    return tasks
@@ -0,0 +1,68 @@
+"""
+Фоновый перенос выполненных заказов в архив (order_archive, см. grpc_core.servers.repositories.schema).
+
+Раз в ORDER_ARCHIVE_INTERVAL секунд выполненные заказы старше ORDER_ARCHIVE_AGE секунд (по timestamp)
+переносятся пакетами по ORDER_ARCHIVE_BATCH заказов, пока переносить есть что. Каждый пакет - отдельная
+короткая транзакция, а между пакетами делается пауза ORDER_ARCHIVE_PAUSE, поэтому запросы сервера ждут
+блокировку записи не дольше одного пакета. Ошибка пакета записывается в лог, и перенос повторяется
+в следующий период: пакет выполняется целиком или не выполняется вовсе.
+
+Задачу запускает сервер (grpc_core.servers.manager), если ORDER_ARCHIVE_AGE больше нуля.
+"""
+import asyncio
+import time
+
+from loguru import logger
+
+from grpc_core import metrics
+from grpc_core.servers.repositories.order import OrderRepository
+
+ARCHIVED = metrics.counter('order_archived_total', 'Выполненные заказы, перенесенные в архив')
+
+
+async def archive_orders(repository: OrderRepository, age: float, batch: int, pause: float = 0.0) -> int:
+    """
+    Переносит в архив выполненные заказы старше age секунд пакетами по batch заказов.
+
+    Параметры:
+    ----------
+    repository : OrderRepository
+        Хранилище заказов.
+    age : float
+        Возраст заказа (по timestamp), после которого выполненный заказ переносится, с.
+    batch : int
+        Заказов в пакете (в одной транзакции).
+    pause : float
+        Пауза между пакетами, с.
+
+    Возвращает:
+    -----------
+    int
+        Число перенесенных заказов.
+    """
+    # Граница вычисляется один раз: иначе при постоянном потоке заказов перенос не завершался бы
+    before = time.time_ns() // 1000 - int(age * 1_000_000)
+    archived = 0
+    while True:
+        moved = await repository.archive(before, batch)
+        ARCHIVED.inc(moved)
+        archived += moved
+        if moved < batch:
+            return archived
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def archive_loop(repository: OrderRepository, age: float, interval: float, batch: int, pause: float = 0.0) -> None:
+    """
+    Переносит заказы в архив каждые interval секунд до отмены задачи.
+    """
+    while True:
+        try:
+            started = time.perf_counter()
+            archived = await archive_orders(repository, age, batch, pause)
+            if archived:
+                logger.info('Перенесено в архив {} заказов за {:.1f} с', archived, time.perf_counter() - started)
+        except Exception as e:
+            logger.error('Не удалось перенести заказы в архив: {!r}', e)
+        await asyncio.sleep(interval)
@@ -0,0 +1,79 @@
+"""
+Заполнение столбца timestamp у заказов, созданных до его появления (см. grpc_core.servers.repositories.schema).
+
+Таблица дополняется столбцом и индексами, если сервер еще не сделал этого при запуске, затем строки
+с пустым timestamp читаются пакетами с курсором по uuid, и timestamp вычисляется из date. Каждый пакет -
+отдельная короткая транзакция, а между пакетами можно сделать паузу (--pause), поэтому инструмент можно
+запускать на работающем сервере: его запросы ждут не дольше одного пакета. Строки с датой, которую не удалось
+разобрать, остаются с пустым timestamp и выводятся в итогах. Повторный запуск заполняет только оставшиеся строки.
+
+Запуск:
+    python -m grpc_core.servers.repositories.backfill --path bd.sqlite
+    python -m grpc_core.servers.repositories.backfill --path 'bd.order.{shard}.sqlite' --shards 4 --pause 0.01
+"""
+import argparse
+import sqlite3
+import time
+
+from grpc_core.servers.repositories.schema import TABLE_COLUMNS, TABLE_NAMES, date_to_micros, migrations
+from settings import settings
+
+
+def backfill(path: str, batch: int, pause: float) -> tuple[int, list[tuple[str, str]]]:
+    """
+    Заполняет timestamp в файле path и возвращает число заполненных строк и строки (uuid, date)
+    с неразобранной датой.
+    """
+    connection = sqlite3.connect(path, isolation_level=None, timeout=30)
+    try:
+        columns = [row[0] for row in connection.execute(TABLE_COLUMNS)]
+        for statement in migrations(columns, [row[0] for row in connection.execute(TABLE_NAMES)]):
+            connection.execute(statement)
+        filled, invalid, after = 0, [], ''
+        while True:
+            rows = connection.execute(
+                'SELECT uuid, date FROM "order" WHERE uuid > ? AND timestamp IS NULL ORDER BY uuid LIMIT ?', (after, batch)
+            ).fetchall()
+            if not rows:
+                break
+            after = rows[-1][0]
+            updates = []
+            for uuid, date in rows:
+                timestamp = date_to_micros(date)
+                if timestamp is None:
+                    invalid.append((uuid, date))
+                else:
+                    updates.append((timestamp, uuid))
+            with connection:
+                connection.execute('BEGIN')
+                # Строку мог изменить сервер: его значение уже вычислено из новой даты
+                connection.executemany('UPDATE "order" SET timestamp = ? WHERE uuid = ? AND timestamp IS NULL', updates)
+            filled += len(updates)
+            if pause:
+                time.sleep(pause)
+        return filled, invalid
+    finally:
+        connection.close()
+
+
+def main(args) -> None:
+    paths = [args.path.format(shard=shard) for shard in range(args.shards)] if '{shard}' in args.path else [args.path]
+    for path in paths:
+        started = time.perf_counter()
+        filled, invalid = backfill(path, args.batch, args.pause)
+        print(f'{path}: заполнено {filled}, дата не разобрана у {len(invalid)} за {time.perf_counter() - started:.1f} с')
+        for uuid, date in invalid[:args.show_invalid]:
+            print(f'    {uuid}: {date!r}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.servers.repositories.backfill', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--path', default='bd.sqlite', help='файл БД или шаблон пути шардов с {shard}')
+    parser.add_argument('--shards', type=int, default=settings.ORDER_SHARDS, help='число шардов для шаблона с {shard}')
+    parser.add_argument('--batch', type=int, default=1000, help='строк в пакете')
+    parser.add_argument('--pause', type=float, default=0.0, help='пауза между пакетами, с')
+    parser.add_argument('--show-invalid', type=int, default=10, help='сколько строк с неразобранной датой вывести')
+    main(parser.parse_args())
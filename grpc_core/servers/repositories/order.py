@@ -0,0 +1,614 @@
+"""
+Хранилища заказов для OrderHandler.
+
+OrderRepository описывает операции, которые нужны обработчику, а реализации выбираются настройкой
+ORDER_STORAGE:
+    sqlite  - таблица Order через Piccolo (SQLite, bd.sqlite);
+    sharded - заказы в нескольких файлах SQLite по хешу uuid (grpc_core.servers.repositories.sharded);
+    memory  - заказы в памяти процесса: словарь по uuid и отсортированный индекс uuid. Задержка хранилища
+              почти нулевая, поэтому режим подходит для кэширующих узлов и нагрузочных тестов, а сравнение
+              с sqlite показывает, какую долю времени вызова занимает хранилище. Данные не разделяются между
+              процессами (GRPC_WORKERS > 1) и сохраняются на диск только снимками ORDER_MEMORY_SNAPSHOT_PATH.
+
+Заказ передается и возвращается словарем с ключами uuid, name, completed и date, как строки Piccolo.
+Хранилища добавляют к нему timestamp - дату в микросекундах Unix (см. grpc_core.servers.repositories.schema),
+по которой выполняются выборки по диапазону дат, а результаты поиска - rank, релевантность заказа запросу.
+
+Выполненные заказы старше ORDER_ARCHIVE_AGE фоновая задача (grpc_core.servers.repositories.archive) переносит
+в архив хранилища. Архивный заказ не изменяется и не находится поиском; get, list и query без include_archived
+его не возвращают, а delete и stats учитывают.
+"""
+import abc
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import os
+import typing as t
+
+import aiosqlite
+from loguru import logger
+
+from grpc_core.servers.repositories.schema import (COLUMNS, COUNT_ARCHIVE_BATCH, SELECT_ARCHIVED_ORDERS, SELECT_ORDERS,
+                                                   SELECT_STATS, TABLE_COLUMNS, TABLE_NAMES, archive_batch,
+                                                   date_to_micros, micros_to_day, migrations, order_row, range_query,
+                                                   search_query, stats_days_query, with_timestamp, words)
+from models.order import Order
+from settings import settings
+
+OrderRow = dict[str, t.Any]
+# Условие поиска: слова и признак префикса (см. grpc_core.servers.repositories.schema.search_terms)
+SearchTerm = tuple[tuple[str, ...], bool]
+# Счетчики заказов: total и completed всего и days - те же счетчики по дням UTC ({'day', 'total', 'completed'})
+OrderStats = dict[str, t.Any]
+
+
+class OrderRepository(abc.ABC):
+    """
+    Интерфейс хранилища заказов.
+
+    Методы:
+    -------
+    async open() -> None
+        Готовит хранилище к работе (создает таблицу, загружает снимок); вызывается при запуске сервера.
+    async close() -> None
+        Освобождает ресурсы и сохраняет данные; вызывается при остановке сервера.
+    async ping() -> None
+        Проверка доступности для Health; выбрасывает исключение, если хранилище недоступно.
+    async list(include_archived) -> list[OrderRow]
+        Все заказы, с include_archived - и архивные; порядок зависит от реализации.
+    async count() -> int
+        Число заказов вне архива.
+    async query(date_from, date_to, completed, after, limit, include_archived) -> list[OrderRow]
+        Заказы с датой в [date_from, date_to) (микросекунды Unix, None - без границы) и, если задан,
+        статусом completed в порядке (timestamp, uuid), начиная после ключа after; не больше limit
+        (0 - без ограничения). С include_archived выборка включает архивные заказы.
+    async search(terms, limit, offset) -> list[OrderRow]
+        Заказы, название которых подходит под все условия поиска, в порядке релевантности (rank по возрастанию,
+        затем uuid), limit строк начиная с offset. Строки содержат rank: чем меньше, тем релевантнее.
+    async stats(day_from, day_to) -> OrderStats
+        Число всех и выполненных заказов и гистограмма по дням в [day_from, day_to) ('2024-06-01', None - без
+        границы) в порядке дня. Заказы без timestamp входят только в общие счетчики. Счетчики ведутся при
+        изменении заказов, поэтому чтение не зависит от числа заказов.
+    async get(uuid) -> OrderRow | None
+        Заказ по uuid или None, если его нет (в том числе если он в архиве).
+    async get_archived(uuid) -> OrderRow | None
+        Архивный заказ по uuid или None.
+    async archive(before, limit) -> int
+        Переносит в архив до limit выполненных заказов с timestamp < before из каждой части хранилища
+        (шарда) и возвращает число перенесенных; 0 - переносить больше нечего. Каждая часть переносится
+        одной короткой транзакцией.
+    async insert(order) -> OrderRow
+        Сохраняет новый заказ и возвращает его.
+    async update(uuid, values) -> OrderRow | None
+        Изменяет поля заказа и возвращает его или None, если заказа нет.
+    async delete(uuid) -> bool
+        Удаляет заказ, в том числе архивный; False, если заказа не было.
+    """
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ping(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def list(self, include_archived: bool = False) -> list[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def query(
+            self,
+            date_from: t.Optional[int] = None,
+            date_to: t.Optional[int] = None,
+            completed: t.Optional[bool] = None,
+            after: t.Optional[tuple[int, str]] = None,
+            limit: int = 0,
+            include_archived: bool = False,
+    ) -> t.List[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def search(self, terms: t.Sequence[SearchTerm], limit: int, offset: int = 0) -> t.List[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def stats(self, day_from: t.Optional[str] = None, day_to: t.Optional[str] = None) -> OrderStats:
+        ...
+
+    @abc.abstractmethod
+    async def get(self, uuid: str) -> t.Optional[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def get_archived(self, uuid: str) -> t.Optional[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def archive(self, before: int, limit: int) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def insert(self, order: OrderRow) -> OrderRow:
+        ...
+
+    @abc.abstractmethod
+    async def update(self, uuid: str, values: OrderRow) -> t.Optional[OrderRow]:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, uuid: str) -> bool:
+        ...
+
+
+class PiccoloOrderRepository(OrderRepository):
+    """
+    Заказы в таблице Order (Piccolo, SQLite). Список возвращается в порядке вставки.
+
+    Таблицу создает модель Piccolo, а запросы выполняются через одно соединение aiosqlite, открытое на все
+    время работы, как у шардов (grpc_core.servers.repositories.sharded). Piccolo открывает новое соединение
+    на каждый запрос, а новое соединение заново разбирает схему файла: таблицу поиска FTS5 и триггеры поиска
+    и счетчиков. Это в несколько раз дороже самого чтения заказа по uuid. Соединение работает
+    в автокоммите: каждый запрос - отдельная транзакция, и запросы разных задач не смешиваются.
+    """
+
+    def __init__(self) -> None:
+        self._connection: aiosqlite.Connection | None = None
+
+    async def open(self) -> None:
+        await Order.create_table(if_not_exists=True)
+        self._connection = await aiosqlite.connect(Order._meta.db.path, isolation_level=None)
+        async with self._connection.execute(TABLE_COLUMNS) as cursor:
+            columns = [row[0] for row in await cursor.fetchall()]
+        async with self._connection.execute(TABLE_NAMES) as cursor:
+            tables = [row[0] for row in await cursor.fetchall()]
+        for statement in migrations(columns, tables):
+            await self._connection.execute(statement)
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    async def ping(self) -> None:
+        await self._connection.execute('SELECT 1')
+
+    async def _rows(self, sql: str, arguments: t.Sequence = ()) -> t.List[OrderRow]:
+        async with self._connection.execute(sql, arguments) as cursor:
+            return [order_row(row) for row in await cursor.fetchall()]
+
+    async def list(self, include_archived=False) -> t.List[OrderRow]:
+        orders = await self._rows(SELECT_ORDERS)
+        if include_archived:
+            orders.extend(await self._rows(SELECT_ARCHIVED_ORDERS))
+        return orders
+
+    async def count(self) -> int:
+        async with self._connection.execute('SELECT COUNT(*) FROM "order"') as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def query(
+            self, date_from=None, date_to=None, completed=None, after=None, limit=0, include_archived=False
+    ) -> t.List[OrderRow]:
+        orders = await self._rows(*range_query(date_from, date_to, completed, after, limit))
+        # В архиве только выполненные заказы
+        if not include_archived or completed is False:
+            return orders
+        archived = await self._rows(*range_query(date_from, date_to, completed, after, limit, archived=True))
+        merged = heapq.merge(orders, archived, key=lambda row: (row['timestamp'], row['uuid']))
+        return list(itertools.islice(merged, limit or None))
+
+    async def search(self, terms, limit, offset=0) -> t.List[OrderRow]:
+        async with self._connection.execute(*search_query(terms, limit, offset)) as cursor:
+            return [{**order_row(row), 'rank': row[5]} for row in await cursor.fetchall()]
+
+    async def stats(self, day_from=None, day_to=None) -> OrderStats:
+        async with self._connection.execute(SELECT_STATS) as cursor:
+            totals = await cursor.fetchone()
+        async with self._connection.execute(*stats_days_query(day_from, day_to)) as cursor:
+            rows = await cursor.fetchall()
+        days = [{'day': day, 'total': total, 'completed': completed} for day, total, completed in rows]
+        return {
+            'total': totals[0] if totals else 0,
+            'completed': totals[1] if totals else 0,
+            'days': days,
+        }
+
+    async def get(self, uuid: str) -> t.Optional[OrderRow]:
+        rows = await self._rows(f'{SELECT_ORDERS} WHERE uuid = ?', (uuid,))
+        return rows[0] if rows else None
+
+    async def get_archived(self, uuid: str) -> t.Optional[OrderRow]:
+        rows = await self._rows(f'{SELECT_ARCHIVED_ORDERS} WHERE uuid = ?', (uuid,))
+        return rows[0] if rows else None
+
+    async def archive(self, before: int, limit: int) -> int:
+        # Транзакция выполняется одним executescript в потоке соединения, поэтому запросы других задач в нее
+        # не попадают. IMMEDIATE: блокировка записи берется сразу, а не при первой записи внутри транзакции
+        script = ';\n'.join(('BEGIN IMMEDIATE', *archive_batch(before, limit), 'COMMIT;'))
+        try:
+            await self._connection.executescript(script)
+        except BaseException:
+            if self._connection.in_transaction:
+                await self._connection.execute('ROLLBACK')
+            raise
+        async with self._connection.execute(COUNT_ARCHIVE_BATCH) as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def insert(self, order: OrderRow) -> OrderRow:
+        row = with_timestamp({'completed': False, **order})
+        await self._connection.execute(
+            'INSERT INTO "order" (uuid, name, completed, date, timestamp) VALUES (?, ?, ?, ?, ?)',
+            tuple(row[column] for column in COLUMNS),
+        )
+        return row
+
+    async def update(self, uuid: str, values: OrderRow) -> t.Optional[OrderRow]:
+        values = with_timestamp(values)
+        columns = [column for column in values if column in COLUMNS]
+        if not columns:
+            return await self.get(uuid)
+        rows = await self._rows(
+            f'UPDATE "order" SET {", ".join(f"{column} = ?" for column in columns)} WHERE uuid = ? '
+            f'RETURNING {", ".join(COLUMNS)}',
+            (*(values[column] for column in columns), uuid),
+        )
+        return rows[0] if rows else None
+
+    async def delete(self, uuid: str) -> bool:
+        async with self._connection.execute('DELETE FROM "order" WHERE uuid = ?', (uuid,)) as cursor:
+            if cursor.rowcount > 0:
+                return True
+        async with self._connection.execute('DELETE FROM order_archive WHERE uuid = ?', (uuid,)) as cursor:
+            return cursor.rowcount > 0
+
+
+class MemoryOrderRepository(OrderRepository):
+    """
+    Заказы в памяти процесса со снимками на диск.
+
+    Заказы хранятся в словаре по uuid, а их uuid - в отсортированном списке: список заказов возвращается
+    в порядке uuid без сортировки при каждом запросе. Второй отсортированный список ключей (timestamp, uuid)
+    служит индексом для выборок по диапазону дат. Для поиска по названию ведется обратный индекс: слово -
+    uuid заказов, в названии которых оно есть, и отсортированный список слов, в котором слова с заданным
+    началом занимают непрерывный отрезок. Релевантность - доля слов названия, совпавших с условиями поиска,
+    со знаком минус (как bm25 в SQLite, меньше - релевантнее). Счетчики для stats изменяются вместе с заказами,
+    а гистограмма хранится словарем по дням. Архивные заказы хранятся в отдельном словаре со своим индексом
+    (timestamp, uuid) и попадают в снимок с признаком archived. Строки не изменяются на месте (update создает новый
+    словарь), поэтому снимок - это копия списка строк, а сериализация и запись файла выполняются в потоке,
+    не блокируя цикл событий. Снимок пишется во временный файл и атомарно заменяет предыдущий.
+
+    Атрибуты:
+    ---------
+    snapshot_path : str
+        Файл снимка в JSON ('' - без снимков). Загружается в open, если существует.
+    snapshot_interval : float
+        Период записи снимка, с; снимок пишется, только если данные изменились. При 0 снимок
+        пишется только в close.
+    """
+
+    def __init__(self, snapshot_path: str = '', snapshot_interval: float = 0.0) -> None:
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._orders: dict[str, OrderRow] = {}
+        self._index: list[str] = []
+        self._by_timestamp: list[tuple[int, str]] = []
+        self._archive: dict[str, OrderRow] = {}
+        self._archive_by_timestamp: list[tuple[int, str]] = []
+        self._words: dict[str, set[str]] = {}
+        self._vocabulary: list[str] = []
+        self._total = self._completed = 0
+        self._days: dict[str, list[int]] = {}
+        self._version = 0
+        self._saved_version = 0
+        self._snapshot_task: asyncio.Task | None = None
+
+    async def open(self) -> None:
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            rows = await asyncio.to_thread(self._read_snapshot, self.snapshot_path)
+            # Снимки без timestamp записаны до его появления
+            rows = [{**row, 'timestamp': date_to_micros(row.get('date'))} for row in rows]
+            self._orders = {row['uuid']: row for row in rows if not row.pop('archived', False)}
+            self._archive = {row['uuid']: row for row in rows if row['uuid'] not in self._orders}
+            self._index = sorted(self._orders)
+            self._by_timestamp = sorted(
+                (row['timestamp'], row['uuid']) for row in self._orders.values() if row['timestamp'] is not None
+            )
+            self._archive_by_timestamp = sorted((row['timestamp'], row['uuid']) for row in self._archive.values())
+            self._words, self._vocabulary = {}, []
+            self._total = self._completed = 0
+            self._days = {}
+            for row in self._orders.values():
+                self._index_words(row, add=True)
+                self._count(row, 1)
+            for row in self._archive.values():
+                self._count(row, 1)
+            logger.info('Загружен снимок заказов {}: {} заказов', self.snapshot_path, len(rows))
+        if self.snapshot_path and self.snapshot_interval > 0 and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def close(self) -> None:
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+        await self.snapshot()
+
+    async def snapshot(self) -> None:
+        """ Записывает снимок, если данные изменились с прошлой записи. """
+        if not self.snapshot_path or self._version == self._saved_version:
+            return
+        version = self._version
+        rows = [self._orders[uuid] for uuid in self._index]
+        rows.extend({**row, 'archived': True} for row in self._archive.values())
+        await asyncio.to_thread(self._write_snapshot, self.snapshot_path, rows)
+        self._saved_version = version
+        logger.debug('Снимок заказов {}: {} заказов', self.snapshot_path, len(rows))
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except OSError as e:
+                logger.error('Не удалось записать снимок заказов {}: {!r}', self.snapshot_path, e)
+
+    @staticmethod
+    def _read_snapshot(path: str) -> list[OrderRow]:
+        with open(path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def _write_snapshot(path: str, rows: list[OrderRow]) -> None:
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(rows, file)
+        os.replace(temporary, path)
+
+    async def list(self, include_archived=False) -> t.List[OrderRow]:
+        orders = [dict(self._orders[uuid]) for uuid in self._index]
+        if include_archived:
+            orders.extend(dict(self._archive[uuid]) for uuid in sorted(self._archive))
+        return orders
+
+    async def count(self) -> int:
+        return len(self._orders)
+
+    async def query(
+            self, date_from=None, date_to=None, completed=None, after=None, limit=0, include_archived=False
+    ) -> t.List[OrderRow]:
+        rows = self._range(self._by_timestamp, self._orders, date_from, date_to, completed, after, limit)
+        if not include_archived or completed is False:
+            return rows
+        archived = self._range(self._archive_by_timestamp, self._archive, date_from, date_to, completed, after, limit)
+        merged = heapq.merge(rows, archived, key=lambda row: (row['timestamp'], row['uuid']))
+        return list(itertools.islice(merged, limit or None))
+
+    @staticmethod
+    def _range(by_timestamp, orders, date_from, date_to, completed, after, limit) -> t.List[OrderRow]:
+        # Выборка по отсортированному индексу (timestamp, uuid) словаря заказов orders
+        position = 0
+        if date_from is not None:
+            position = bisect.bisect_left(by_timestamp, (date_from, ''))
+        if after is not None:
+            position = max(position, bisect.bisect_right(by_timestamp, tuple(after)))
+        rows = []
+        for index in range(position, len(by_timestamp)):
+            timestamp, uuid = by_timestamp[index]
+            if date_to is not None and timestamp >= date_to:
+                break
+            row = orders[uuid]
+            if completed is not None and row['completed'] != completed:
+                continue
+            rows.append(dict(row))
+            if limit and len(rows) == limit:
+                break
+        return rows
+
+    async def search(self, terms, limit, offset=0) -> t.List[OrderRow]:
+        candidates: t.Optional[set[str]] = None
+        for phrase, prefix in terms:
+            if prefix:
+                position = bisect.bisect_left(self._vocabulary, phrase[0])
+                matched = set()
+                while position < len(self._vocabulary) and self._vocabulary[position].startswith(phrase[0]):
+                    matched |= self._words[self._vocabulary[position]]
+                    position += 1
+            else:
+                matched = set.intersection(*(self._words.get(word, set()) for word in phrase))
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+        rows = []
+        for uuid in candidates:
+            rank = self._rank(words(self._orders[uuid]['name']), terms)
+            if rank is not None:
+                rows.append({**self._orders[uuid], 'rank': rank})
+        rows.sort(key=lambda row: (row['rank'], row['uuid']))
+        return rows[offset:offset + limit]
+
+    @staticmethod
+    def _rank(name: t.List[str], terms) -> t.Optional[float]:
+        # Доля слов названия, совпавших с условиями, со знаком минус; None, если фраза не встречается подряд
+        matched = set()
+        for phrase, prefix in terms:
+            if prefix:
+                matched.update(index for index, word in enumerate(name) if word.startswith(phrase[0]))
+                continue
+            starts = [
+                index for index in range(len(name) - len(phrase) + 1) if tuple(name[index:index + len(phrase)]) == phrase
+            ]
+            if not starts:
+                return None
+            for start in starts:
+                matched.update(range(start, start + len(phrase)))
+        return -len(matched) / len(name)
+
+    async def stats(self, day_from=None, day_to=None) -> OrderStats:
+        days = sorted(
+            day for day in self._days if (day_from is None or day >= day_from) and (day_to is None or day < day_to)
+        )
+        return {
+            'total': self._total,
+            'completed': self._completed,
+            'days': [{'day': day, 'total': self._days[day][0], 'completed': self._days[day][1]} for day in days],
+        }
+
+    def _count(self, row: OrderRow, sign: int) -> None:
+        # Прибавляет (sign=1) или вычитает (sign=-1) заказ из счетчиков stats
+        completed = sign if row['completed'] else 0
+        self._total += sign
+        self._completed += completed
+        day = micros_to_day(row['timestamp'])
+        if day is None:
+            return
+        counters = self._days.setdefault(day, [0, 0])
+        counters[0] += sign
+        counters[1] += completed
+        if not counters[0]:
+            del self._days[day]
+
+    def _index_words(self, row: OrderRow, add: bool) -> None:
+        for word in set(words(row['name'])):
+            uuids = self._words.get(word)
+            if add:
+                if uuids is None:
+                    uuids = self._words[word] = set()
+                    bisect.insort(self._vocabulary, word)
+                uuids.add(row['uuid'])
+            elif uuids is not None:
+                uuids.discard(row['uuid'])
+                if not uuids:
+                    del self._words[word]
+                    del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+
+    def _index_timestamp(self, row: OrderRow, add: bool) -> None:
+        if row['timestamp'] is None:
+            return
+        key = (row['timestamp'], row['uuid'])
+        if add:
+            bisect.insort(self._by_timestamp, key)
+        else:
+            del self._by_timestamp[bisect.bisect_left(self._by_timestamp, key)]
+
+    async def get(self, uuid: str) -> t.Optional[OrderRow]:
+        order = self._orders.get(uuid)
+        return dict(order) if order is not None else None
+
+    async def get_archived(self, uuid: str) -> t.Optional[OrderRow]:
+        order = self._archive.get(uuid)
+        return dict(order) if order is not None else None
+
+    async def archive(self, before: int, limit: int) -> int:
+        moved = []
+        for timestamp, uuid in self._by_timestamp:
+            if timestamp >= before or len(moved) == limit:
+                break
+            if self._orders[uuid]['completed']:
+                moved.append(uuid)
+        for uuid in moved:
+            # Счетчики stats учитывают архив, поэтому не изменяются
+            order = self._orders.pop(uuid)
+            del self._index[bisect.bisect_left(self._index, uuid)]
+            self._index_timestamp(order, add=False)
+            self._index_words(order, add=False)
+            self._archive[uuid] = order
+            bisect.insort(self._archive_by_timestamp, (order['timestamp'], uuid))
+        if moved:
+            self._version += 1
+        return len(moved)
+
+    async def insert(self, order: OrderRow) -> OrderRow:
+        # Как первичный ключ таблицы Order: повторный uuid - ошибка
+        if order['uuid'] in self._orders:
+            raise ValueError(f'Заказ {order["uuid"]} уже существует')
+        row = {'uuid': order['uuid'], 'name': order.get('name'), 'completed': order.get('completed', False),
+               'date': order.get('date'), 'timestamp': date_to_micros(order.get('date'))}
+        self._orders[row['uuid']] = row
+        bisect.insort(self._index, row['uuid'])
+        self._index_timestamp(row, add=True)
+        self._index_words(row, add=True)
+        self._count(row, 1)
+        self._version += 1
+        return dict(row)
+
+    async def update(self, uuid: str, values: OrderRow) -> t.Optional[OrderRow]:
+        order = self._orders.get(uuid)
+        if order is None:
+            return None
+        self._orders[uuid] = row = {**order, **with_timestamp(values)}
+        if row['timestamp'] != order['timestamp']:
+            self._index_timestamp(order, add=False)
+            self._index_timestamp(row, add=True)
+        if row['name'] != order['name']:
+            self._index_words(order, add=False)
+            self._index_words(row, add=True)
+        if bool(row['completed']) != bool(order['completed']) or row['timestamp'] != order['timestamp']:
+            self._count(order, -1)
+            self._count(row, 1)
+        self._version += 1
+        return dict(row)
+
+    async def delete(self, uuid: str) -> bool:
+        archived = self._archive.pop(uuid, None)
+        if archived is not None:
+            del self._archive_by_timestamp[bisect.bisect_left(self._archive_by_timestamp, (archived['timestamp'], uuid))]
+            self._count(archived, -1)
+            self._version += 1
+            return True
+        order = self._orders.pop(uuid, None)
+        if order is None:
+            return False
+        del self._index[bisect.bisect_left(self._index, uuid)]
+        self._index_timestamp(order, add=False)
+        self._index_words(order, add=False)
+        self._count(order, -1)
+        self._version += 1
+        return True
+
+
+def _sharded() -> OrderRepository:
+    # Модуль шардов импортирует этот модуль, поэтому импортируется при выборе хранилища
+    from grpc_core.servers.repositories.sharded import ShardedOrderRepository
+
+    return ShardedOrderRepository(settings.ORDER_SHARD_PATH, settings.ORDER_SHARDS, settings.ORDER_SHARD_SCAN_BATCH)
+
+
+STORAGES: dict[str, t.Callable[[], OrderRepository]] = {
+    'sqlite': PiccoloOrderRepository,
+    'memory': lambda: MemoryOrderRepository(
+        settings.ORDER_MEMORY_SNAPSHOT_PATH, settings.ORDER_MEMORY_SNAPSHOT_INTERVAL
+    ),
+    'sharded': _sharded,
+}
+
+_repository: t.Optional[OrderRepository] = None
+
+
+def get_order_repository() -> OrderRepository:
+    """
+    Возвращает общее для процесса хранилище заказов, выбранное настройкой ORDER_STORAGE.
+    """
+    global _repository
+    if _repository is None:
+        if settings.ORDER_STORAGE not in STORAGES:
+            raise ValueError(f'Неизвестное хранилище заказов ORDER_STORAGE={settings.ORDER_STORAGE!r}: '
+                             f'доступны {", ".join(STORAGES)}')
+        _repository = STORAGES[settings.ORDER_STORAGE]()
+    return _repository
+
+
+def set_order_repository(repository: t.Optional[OrderRepository]) -> None:
+    """
+    Заменяет хранилище процесса (None - создать заново по ORDER_STORAGE при следующем обращении).
+    """
+    global _repository
+    _repository = repository
@@ -0,0 +1,132 @@
+"""
+Перенос заказов между шардами SQLite при изменении их числа (ORDER_STORAGE=sharded).
+
+Выполняется при остановленном сервере. Заказы каждого исходного файла читаются пакетами с курсором по
+uuid и записываются в шард, который им назначает новое число шардов. Если исходный и новый шаблон пути
+совпадают, заказы переносятся: сначала записываются в новый шард (INSERT OR REPLACE), затем удаляются из
+старого, поэтому прерванный перенос можно просто запустить повторно с теми же параметрами. Опустевшие
+шарды сверх нового числа удаляются. Из другого источника, например одного файла режима sqlite, заказы
+копируются, а источник не изменяется. Архивные заказы (order_archive) переносятся так же в архив нового
+шарда. В конце во все шарды записывается новое число шардов (shard_meta).
+
+Запуск:
+    python -m grpc_core.servers.repositories.reshard --source-shards 4 --shards 8
+    python -m grpc_core.servers.repositories.reshard --source bd.sqlite --shards 4
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+from grpc_core.servers.repositories.schema import (CREATE_ORDER_TABLE, TABLE_COLUMNS, TABLE_NAMES, date_to_micros,
+                                                   migrations)
+from grpc_core.servers.repositories.sharded import CREATE_META_TABLE, shard_index, shard_path
+from settings import settings
+
+
+def source_paths(template: str, shards: int) -> list[str]:
+    if '{shard}' not in template:
+        return [template]
+    return [shard_path(template, shard) for shard in range(shards)]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # Иначе замена строки в INSERT OR REPLACE не вызывает триггер удаления, и в индексе поиска остается старое название
+    connection.execute('PRAGMA recursive_triggers=ON')
+    connection.execute(CREATE_ORDER_TABLE)
+    columns = [row[0] for row in connection.execute(TABLE_COLUMNS)]
+    for statement in migrations(columns, [row[0] for row in connection.execute(TABLE_NAMES)]):
+        connection.execute(statement)
+    connection.execute(CREATE_META_TABLE)
+    return connection
+
+
+def reshard(source: str, source_shards: int, target: str, shards: int, batch: int) -> dict[str, int]:
+    """
+    Переносит или копирует заказы из source в shards шардов target и возвращает число заказов,
+    записанных в каждый файл.
+    """
+    move = source == target
+    targets = [connect(shard_path(target, shard)) for shard in range(shards)]
+    written: dict[str, int] = defaultdict(int)
+    try:
+        for path in source_paths(source, source_shards):
+            if not os.path.exists(path):
+                continue
+            origin = sqlite3.connect(path, isolation_level=None)
+            # Источник, созданный до появления архива, не содержит order_archive
+            tables = {row[0] for row in origin.execute(TABLE_NAMES)}
+            for table in ('"order"', 'order_archive'):
+                if table.strip('"') not in tables:
+                    continue
+                after = ''
+                while True:
+                    # timestamp вычисляется заново: источник может быть создан до появления столбца
+                    rows = origin.execute(
+                        f'SELECT uuid, name, completed, date FROM {table} WHERE uuid > ? ORDER BY uuid LIMIT ?',
+                        (after, batch),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    after = rows[-1][0]
+                    grouped = defaultdict(list)
+                    for row in rows:
+                        index = shard_index(row[0], shards)
+                        if shard_path(target, index) != path:
+                            grouped[index].append((*row, date_to_micros(row[3])))
+                    for index, group in grouped.items():
+                        with targets[index]:
+                            targets[index].execute('BEGIN')
+                            targets[index].executemany(
+                                f'INSERT OR REPLACE INTO {table} (uuid, name, completed, date, timestamp) '
+                                f'VALUES (?, ?, ?, ?, ?)',
+                                group,
+                            )
+                        written[shard_path(target, index)] += len(group)
+                    if move and grouped:
+                        # Удаление после записи в новые шарды: прерванный перенос не теряет заказов
+                        moved = [(row[0],) for group in grouped.values() for row in group]
+                        with origin:
+                            origin.execute('BEGIN')
+                            origin.executemany(f'DELETE FROM {table} WHERE uuid = ?', moved)
+            origin.close()
+            if move and '{shard}' in source and path not in {shard_path(target, shard) for shard in range(shards)}:
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+        for shard, connection in enumerate(targets):
+            with connection:
+                connection.execute('BEGIN')
+                connection.execute('DELETE FROM shard_meta')
+                connection.execute('INSERT INTO shard_meta (shard, shards) VALUES (?, ?)', (shard, shards))
+    finally:
+        for connection in targets:
+            connection.close()
+    return dict(written)
+
+
+def main(args) -> None:
+    if '{shard}' not in args.target:
+        sys.exit(f'Путь шарда {args.target!r} должен содержать {{shard}}')
+    started = time.perf_counter()
+    written = reshard(args.source or args.target, args.source_shards, args.target, args.shards, args.batch)
+    for path, count in sorted(written.items()):
+        print(f'{path}: {count} заказов')
+    print(f'Шардов: {args.shards}, записано заказов: {sum(written.values())} за {time.perf_counter() - started:.1f} с')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.servers.repositories.reshard', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--source', help='шаблон пути текущих шардов или один файл БД, по умолчанию --target')
+    parser.add_argument('--source-shards', type=int, default=settings.ORDER_SHARDS, help='текущее число шардов')
+    parser.add_argument('--target', default=settings.ORDER_SHARD_PATH, help='шаблон пути новых шардов с {shard}')
+    parser.add_argument('--shards', type=int, required=True, help='новое число шардов')
+    parser.add_argument('--batch', type=int, default=settings.ORDER_SHARD_SCAN_BATCH, help='заказов в пакете')
+    main(parser.parse_args())
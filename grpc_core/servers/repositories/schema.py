@@ -0,0 +1,311 @@
+"""
+Схема таблицы order в SQLite, общая для хранилищ sqlite (Piccolo) и sharded.
+
+Дата заказа приходит строкой (date), например '2024-06-01' или '2024-06-01 12:00:00.123456Z', и хранится
+как есть, а рядом - столбец timestamp: та же дата в микросекундах Unix (UTC). Фильтры и сортировка по дате
+работают по timestamp через составные индексы (completed, timestamp) и (timestamp, uuid), а не сравнением
+строк при полном просмотре. Строка, дату которой не удалось разобрать, получает timestamp NULL и в выборки
+по дате не попадает.
+
+Таблицы, созданные до появления timestamp, дополняются столбцом и индексами при открытии хранилища
+(migrations), а существующие строки заполняются инструментом python -m grpc_core.servers.repositories.backfill.
+
+Поиск по названию выполняется по полнотекстовому индексу order_search (FTS5) с внешним содержимым: индекс
+хранит только слова, а строки берет из order по rowid. Триггеры order обновляют индекс в той же транзакции,
+что и изменение заказа; при создании индекса для существующей таблицы он заполняется командой rebuild.
+Ключ связи - rowid, который VACUUM может перенумеровать у таблицы без INTEGER PRIMARY KEY, поэтому после
+VACUUM индекс перестраивается: INSERT INTO order_search(order_search) VALUES('rebuild').
+
+Счетчики заказов для GetOrderStats ведут триггеры order в таблицах order_stats (одна строка: всего и выполнено)
+и order_stats_daily (то же по дням UTC для заказов с timestamp), поэтому чтение счетчиков не просматривает
+заказы. Расхождение счетчиков с таблицей проверяется и исправляется инструментом
+python -m grpc_core.servers.repositories.stats.
+
+Выполненные заказы старше ORDER_ARCHIVE_AGE переносятся в таблицу order_archive того же файла с той же схемой
+(см. grpc_core.servers.repositories.archive): таблица order и ее индексы остаются размером с рабочий набор.
+Перенос пакета - одна транзакция (ARCHIVE_BATCH), поэтому заказ всегда находится ровно в одной из таблиц.
+Счетчики учитывают обе таблицы, а поиск по названию - только order.
+"""
+import datetime
+import re
+import unicodedata
+import typing as t
+
+COLUMNS = ('uuid', 'name', 'completed', 'date', 'timestamp')
+# Схема совпадает с таблицей Order (Piccolo), чтобы файлы можно было переносить между режимами
+CREATE_ORDER_TABLE = (
+    'CREATE TABLE IF NOT EXISTS "order" (uuid VARCHAR(255) PRIMARY KEY, name VARCHAR(255) NOT NULL DEFAULT \'\', '
+    'completed INTEGER NOT NULL DEFAULT 0, date VARCHAR(255) NOT NULL DEFAULT \'\', timestamp INTEGER)'
+)
+ADD_TIMESTAMP = 'ALTER TABLE "order" ADD COLUMN timestamp INTEGER'
+CREATE_ORDER_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS order_completed_timestamp ON "order" (completed, timestamp)',
+    'CREATE INDEX IF NOT EXISTS order_timestamp_uuid ON "order" (timestamp, uuid)',
+)
+TABLE_COLUMNS = 'SELECT name FROM pragma_table_info(\'order\')'
+TABLE_NAMES = 'SELECT name FROM sqlite_master WHERE type = \'table\''
+# unicode61 приводит слова к нижнему регистру и отбрасывает диакритику (remove_diacritics 2 - и у составных букв)
+CREATE_SEARCH_TABLE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5('
+    'name, content=\'order\', content_rowid=\'rowid\', tokenize=\'unicode61 remove_diacritics 2\')'
+)
+CREATE_SEARCH_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS order_search_insert AFTER INSERT ON "order" BEGIN '
+    'INSERT INTO order_search (rowid, name) VALUES (new.rowid, new.name); END',
+    'CREATE TRIGGER IF NOT EXISTS order_search_delete AFTER DELETE ON "order" BEGIN '
+    'INSERT INTO order_search (order_search, rowid, name) VALUES (\'delete\', old.rowid, old.name); END',
+    'CREATE TRIGGER IF NOT EXISTS order_search_update AFTER UPDATE OF name ON "order" BEGIN '
+    'INSERT INTO order_search (order_search, rowid, name) VALUES (\'delete\', old.rowid, old.name); '
+    'INSERT INTO order_search (rowid, name) VALUES (new.rowid, new.name); END',
+)
+REBUILD_SEARCH = 'INSERT INTO order_search (order_search) VALUES (\'rebuild\')'
+# Меньше bm25 - релевантнее; при равной релевантности порядок по uuid, чтобы страницы не пересекались
+SEARCH_ORDERS = (
+    'SELECT o.uuid, o.name, o.completed, o.date, o.timestamp, bm25(order_search) AS rank '
+    'FROM order_search JOIN "order" AS o ON o.rowid = order_search.rowid '
+    'WHERE order_search MATCH {placeholder} ORDER BY rank, o.uuid LIMIT {placeholder} OFFSET {placeholder}'
+)
+# Слово для unicode61: буквы и цифры, все остальное - разделители
+WORD = re.compile(r'[^\W_]+')
+SEARCH_TERM = re.compile(r'"([^"]*)"?|([^\s"]+)')
+SELECT_ORDERS = 'SELECT uuid, name, completed, date, timestamp FROM "order"'
+
+CREATE_ARCHIVE_TABLE = CREATE_ORDER_TABLE.replace('"order"', 'order_archive')
+# В архиве только выполненные заказы: индекс (completed, timestamp) не нужен
+CREATE_ARCHIVE_INDEX = 'CREATE INDEX IF NOT EXISTS order_archive_timestamp_uuid ON order_archive (timestamp, uuid)'
+SELECT_ARCHIVED_ORDERS = SELECT_ORDERS.replace('"order"', 'order_archive')
+# Пакет переноса в архив: uuid пакета запоминаются во временной таблице, чтобы вставка в архив и удаление
+# из order затронули одни и те же строки. {before} и {limit} - целые числа
+ARCHIVE_BATCH = (
+    'CREATE TEMP TABLE IF NOT EXISTS archive_batch (uuid VARCHAR(255) PRIMARY KEY)',
+    'DELETE FROM temp.archive_batch',
+    'INSERT INTO temp.archive_batch (uuid) SELECT uuid FROM "order" '
+    'WHERE completed = 1 AND timestamp < {before} ORDER BY timestamp LIMIT {limit}',
+    'INSERT INTO order_archive (uuid, name, completed, date, timestamp) '
+    'SELECT uuid, name, completed, date, timestamp FROM "order" WHERE uuid IN temp.archive_batch',
+    'DELETE FROM "order" WHERE uuid IN temp.archive_batch',
+)
+COUNT_ARCHIVE_BATCH = 'SELECT COUNT(*) AS moved FROM temp.archive_batch'
+
+CREATE_STATS_TABLES = (
+    'CREATE TABLE IF NOT EXISTS order_stats (id INTEGER PRIMARY KEY CHECK (id = 0), '
+    'total INTEGER NOT NULL, completed INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS order_stats_daily (day TEXT PRIMARY KEY, total INTEGER NOT NULL, '
+    'completed INTEGER NOT NULL) WITHOUT ROWID',
+)
+# День UTC по timestamp; деление на 1e6 с дробной частью верно округляет и даты до 1970 года
+DAY = 'date({}.timestamp / 1000000.0, \'unixepoch\')'
+
+
+def _count_stats(row: str, sign: str) -> str:
+    # Тело триггера: прибавляет (sign='+') или вычитает строку row (new или old) из счетчиков.
+    # Строку order_stats создает REBUILD_STATS вместе с таблицей, поэтому она только обновляется. Пустой день
+    # может появиться только при вычитании, и только тогда он удаляется, чтобы гистограмма не копила нули.
+    # Каждое новое соединение с файлом разбирает и компилирует триггеры заново, поэтому лишние запросы
+    # в теле замедляют и открытие соединений
+    completed = f'{sign}{row}.completed'
+    body = (
+        f'UPDATE order_stats SET total = total {sign} 1, completed = completed {sign} {row}.completed WHERE id = 0; '
+        f'INSERT INTO order_stats_daily (day, total, completed) SELECT {DAY.format(row)}, {sign}1, {completed} '
+        f'WHERE {row}.timestamp IS NOT NULL '
+        f'ON CONFLICT (day) DO UPDATE SET total = total + excluded.total, completed = completed + excluded.completed; '
+    )
+    if sign == '-':
+        body += (
+            f'DELETE FROM order_stats_daily WHERE {row}.timestamp IS NOT NULL AND day = {DAY.format(row)} AND total = 0; '
+        )
+    return body
+
+
+CREATE_STATS_TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS order_stats_insert AFTER INSERT ON "order" BEGIN {_count_stats("new", "+")}END',
+    f'CREATE TRIGGER IF NOT EXISTS order_stats_delete AFTER DELETE ON "order" BEGIN {_count_stats("old", "-")}END',
+    'CREATE TRIGGER IF NOT EXISTS order_stats_update AFTER UPDATE OF completed, timestamp ON "order" '
+    'WHEN old.completed IS NOT new.completed OR old.timestamp IS NOT new.timestamp '
+    f'BEGIN {_count_stats("old", "-")}{_count_stats("new", "+")}END',
+    # Перенос в архив вычитает заказ из счетчиков при удалении из order и возвращает при вставке в архив
+    'CREATE TRIGGER IF NOT EXISTS order_archive_stats_insert AFTER INSERT ON order_archive '
+    f'BEGIN {_count_stats("new", "+")}END',
+    'CREATE TRIGGER IF NOT EXISTS order_archive_stats_delete AFTER DELETE ON order_archive '
+    f'BEGIN {_count_stats("old", "-")}END',
+)
+# Счетчики, посчитанные по самим таблицам order и order_archive: для заполнения, проверки и пересчета
+ALL_ORDERS = (
+    '(SELECT completed, timestamp FROM "order" UNION ALL SELECT completed, timestamp FROM order_archive) AS orders'
+)
+ACTUAL_STATS = f'SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM {ALL_ORDERS}'
+ACTUAL_STATS_DAILY = (
+    f'SELECT {DAY.format("orders")} AS day, COUNT(*), SUM(completed) FROM {ALL_ORDERS} '
+    'WHERE timestamp IS NOT NULL GROUP BY day ORDER BY day'
+)
+REBUILD_STATS = (
+    'DELETE FROM order_stats',
+    'DELETE FROM order_stats_daily',
+    f'INSERT INTO order_stats (id, total, completed) {ACTUAL_STATS.replace("SELECT", "SELECT 0,", 1)}',
+    f'INSERT INTO order_stats_daily (day, total, completed) {ACTUAL_STATS_DAILY}',
+)
+SELECT_STATS = 'SELECT total, completed FROM order_stats WHERE id = 0'
+SELECT_STATS_DAILY = 'SELECT day, total, completed FROM order_stats_daily'
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def date_to_micros(value: t.Optional[str]) -> t.Optional[int]:
+    """
+    Микросекунды Unix для строки даты в формате ISO 8601 (дата без времени, пробел или T между датой
+    и временем, суффикс Z или смещение); дата без часового пояса считается UTC. None, если строку
+    не удалось разобрать.
+    """
+    if not value:
+        return None
+    text = value.strip()
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return (parsed - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def with_timestamp(values: dict[str, t.Any]) -> dict[str, t.Any]:
+    """ Добавляет timestamp, если среди значений есть date. """
+    if 'date' in values:
+        return {**values, 'timestamp': date_to_micros(values['date'])}
+    return values
+
+
+def order_row(row: t.Sequence) -> dict[str, t.Any]:
+    return {'uuid': row[0], 'name': row[1], 'completed': bool(row[2]), 'date': row[3], 'timestamp': row[4]}
+
+
+def migrations(columns: t.Iterable[str], tables: t.Iterable[str] = ()) -> list[str]:
+    """
+    Запросы, приводящие существующую таблицу order с указанными столбцами к текущей схеме;
+    tables - таблицы файла БД (TABLE_NAMES), по ним определяется, нужно ли создать индекс поиска.
+    """
+    statements = [] if 'timestamp' in columns else [ADD_TIMESTAMP]
+    statements.extend((*CREATE_ORDER_INDEXES, CREATE_ARCHIVE_TABLE, CREATE_ARCHIVE_INDEX))
+    if 'order_search' not in tables:
+        statements.extend((CREATE_SEARCH_TABLE, REBUILD_SEARCH))
+    # Триггеры создаются всегда (IF NOT EXISTS): индекс без них отстал бы от таблицы
+    statements.extend(CREATE_SEARCH_TRIGGERS)
+    if 'order_stats' not in tables:
+        statements.extend((*CREATE_STATS_TABLES, *REBUILD_STATS))
+    statements.extend(CREATE_STATS_TRIGGERS)
+    return statements
+
+
+def archive_batch(before: int, limit: int) -> list[str]:
+    """ Запросы переноса в архив не больше limit выполненных заказов с timestamp < before. """
+    return [statement.format(before=int(before), limit=int(limit)) for statement in ARCHIVE_BATCH]
+
+
+def micros_to_day(timestamp: t.Optional[int]) -> t.Optional[str]:
+    """ День UTC ('2024-06-01') для микросекунд Unix, как DAY в SQLite. """
+    if timestamp is None:
+        return None
+    return (EPOCH + datetime.timedelta(microseconds=timestamp)).date().isoformat()
+
+
+def stats_days_query(day_from: t.Optional[str], day_to: t.Optional[str], placeholder: str = '?') -> tuple[str, list]:
+    """
+    Запрос гистограммы по дням в [day_from, day_to) в порядке дня (поиск по первичному ключу order_stats_daily).
+    """
+    conditions, arguments = [], []
+    if day_from is not None:
+        conditions.append(f'day >= {placeholder}')
+        arguments.append(day_from)
+    if day_to is not None:
+        conditions.append(f'day < {placeholder}')
+        arguments.append(day_to)
+    where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+    return f'{SELECT_STATS_DAILY}{where} ORDER BY day', arguments
+
+
+def _fold(char: str) -> str:
+    # Как remove_diacritics в unicode61: диакритика снимается только с латинских букв ('é' - 'e', но 'ё' остается)
+    decomposed = unicodedata.normalize('NFD', char)
+    if len(decomposed) > 1 and ord(decomposed[0]) < 0x250 and all(unicodedata.combining(mark) for mark in decomposed[1:]):
+        return decomposed[0]
+    return char
+
+
+def words(text: t.Optional[str]) -> list[str]:
+    """ Слова текста так, как их выделяет токенизатор order_search. """
+    found = (word.lower() for word in WORD.findall(text or ''))
+    return [word if word.isascii() else ''.join(map(_fold, word)) for word in found]
+
+
+def search_terms(text: str) -> list[tuple[tuple[str, ...], bool]]:
+    """
+    Разбирает строку поиска на условия (слова, префикс): слово вне кавычек ищется как начало слова
+    названия ('крас' найдет 'Красный'), текст в кавычках - как фраза из этих слов подряд. Заказ должен
+    подходить под все условия. ValueError, если в строке нет ни одного слова.
+    """
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(text):
+        if phrase:
+            if words(phrase):
+                terms.append((tuple(words(phrase)), False))
+        else:
+            terms.extend(((part,), True) for part in words(word))
+    if not terms:
+        raise ValueError(f'В запросе поиска нет слов: {text!r}')
+    return terms
+
+
+def match_expression(terms: t.Sequence[tuple[tuple[str, ...], bool]]) -> str:
+    """
+    Выражение MATCH для FTS5. Слова состоят только из букв и цифр, поэтому пользовательский текст
+    не может добавить операторы FTS5 (OR, NOT, NEAR, column:).
+    """
+    return ' '.join(f'"{" ".join(phrase)}"{"*" if prefix else ""}' for phrase, prefix in terms)
+
+
+def search_query(
+        terms: t.Sequence[tuple[tuple[str, ...], bool]], limit: int, offset: int, placeholder: str = '?'
+) -> tuple[str, list]:
+    """
+    Запрос заказов, подходящих под условия поиска, в порядке релевантности (столбец rank - bm25).
+    """
+    return SEARCH_ORDERS.format(placeholder=placeholder), [match_expression(terms), limit, offset]
+
+
+def range_query(
+        date_from: t.Optional[int],
+        date_to: t.Optional[int],
+        completed: t.Optional[bool],
+        after: t.Optional[tuple[int, str]],
+        limit: int,
+        placeholder: str = '?',
+        archived: bool = False,
+) -> tuple[str, list]:
+    """
+    Запрос заказов с timestamp в [date_from, date_to) в порядке (timestamp, uuid), после ключа after;
+    archived - запрос к order_archive вместо order.
+
+    Условия выбраны так, чтобы SQLite использовал индекс (completed, timestamp) при фильтре по completed
+    и (timestamp, uuid) без него. placeholder - знак параметра: '?' для sqlite3, '{}' для Order.raw.
+    """
+    conditions, arguments = ['timestamp IS NOT NULL'], []
+    if completed is not None:
+        conditions.append(f'completed = {placeholder}')
+        arguments.append(int(completed))
+    if date_from is not None:
+        conditions.append(f'timestamp >= {placeholder}')
+        arguments.append(date_from)
+    if date_to is not None:
+        conditions.append(f'timestamp < {placeholder}')
+        arguments.append(date_to)
+    if after is not None:
+        conditions.append(f'(timestamp, uuid) > ({placeholder}, {placeholder})')
+        arguments.extend(after)
+    select = SELECT_ARCHIVED_ORDERS if archived else SELECT_ORDERS
+    sql = f'{select} WHERE {" AND ".join(conditions)} ORDER BY timestamp, uuid'
+    if limit:
+        sql += f' LIMIT {placeholder}'
+        arguments.append(limit)
+    return sql, arguments
@@ -0,0 +1,264 @@
+"""
+Хранилище заказов в нескольких файлах SQLite (ORDER_STORAGE=sharded).
+
+SQLite допускает одного пишущего на файл БД, поэтому с одним bd.sqlite скорость записи не растет с числом
+ядер. Здесь заказы распределяются по ORDER_SHARDS файлам (ORDER_SHARD_PATH, {shard} - номер шарда) по хешу
+uuid. У каждого шарда свое соединение aiosqlite в собственном потоке, поэтому запросы к разным шардам
+выполняются параллельно. Чтение, изменение и удаление заказа по uuid обращается к одному шарду.
+
+Список заказов собирается слиянием (k-way merge) шардов в порядке uuid: из каждого шарда строки читаются
+пакетами по ORDER_SHARD_SCAN_BATCH с курсором по ключу (uuid > последнего прочитанного), а не OFFSET,
+поэтому каждый пакет - поиск по первичному ключу. Выборка по диапазону дат выполняется на всех шардах
+параллельно (не больше limit строк с каждого) и сливается в порядке (timestamp, uuid). Поиск по названию
+так же сливает первые offset + limit результатов каждого шарда по (rank, uuid); bm25 считается по статистике
+слов своего шарда, но при распределении по хешу она у шардов почти одинакова. Счетчики stats ведутся
+в каждом шарде и складываются при чтении. Архив выполненных заказов (order_archive) у каждого шарда свой,
+пакет переноса в архив - отдельная транзакция каждого шарда.
+
+Номер и число шардов записаны в каждом файле (таблица shard_meta): сервер не запускается, если ORDER_SHARDS
+не совпадает с записанным, иначе часть заказов оказалась бы в "чужих" шардах. Число шардов меняется при
+остановленном сервере инструментом python -m grpc_core.servers.repositories.reshard.
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import typing as t
+
+import aiosqlite
+
+from grpc_core.servers.repositories.order import OrderRepository, OrderRow, OrderStats
+from grpc_core.servers.repositories.schema import (COLUMNS, COUNT_ARCHIVE_BATCH, CREATE_ORDER_TABLE,
+                                                   SELECT_ARCHIVED_ORDERS, SELECT_ORDERS, SELECT_STATS, TABLE_COLUMNS,
+                                                   TABLE_NAMES, archive_batch, migrations, order_row, range_query,
+                                                   search_query, stats_days_query, with_timestamp)
+
+CREATE_META_TABLE = 'CREATE TABLE IF NOT EXISTS shard_meta (shard INTEGER NOT NULL, shards INTEGER NOT NULL)'
+
+
+def shard_index(uuid: str, shards: int) -> int:
+    """
+    Номер шарда заказа. Хеш стабилен между процессами и запусками (в отличие от встроенного hash).
+    """
+    return int.from_bytes(hashlib.blake2b(uuid.encode(), digest_size=8).digest(), 'big') % shards
+
+
+def shard_path(template: str, shard: int) -> str:
+    return template.format(shard=shard)
+
+
+class ShardedOrderRepository(OrderRepository):
+    """
+    Заказы в shards файлах SQLite, распределенные по хешу uuid.
+
+    Атрибуты:
+    ---------
+    path : str
+        Шаблон пути файла шарда с подстановкой {shard}.
+    shards : int
+        Число шардов.
+    batch : int
+        Размер пакета чтения шарда при слиянии списка.
+    """
+
+    def __init__(self, path: str, shards: int, batch: int = 1000) -> None:
+        if '{shard}' not in path:
+            raise ValueError(f'Путь шарда {path!r} должен содержать {{shard}}')
+        self.path = path
+        self.shards = shards
+        self.batch = batch
+        self._connections: list[aiosqlite.Connection] = []
+
+    async def open(self) -> None:
+        # Файл за пределами числа шардов остается после уменьшения ORDER_SHARDS без переноса заказов
+        if os.path.exists(shard_path(self.path, self.shards)):
+            raise RuntimeError(
+                f'Найден шард {shard_path(self.path, self.shards)} сверх ORDER_SHARDS={self.shards}: '
+                f'перенесите заказы инструментом grpc_core.servers.repositories.reshard'
+            )
+        for shard in range(self.shards):
+            # Автокоммит: каждый запрос - отдельная транзакция, запросы разных задач не смешиваются
+            connection = await aiosqlite.connect(shard_path(self.path, shard), isolation_level=None)
+            self._connections.append(connection)
+            await connection.execute('PRAGMA journal_mode=WAL')
+            await connection.execute('PRAGMA synchronous=NORMAL')
+            await connection.execute(CREATE_ORDER_TABLE)
+            async with connection.execute(TABLE_COLUMNS) as cursor:
+                columns = [row[0] for row in await cursor.fetchall()]
+            async with connection.execute(TABLE_NAMES) as cursor:
+                tables = [row[0] for row in await cursor.fetchall()]
+            for statement in migrations(columns, tables):
+                await connection.execute(statement)
+            await connection.execute(CREATE_META_TABLE)
+            async with connection.execute('SELECT shard, shards FROM shard_meta') as cursor:
+                meta = await cursor.fetchone()
+            if meta is None:
+                await connection.execute('INSERT INTO shard_meta (shard, shards) VALUES (?, ?)', (shard, self.shards))
+            elif tuple(meta) != (shard, self.shards):
+                raise RuntimeError(
+                    f'Шард {shard_path(self.path, shard)} записан как {meta[0]} из {meta[1]}, а ORDER_SHARDS={self.shards}: '
+                    f'перенесите заказы инструментом grpc_core.servers.repositories.reshard'
+                )
+
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            await connection.close()
+
+    async def ping(self) -> None:
+        await asyncio.gather(*(connection.execute('SELECT 1') for connection in self._connections))
+
+    def _connection(self, uuid: str) -> aiosqlite.Connection:
+        return self._connections[shard_index(uuid, self.shards)]
+
+    async def list(self, include_archived=False) -> t.List[OrderRow]:
+        orders = [row async for row in self.scan()]
+        if include_archived:
+            orders.extend([row async for row in self.scan(select=SELECT_ARCHIVED_ORDERS)])
+        return orders
+
+    async def scan(self, after: str = '', select: str = SELECT_ORDERS) -> t.AsyncIterator[OrderRow]:
+        """
+        Заказы всех шардов в порядке uuid, начиная после after; select - запрос к order или order_archive.
+        """
+        iterators = [self._scan_shard(connection, after, select) for connection in self._connections]
+        heap = []
+        for index, iterator in enumerate(iterators):
+            row = await anext(iterator, None)
+            if row is not None:
+                heap.append((row['uuid'], index, row))
+        heapq.heapify(heap)
+        while heap:
+            _, index, row = heap[0]
+            yield row
+            following = await anext(iterators[index], None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following['uuid'], index, following))
+
+    async def _scan_shard(self, connection: aiosqlite.Connection, after: str, select: str) -> t.AsyncIterator[OrderRow]:
+        while True:
+            async with connection.execute(f'{select} WHERE uuid > ? ORDER BY uuid LIMIT ?', (after, self.batch)) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                yield order_row(row)
+            if len(rows) < self.batch:
+                return
+            after = rows[-1][0]
+
+    async def count(self) -> int:
+        async def shard_count(connection: aiosqlite.Connection) -> int:
+            async with connection.execute('SELECT COUNT(*) FROM "order"') as cursor:
+                return (await cursor.fetchone())[0]
+
+        return sum(await asyncio.gather(*(shard_count(connection) for connection in self._connections)))
+
+    async def query(
+            self, date_from=None, date_to=None, completed=None, after=None, limit=0, include_archived=False
+    ) -> t.List[OrderRow]:
+        # Каждый шард отдает не больше limit первых строк, общий результат - первые limit из их слияния
+        queries = [range_query(date_from, date_to, completed, after, limit)]
+        # В архиве только выполненные заказы
+        if include_archived and completed is not False:
+            queries.append(range_query(date_from, date_to, completed, after, limit, archived=True))
+
+        async def shard_rows(connection: aiosqlite.Connection, sql: str, arguments: list) -> list[OrderRow]:
+            async with connection.execute(sql, arguments) as cursor:
+                return [order_row(row) for row in await cursor.fetchall()]
+
+        results = await asyncio.gather(*(
+            shard_rows(connection, sql, arguments) for sql, arguments in queries for connection in self._connections
+        ))
+        merged = heapq.merge(*results, key=lambda row: (row['timestamp'], row['uuid']))
+        return list(itertools.islice(merged, limit or None))
+
+    async def search(self, terms, limit, offset=0) -> t.List[OrderRow]:
+        sql, arguments = search_query(terms, offset + limit, 0)
+
+        async def shard_rows(connection: aiosqlite.Connection) -> list[OrderRow]:
+            async with connection.execute(sql, arguments) as cursor:
+                return [{**order_row(row), 'rank': row[5]} for row in await cursor.fetchall()]
+
+        results = await asyncio.gather(*(shard_rows(connection) for connection in self._connections))
+        merged = heapq.merge(*results, key=lambda row: (row['rank'], row['uuid']))
+        return list(itertools.islice(merged, offset, offset + limit))
+
+    async def stats(self, day_from=None, day_to=None) -> OrderStats:
+        sql, arguments = stats_days_query(day_from, day_to)
+
+        async def shard_stats(connection: aiosqlite.Connection) -> tuple[t.Optional[tuple], list]:
+            async with connection.execute(SELECT_STATS) as cursor:
+                totals = await cursor.fetchone()
+            async with connection.execute(sql, arguments) as cursor:
+                return totals, await cursor.fetchall()
+
+        total = completed = 0
+        days: dict[str, list[int]] = {}
+        for totals, rows in await asyncio.gather(*(shard_stats(connection) for connection in self._connections)):
+            if totals is not None:
+                total += totals[0]
+                completed += totals[1]
+            for day, day_total, day_completed in rows:
+                counters = days.setdefault(day, [0, 0])
+                counters[0] += day_total
+                counters[1] += day_completed
+        return {
+            'total': total,
+            'completed': completed,
+            'days': [{'day': day, 'total': days[day][0], 'completed': days[day][1]} for day in sorted(days)],
+        }
+
+    async def get(self, uuid: str) -> t.Optional[OrderRow]:
+        async with self._connection(uuid).execute(f'{SELECT_ORDERS} WHERE uuid = ?', (uuid,)) as cursor:
+            row = await cursor.fetchone()
+        return order_row(row) if row is not None else None
+
+    async def get_archived(self, uuid: str) -> t.Optional[OrderRow]:
+        async with self._connection(uuid).execute(f'{SELECT_ARCHIVED_ORDERS} WHERE uuid = ?', (uuid,)) as cursor:
+            row = await cursor.fetchone()
+        return order_row(row) if row is not None else None
+
+    async def archive(self, before: int, limit: int) -> int:
+        # Пакет каждого шарда - отдельная транзакция, шарды переносятся параллельно. Транзакция выполняется
+        # одним executescript в потоке соединения, поэтому запросы других задач к шарду в нее не попадают
+        script = ';\n'.join(('BEGIN IMMEDIATE', *archive_batch(before, limit), 'COMMIT;'))
+
+        async def shard_archive(connection: aiosqlite.Connection) -> int:
+            try:
+                await connection.executescript(script)
+            except BaseException:
+                if connection.in_transaction:
+                    await connection.execute('ROLLBACK')
+                raise
+            async with connection.execute(COUNT_ARCHIVE_BATCH) as cursor:
+                return (await cursor.fetchone())[0]
+
+        return sum(await asyncio.gather(*(shard_archive(connection) for connection in self._connections)))
+
+    async def insert(self, order: OrderRow) -> OrderRow:
+        row = with_timestamp({'completed': False, **order})
+        await self._connection(row['uuid']).execute(
+            'INSERT INTO "order" (uuid, name, completed, date, timestamp) VALUES (?, ?, ?, ?, ?)',
+            tuple(row[column] for column in COLUMNS),
+        )
+        return row
+
+    async def update(self, uuid: str, values: OrderRow) -> t.Optional[OrderRow]:
+        values = with_timestamp(values)
+        columns = [column for column in values if column in COLUMNS]
+        if columns:
+            await self._connection(uuid).execute(
+                f'UPDATE "order" SET {", ".join(f"{column} = ?" for column in columns)} WHERE uuid = ?',
+                (*(values[column] for column in columns), uuid),
+            )
+        return await self.get(uuid)
+
+    async def delete(self, uuid: str) -> bool:
+        connection = self._connection(uuid)
+        async with connection.execute('DELETE FROM "order" WHERE uuid = ?', (uuid,)) as cursor:
+            if cursor.rowcount > 0:
+                return True
+        async with connection.execute('DELETE FROM order_archive WHERE uuid = ?', (uuid,)) as cursor:
+            return cursor.rowcount > 0
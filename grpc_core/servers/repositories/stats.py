@@ -0,0 +1,94 @@
+"""
+Проверка и пересчет счетчиков заказов GetOrderStats (таблицы order_stats и order_stats_daily).
+
+Счетчики ведут триггеры таблицы order, и разойтись с ней они могут только при изменении файла в обход
+триггеров, например если таблицу правили до их появления или восстановили из копии без счетчиков. Инструмент
+считает заказы по самой таблице и сравнивает с хранимыми счетчиками: общими и по каждому дню. С --rebuild
+счетчики файла с расхождением пересчитываются в одной транзакции (BEGIN IMMEDIATE), поэтому запись сервера
+ждет ее завершения, а счетчики не пропускают заказы, созданные во время пересчета. Код выхода 1, если
+найдено расхождение и счетчики не пересчитаны.
+
+Запуск:
+    python -m grpc_core.servers.repositories.stats --path bd.sqlite
+    python -m grpc_core.servers.repositories.stats --path 'bd.order.{shard}.sqlite' --shards 4 --rebuild
+"""
+import argparse
+import sqlite3
+import sys
+
+from grpc_core.servers.repositories.schema import (ACTUAL_STATS, ACTUAL_STATS_DAILY, REBUILD_STATS, SELECT_STATS,
+                                                   SELECT_STATS_DAILY, TABLE_COLUMNS, TABLE_NAMES, migrations)
+from settings import settings
+
+
+def drift(connection: sqlite3.Connection) -> list[str]:
+    """
+    Расхождения хранимых счетчиков с таблицей order: по строке на счетчик.
+    """
+    differences = []
+    stored = connection.execute(SELECT_STATS).fetchone() or (0, 0)
+    actual = connection.execute(ACTUAL_STATS).fetchone()
+    for name, stored_value, actual_value in zip(('total', 'completed'), stored, actual):
+        if stored_value != actual_value:
+            differences.append(f'{name}: хранится {stored_value}, в таблице {actual_value}')
+    stored_days = {day: (total, completed) for day, total, completed in connection.execute(SELECT_STATS_DAILY)}
+    actual_days = {day: (total, completed) for day, total, completed in connection.execute(ACTUAL_STATS_DAILY)}
+    for day in sorted(stored_days.keys() | actual_days.keys()):
+        stored_day, actual_day = stored_days.get(day, (0, 0)), actual_days.get(day, (0, 0))
+        if stored_day != actual_day:
+            differences.append(f'{day}: хранится {stored_day}, в таблице {actual_day} (total, completed)')
+    return differences
+
+
+def check(path: str, rebuild: bool) -> list[str]:
+    """
+    Проверяет счетчики файла path и, если rebuild и есть расхождения, пересчитывает их.
+    Возвращает найденные расхождения.
+    """
+    connection = sqlite3.connect(path, isolation_level=None, timeout=30)
+    try:
+        columns = [row[0] for row in connection.execute(TABLE_COLUMNS)]
+        for statement in migrations(columns, [row[0] for row in connection.execute(TABLE_NAMES)]):
+            connection.execute(statement)
+        # Проверка и пересчет в одной транзакции: между ними сервер не изменит заказы
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            differences = drift(connection)
+            if rebuild and differences:
+                for statement in REBUILD_STATS:
+                    connection.execute(statement)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return differences
+    finally:
+        connection.close()
+
+
+def main(args) -> None:
+    paths = [args.path.format(shard=shard) for shard in range(args.shards)] if '{shard}' in args.path else [args.path]
+    unresolved = False
+    for path in paths:
+        differences = check(path, args.rebuild)
+        if not differences:
+            print(f'{path}: счетчики совпадают с таблицей')
+            continue
+        print(f'{path}: расхождений {len(differences)}{", счетчики пересчитаны" if args.rebuild else ""}')
+        for difference in differences[:args.show]:
+            print(f'    {difference}')
+        unresolved = unresolved or not args.rebuild
+    if unresolved:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m grpc_core.servers.repositories.stats', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--path', default='bd.sqlite', help='файл БД или шаблон пути шардов с {shard}')
+    parser.add_argument('--shards', type=int, default=settings.ORDER_SHARDS, help='число шардов для шаблона с {shard}')
+    parser.add_argument('--rebuild', action='store_true', help='пересчитать счетчики при расхождении')
+    parser.add_argument('--show', type=int, default=10, help='сколько расхождений вывести для файла')
+    main(parser.parse_args())
@@ -1,6 +1,6 @@
 import uuid
 from enum import Enum
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -17,12 +17,59 @@ class OrderResponse(BaseModel):
 
 
 class OrderListRequest(BaseModel):
-    pass
+    date_from: str = ''
+    date_to: str = ''
+    completed: Optional[bool] = None
+    limit: int = 0
+    page_token: str = ''
+    include_archived: bool = False
+
+    @property
+    def filtered(self) -> bool:
+        """ Задан ли хотя бы один фильтр или страница: иначе запрашиваются все заказы. """
+        return bool(self.date_from or self.date_to or self.completed is not None or self.limit or self.page_token)
 
 
 class OrderListResponse(BaseModel):
     notification_type: str = OrderNotificationEnum.ORDER_NOTIFICATION_TYPE_ENUM_OK.value
     orders: List[OrderResponse]
+    next_page_token: str = ''
+
+
+class OrderSearchRequest(BaseModel):
+    query: str = ''
+    limit: int = 0
+    page_token: str = ''
+
+
+class OrderSearchResult(BaseModel):
+    order: OrderResponse
+    rank: float = 0.0
+
+
+class OrderSearchResponse(BaseModel):
+    results: List[OrderSearchResult]
+    next_page_token: str = ''
+
+
+class OrderStatsRequest(BaseModel):
+    date_from: str = ''
+    date_to: str = ''
+
+
+class OrderDayStats(BaseModel):
+    day: str
+    total: int = 0
+    completed: int = 0
+    pending: int = 0
+
+
+class OrderStatsResponse(BaseModel):
+    notification_type: str = OrderNotificationEnum.ORDER_NOTIFICATION_TYPE_ENUM_OK.value
+    total: int = 0
+    completed: int = 0
+    pending: int = 0
+    days: List[OrderDayStats] = []
 
 
 class OrderCreateRequest(BaseModel):
@@ -0,0 +1,124 @@
+import grpc
+from loguru import logger
+
+from grpc_core.protos.admin import admin_pb2, admin_pb2_grpc
+from grpc_core.servers import profiling
+from settings import settings
+
+# Размер части отчета профилировщика в потоке ответов, символов
+CHUNK_SIZE = 16 * 1024
+DEFAULT_PSTATS_SORT = 'cumulative'
+DEFAULT_PSTATS_LIMIT = 50
+DEFAULT_SAMPLING_INTERVAL_MS = 5.0
+DEFAULT_TRACEMALLOC_LIMIT = 20
+DEFAULT_TASK_STACK_LIMIT = 20
+
+
+class AdminService(admin_pb2_grpc.AdminServiceServicer):
+    """
+    Служебный gRPC сервис для диагностики работающего сервера (см. grpc_core.servers.profiling).
+
+    Доступен только с токеном: в отличие от Health сервис не входит в публичные сервисы AuthInterceptor.
+    Профилирование и tracemalloc выполняются по одной сессии за раз; пока сессия идет, остальные
+    запросы получают FAILED_PRECONDITION.
+
+    Методы:
+    -------
+    async def Profile(self, request, context)
+        Профилирует цикл событий duration секунд и отправляет отчет pstats или collapsed-stack частями.
+
+    async def TraceMalloc(self, request, context)
+        Возвращает самые большие источники выделенной памяти по tracemalloc.
+
+    async def TaskStacks(self, request, context)
+        Возвращает стеки текущих задач asyncio.
+    """
+
+    @staticmethod
+    async def _validate_duration(duration: float, context) -> None:
+        if not 0 < duration <= settings.ADMIN_PROFILE_MAX_DURATION:
+            await context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT,
+                f'duration должно быть больше 0 и не больше {settings.ADMIN_PROFILE_MAX_DURATION} с',
+            )
+
+    async def Profile(self, request, context):
+        """
+        Профилирует цикл событий сервера и возвращает отчет потоком сообщений ProfileChunk.
+
+        Параметры:
+        ----------
+        request : admin_pb2.ProfileRequest
+            Длительность, профилировщик (CPROFILE или SAMPLING), сортировка и число строк pstats,
+            интервал выборки.
+        context : grpc.aio.ServicerContext
+            Контекст вызова gRPC.
+        """
+        await self._validate_duration(request.duration, context)
+        profiler = admin_pb2.Profiler.Name(request.profiler)
+        logger.info('Профилирование {}: {} с', profiler, request.duration)
+        try:
+            if request.profiler == admin_pb2.SAMPLING:
+                interval = (request.interval_ms or DEFAULT_SAMPLING_INTERVAL_MS) / 1000
+                report = await profiling.profile_sampling(request.duration, interval)
+            else:
+                report = await profiling.profile_cprofile(
+                    request.duration, request.sort or DEFAULT_PSTATS_SORT, request.limit or DEFAULT_PSTATS_LIMIT
+                )
+        except profiling.DiagnosticsBusyError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        for start in range(0, len(report), CHUNK_SIZE):
+            yield admin_pb2.ProfileChunk(data=report[start:start + CHUNK_SIZE])
+
+    async def TraceMalloc(self, request, context) -> admin_pb2.TraceMallocResponse:
+        """
+        Возвращает самые большие источники выделенной и не освобожденной памяти.
+
+        Если tracemalloc не запущен, он запускается на duration секунд.
+
+        Параметры:
+        ----------
+        request : admin_pb2.TraceMallocRequest
+            Длительность, группировка (lineno, filename, traceback) и число источников.
+        context : grpc.aio.ServicerContext
+            Контекст вызова gRPC.
+        """
+        await self._validate_duration(request.duration, context)
+        group_by = request.group_by or 'lineno'
+        try:
+            statistics, current, peak = await profiling.tracemalloc_top(
+                request.duration, group_by, request.limit or DEFAULT_TRACEMALLOC_LIMIT
+            )
+        except profiling.DiagnosticsBusyError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        allocations = [
+            admin_pb2.Allocation(
+                location='\n'.join(stat.traceback.format()) if group_by == 'traceback' else str(stat.traceback),
+                size=stat.size,
+                count=stat.count,
+            )
+            for stat in statistics
+        ]
+        return admin_pb2.TraceMallocResponse(allocations=allocations, traced_current=current, traced_peak=peak)
+
+    async def TaskStacks(self, request, context) -> admin_pb2.TaskStacksResponse:
+        """
+        Возвращает имя, корутину и стек каждой задачи asyncio процесса сервера.
+
+        Параметры:
+        ----------
+        request : admin_pb2.TaskStacksRequest
+            Максимальное число кадров стека задачи.
+        context : grpc.aio.ServicerContext
+            Контекст вызова gRPC.
+        """
+        tasks = profiling.task_stacks(request.limit or DEFAULT_TASK_STACK_LIMIT)
+        return admin_pb2.TaskStacksResponse(
+            tasks=[admin_pb2.TaskStack(name=name, coroutine=coroutine, stack=stack) for name, coroutine, stack in tasks]
+        )
@@ -1,46 +1,178 @@
 import asyncio
+import hashlib
+import time
+
+import grpc
 from loguru import logger
 
 from grpc_core.protos.echo import echo_pb2
 from grpc_core.protos.echo import echo_pb2_grpc
+from settings import settings
+
+# Темп ответов по умолчанию, если клиент не передал replies и interval
+DEFAULT_REPLIES = 3
+DEFAULT_INTERVAL = 1.0
+
+
+class StreamStats:
+    """
+    Счетчик отправленных сообщений и байт стрима ответов.
 
-from grpc_core.servers.utils import GrpcParseMessage
+    По завершении стрима итог передается клиенту в trailing metadata: echo-messages, echo-bytes,
+    echo-messages-per-sec и echo-bytes-per-sec.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.messages = 0
+        self.bytes = 0
+
+    def add(self, size: int) -> None:
+        self.messages += 1
+        self.bytes += size
+
+    def trailing_metadata(self) -> tuple[tuple[str, str], ...]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            ('echo-messages', str(self.messages)),
+            ('echo-bytes', str(self.bytes)),
+            ('echo-messages-per-sec', f'{self.messages / elapsed:.1f}'),
+            ('echo-bytes-per-sec', f'{self.bytes / elapsed:.1f}'),
+        )
 
 
 class EchoService(echo_pb2_grpc.EchoServiceServicer):
-    def __init__(self):
-        self.message = GrpcParseMessage()
+    """
+    Эхо сервис, используемый как нагрузочная цель для стримов.
+
+    ServerStream и BothStream отвечают на каждое сообщение replies раз с паузой interval и полезной
+    нагрузкой payload_size байт (параметры сообщения EchoMessage). Ответы отправляются через context.write:
+    вызов ждет, пока сообщение примет транспорт, поэтому медленный клиент через управление потоком HTTP/2
+    замедляет сервер, а не копит ответы в памяти. Итоговая скорость стрима передается в trailing metadata.
+    Сообщения стримов логируются на уровне DEBUG и только сводкой: имя пользователя и длина сообщения.
+    """
+
+    @staticmethod
+    def _pacing(request) -> tuple[int, float, echo_pb2.EchoMessage]:
+        # Параметры темпа и ответ, который отправляется replies раз; ValueError, если параметры недопустимы
+        replies = request.replies if request.HasField('replies') else DEFAULT_REPLIES
+        interval = request.interval if request.HasField('interval') else DEFAULT_INTERVAL
+        if replies < 0 or interval < 0:
+            raise ValueError('replies и interval не могут быть отрицательными')
+        if not 0 <= request.payload_size <= settings.ECHO_MAX_PAYLOAD_SIZE:
+            raise ValueError(f'payload_size должен быть от 0 до {settings.ECHO_MAX_PAYLOAD_SIZE} байт')
+        reply = echo_pb2.EchoMessage(
+            username=request.username, message=request.message, payload=bytes(request.payload_size)
+        )
+        return replies, interval, reply
+
+    @staticmethod
+    async def _reply(reply: echo_pb2.EchoMessage, replies: int, interval: float, context, stats: StreamStats) -> None:
+        # Отправляет ответ replies раз с паузой interval между ответами
+        size = reply.ByteSize()
+        for i in range(replies):
+            if i and interval:
+                await asyncio.sleep(interval)
+            await context.write(reply)
+            stats.add(size)
+
+    @staticmethod
+    def _finish(method: str, context, stats: StreamStats) -> None:
+        metadata = stats.trailing_metadata()
+        context.set_trailing_metadata(metadata)
+        logger.info('{} завершен: {}', method, ', '.join(f'{key}={value}' for key, value in metadata))
 
     # Асинхронный метод для обработки клиентского стрима.
     async def ClientStream(self, request_iterator, context) -> echo_pb2.DelayedReply:
-        # Создание ответа с отложенным ответом.
+        """
+        Возвращает принятые сообщения стрима и итог: их число, размер и SHA-256.
+
+        Сохраняется не больше ECHO_CLIENT_STREAM_MAX_MESSAGES сообщений общим размером не больше
+        ECHO_CLIENT_STREAM_MAX_BYTES. При превышении лимита вызов завершается RESOURCE_EXHAUSTED, а при
+        ECHO_CLIENT_STREAM_OVERFLOW='summary' стрим дочитывается до конца без сохранения сообщений,
+        и ответ содержит сохраненные сообщения и итог по всем принятым с truncated=True.
+        """
         response = echo_pb2.DelayedReply()
+        digest = hashlib.sha256()
+        messages = size = 0
+        truncated = False
         # Асинхронный цикл для обработки каждого запроса из стрима.
         async for request in request_iterator:
-            logger.info(f'Приняли запрос от стрим клиента: {self.message.rpc_to_dict(request)}')
+            logger.debug('Приняли запрос от стрим клиента: username={}, {} символов', request.username, len(request.message))
+            data = request.SerializeToString()
+            messages += 1
+            size += len(data)
+            # Длина перед каждым сообщением, чтобы разная нарезка одних и тех же байт давала разный digest
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+            if truncated:
+                continue
+            if messages > settings.ECHO_CLIENT_STREAM_MAX_MESSAGES or size > settings.ECHO_CLIENT_STREAM_MAX_BYTES:
+                if settings.ECHO_CLIENT_STREAM_OVERFLOW != 'summary':
+                    await context.abort(
+                        grpc.StatusCode.RESOURCE_EXHAUSTED,
+                        f'Клиентский стрим превысил лимит: {settings.ECHO_CLIENT_STREAM_MAX_MESSAGES} сообщений '
+                        f'или {settings.ECHO_CLIENT_STREAM_MAX_BYTES} байт',
+                    )
+                truncated = True
+                continue
             response.response.append(request)
+        response.summary.messages = messages
+        response.summary.bytes = size
+        response.summary.digest = digest.hexdigest()
+        response.summary.truncated = truncated
+        logger.info('ClientStream завершен: messages={}, bytes={}, truncated={}', messages, size, truncated)
         return response
 
     # Асинхронный метод для обработки серверного стрима.
-    async def ServerStream(self, request, context):
-        logger.info(f'Приняли запрос от клиента: {self.message.rpc_to_dict(request)}')
-        # Цикл для отправки нескольких ответов клиенту.
-        for _ in range(3):
-            # Отправка текущего запроса обратно в качестве ответа.
-            yield request
-            logger.info(f'Ответил стрим сервер: {self.message.rpc_to_dict(request)}')
-            await asyncio.sleep(1)
+    async def ServerStream(self, request, context) -> None:
+        logger.info('Приняли запрос от клиента: username={}, {} символов', request.username, len(request.message))
+        try:
+            replies, interval, reply = self._pacing(request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        stats = StreamStats()
+        await self._reply(reply, replies, interval, context, stats)
+        self._finish('ServerStream', context, stats)
 
     # Асинхронный метод для обработки двунаправленного стрима.
-    async def BothStream(self, request_iterator, context):
-        # Асинхронный цикл для обработки каждого запроса из стрима.
-        async for request in request_iterator:
-            logger.info(f'Приняли запрос от стрима клиента: {self.message.rpc_to_dict(request)}')
-            # Цикл для отправки нескольких ответов клиенту на каждый запрос.
-            for i in range(3):
-                # Отправка текущего запроса обратно в качестве ответа.
-                yield request
-                logger.info(f'Ответил стрим сервер: {self.message.rpc_to_dict(request)}')
-                # Асинхронная пауза на 1 секунду.
-                await asyncio.sleep(1)
+    async def BothStream(self, request_iterator, context) -> None:
+        """
+        Читает и отвечает одновременно: задача чтения принимает сообщения клиента в очередь,
+        а обработчик отправляет ответы на них по порядку.
+
+        Принятые и еще не отвеченные сообщения занимают места семафора (не больше ECHO_MAX_IN_FLIGHT):
+        когда места заканчиваются, чтение останавливается, и клиента сдерживает управление потоком
+        HTTP/2. Пока места есть, клиент может отправлять сообщения, не дожидаясь ответов на предыдущие.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(settings.ECHO_MAX_IN_FLIGHT)
+        stats = StreamStats()
+        reader = asyncio.create_task(self._read_requests(request_iterator, context, queue, slots))
+        try:
+            while (item := await queue.get()) is not None:
+                replies, interval, reply = item
+                await self._reply(reply, replies, interval, context, stats)
+                slots.release()
+        except BaseException:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            raise
+        # Очередь закрыта задачей чтения. Если чтение завершилось ошибкой, а не концом стрима, пробрасываем ее;
+        # статус ответа устанавливается здесь, так как abort должен вызываться из задачи обработчика
+        try:
+            reader.result()
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        self._finish('BothStream', context, stats)
 
+    async def _read_requests(self, request_iterator, context, queue: asyncio.Queue, slots: asyncio.Semaphore) -> None:
+        # Задача чтения BothStream: кладет в очередь параметры ответа на каждое сообщение, в конце - None
+        try:
+            async for request in request_iterator:
+                logger.debug('Приняли запрос от стрима клиента: username={}, {} символов', request.username, len(request.message))
+                item = self._pacing(request)
+                await slots.acquire()
+                queue.put_nowait(item)
+        finally:
+            queue.put_nowait(None)
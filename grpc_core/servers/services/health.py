@@ -1,21 +1,36 @@
-import asyncio
-
+import grpc
 from grpc_health.v1 import health_pb2
 from grpc_health.v1 import health_pb2_grpc
 
+from grpc_core.health import registry
+
 
 class HealthService(health_pb2_grpc.HealthServicer):
+    """
+    Сервис gRPC Health со статусами из реестра grpc_core.health.
+
+    Check возвращает текущий статус запрошенного сервиса ('' - сервер целиком) или NOT_FOUND для
+    незарегистрированного. Watch отправляет текущий статус сразу после подписки, а затем только при его
+    смене; незарегистрированный сервис получает SERVICE_UNKNOWN, и подписка остается открытой.
+    """
+
     # Асинхронный метод для проверки состояния.
     async def Check(self, request, context):
-        # Возвращаем объект HealthCheckResponse со статусом SERVING, указывая, что сервис работает нормально
-        return health_pb2.HealthCheckResponse(
-            status=health_pb2.HealthCheckResponse.SERVING
-        )
+        status = registry.status(request.service)
+        if status is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f'Неизвестный сервис: {request.service}')
+        return health_pb2.HealthCheckResponse(status=status)
 
     # Асинхронный метод для подписки на обновления (мониторинга) состояния.
     async def Watch(self, request, context):
-        while True:
-            current_status = health_pb2.HealthCheckResponse.SERVING
-            response = health_pb2.HealthCheckResponse(status=current_status)
-            yield response
-            await asyncio.sleep(1)
+        queue = registry.subscribe(request.service)
+        try:
+            last = None
+            while True:
+                status = await queue.get()
+                # Между сменами статус мог вернуться к уже отправленному: повтор не нужен
+                if status != last:
+                    last = status
+                    yield health_pb2.HealthCheckResponse(status=status)
+        finally:
+            registry.unsubscribe(request.service, queue)
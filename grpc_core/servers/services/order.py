@@ -1,16 +1,18 @@
 import asyncio
 
+import grpc
 from loguru import logger
 
-from opentelemetry import trace
-from opentelemetry.trace.status import Status, StatusCode
-
+from grpc_core.servers.tracing import traced
 from grpc_core.servers.utils import GrpcParseMessage
 from grpc_core.protos.check import check_pb2
 from grpc_core.protos.order import order_pb2
 from grpc_core.protos.order import order_pb2_grpc
-from grpc_core.servers.schemas.order import OrderCreateRequest, OrderReadRequest, OrderUpdateRequest
-from grpc_core.servers.handlers.order import OrderHandler
+from grpc_core.servers.schemas.order import (OrderCreateRequest, OrderCreateResponse, OrderListRequest,
+                                             OrderReadRequest, OrderSearchRequest, OrderStatsRequest,
+                                             OrderUpdateRequest)
+from grpc_core.servers.handlers.order import OrderArchivedError, OrderHandler, OrderNotFoundError
+from grpc_core.servers.handlers.idempotency import IdempotencyHandler, IdempotencyKeyMismatchError
 from grpc_core.clients.check import grpc_check_client
 
 
@@ -31,6 +33,14 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         Обрабатывает gRPC запрос на получение списка заказов. Вызывает обработчик для получения списка
         заказов и возвращает ответ.
 
+    async def SearchOrders(self, request, context)
+        Обрабатывает gRPC запрос на поиск заказов по названию. Вызывает обработчик для поиска и отправляет
+        найденные заказы стримом в порядке релевантности.
+
+    async def GetOrderStats(self, request, context)
+        Обрабатывает gRPC запрос на получение счетчиков заказов. Вызывает обработчик для получения счетчиков
+        и гистограммы по дням и возвращает ответ.
+
     async def ReadOrder(self, request, context)
         Обрабатывает gRPC запрос на чтение заказа. Преобразует запрос в объект OrderReadRequest,
         вызывает обработчик для чтения заказа и возвращает ответ.
@@ -52,6 +62,17 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         """
         self.message = GrpcParseMessage()
 
+    @staticmethod
+    def _get_metadata_value(context, key: str) -> str | None:
+        """
+        Возвращает значение ключа из метаданных запроса или None, если ключ не передан.
+        """
+        for metadata_key, value in context.invocation_metadata():
+            if metadata_key == key:
+                return value
+        return None
+
+    @traced()
     async def CreateOrder(self, request, context) -> order_pb2.CreateOrderResponse:
         """
         Обрабатывает gRPC запрос на создание заказа.
@@ -59,6 +80,10 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         Преобразует запрос из формата gRPC в объект OrderCreateRequest, передает его в обработчик
         OrderHandler.create_order для создания заказа и возвращает результат.
 
+        Если клиент передал в метаданных ключ idempotency-key, повторные запросы с тем же ключом
+        возвращают ответ первого запроса без повторного создания заказа. Ключ, уже использованный
+        запросом с другими параметрами, - INVALID_ARGUMENT.
+
         Параметры:
         ----------
         request : order_pb2.CreateOrderRequest
@@ -79,30 +104,42 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         -----------
         Может выбрасывать исключения в случае ошибок при обработке запроса.
         """
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span("CreateOrder") as span:
-            request = OrderCreateRequest(**self.message.rpc_to_dict(request))
-            logger.info(f'Получен запрос на создание заказа: {request}')
+        request = OrderCreateRequest(**self.message.rpc_to_dict(request))
+        logger.info('Получен запрос на создание заказа: uuid={}', request.uuid)
 
+        idempotency_key = self._get_metadata_value(context, 'idempotency-key')
+        if idempotency_key:
+            try:
+                result = await IdempotencyHandler.execute(
+                    key=idempotency_key,
+                    request_hash=IdempotencyHandler.request_hash(request.dict(exclude={'uuid'})),
+                    resource=request.uuid,
+                    operation=lambda uuid: OrderHandler.create_order(request=request.model_copy(update={'uuid': uuid})),
+                    recover=OrderHandler.created_order,
+                    response_model=OrderCreateResponse,
+                )
+            except IdempotencyKeyMismatchError as e:
+                await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        else:
             result = await OrderHandler.create_order(
                 request=request
             )
 
-            response = self.message.dict_to_rpc(
-                data=result.dict(),
-                request_message=order_pb2.CreateOrderResponse(),
-            )
-
-            span.set_attribute("rpc.grpc.status_code", "OK")
-            span.add_event("Successful response", {"response": str(response)})
-
-            return response
+        response = self.message.dict_to_rpc(
+            data=result.dict(),
+            request_message=order_pb2.CreateOrderResponse(),
+        )
+        return response
 
+    @traced()
     async def ListOrders(self, request, context) -> order_pb2.ListOrdersResponse:
         """
         Обрабатывает gRPC запрос на получение списка заказов.
 
         Вызывает обработчик OrderHandler.list_orders для получения списка заказов и возвращает результат.
+        Если в запросе заданы диапазон дат, статус, limit или page_token, возвращается страница заказов
+        в порядке даты; неверная дата или page_token - INVALID_ARGUMENT. Архивные заказы возвращаются
+        только с include_archived.
 
         Параметры:
         ----------
@@ -124,36 +161,89 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         -----------
         Может выбрасывать исключения в случае ошибок при обработке запроса.
         """
-        # Получаем трассировщик для текущего модуля
-        tracer = trace.get_tracer(__name__)
-        # Создаем и начинаем новый span для текущего метода ListOrders
-        with tracer.start_as_current_span("ListOrders") as span:
-            try:
-                logger.info(f'Получен запрос на получение списка заказов')
-                result = await OrderHandler.list_orders()
-                response = self.message.dict_to_rpc(
-                    data=result.dict(),  # Преобразуем результат в словарь
-                    request_message=order_pb2.ListOrdersResponse(),  # Создаем новый экземпляр ListOrdersResponse
-                )
+        logger.info('Получен запрос на получение списка заказов')
+        request = OrderListRequest(**self.message.rpc_to_dict(request))
+        try:
+            result = await OrderHandler.list_orders(request=request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        response = self.message.dict_to_rpc(
+            data=result.dict(),  # Преобразуем результат в словарь
+            request_message=order_pb2.ListOrdersResponse(),  # Создаем новый экземпляр ListOrdersResponse
+        )
+        return response
+
+    async def SearchOrders(self, request, context) -> None:
+        """
+        Обрабатывает gRPC запрос на поиск заказов по названию.
+
+        Передает запрос в обработчик OrderHandler.search_orders и отправляет каждый найденный заказ отдельным
+        сообщением через context.write; next_page_token передается в последнем сообщении страницы.
+        Запрос без слов, отрицательный limit или неверный page_token - INVALID_ARGUMENT.
+
+        Параметры:
+        ----------
+        request : order_pb2.SearchOrdersRequest
+            gRPC сообщение со строкой поиска и параметрами страницы.
+        context : grpc.aio.ServicerContext
+            Контекст сервиса gRPC, содержащий информацию о текущем RPC.
 
-                # Устанавливаем атрибут статус-кода RPC в span
-                span.set_attribute("rpc.grpc.status_code", "OK")
-                # Добавляем событие успешного ответа в span
-                span.add_event("Successful response", {"response": str(response)})
-                return response
+        Логгирует:
+        ----------
+        Информационное сообщение о полученном запросе на поиск заказов.
+        """
+        logger.info('Получен запрос на поиск заказов: {!r}', request.query)
+        request = OrderSearchRequest(**self.message.rpc_to_dict(request))
+        try:
+            result = await OrderHandler.search_orders(request=request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        for index, item in enumerate(result.results, start=1):
+            data = item.dict()
+            if index == len(result.results):
+                data['next_page_token'] = result.next_page_token
+            await context.write(self.message.dict_to_rpc(data=data, request_message=order_pb2.SearchOrdersResponse()))
+
+    @traced()
+    async def GetOrderStats(self, request, context) -> order_pb2.GetOrderStatsResponse:
+        """
+        Обрабатывает gRPC запрос на получение счетчиков заказов.
 
-            except Exception as e:
-                # Устанавливаем статус span как ошибочный и добавляем сообщение об ошибке
-                span.set_status(Status(StatusCode.ERROR, str(e)))
-                # Добавляем событие ошибки в span с деталями об ошибке
-                span.add_event("Error response", {"error": str(e)})
+        Передает запрос в обработчик OrderHandler.get_order_stats и возвращает число всех, выполненных
+        и невыполненных заказов и гистограмму по дням. Счетчики ведутся при изменении заказов, поэтому
+        вызов не читает заказы. Неверная дата - INVALID_ARGUMENT.
 
+        Параметры:
+        ----------
+        request : order_pb2.GetOrderStatsRequest
+            gRPC сообщение с диапазоном дней гистограммы.
+        context : grpc.aio.ServicerContext
+            Контекст сервиса gRPC, содержащий информацию о текущем RPC.
+
+        Возвращает:
+        -----------
+        order_pb2.GetOrderStatsResponse
+            gRPC сообщение со счетчиками заказов.
+
+        Логгирует:
+        ----------
+        Информационное сообщение о полученном запросе на получение счетчиков заказов.
+        """
+        logger.info('Получен запрос на получение счетчиков заказов')
+        request = OrderStatsRequest(**self.message.rpc_to_dict(request))
+        try:
+            result = await OrderHandler.get_order_stats(request=request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        return self.message.dict_to_rpc(data=result.dict(), request_message=order_pb2.GetOrderStatsResponse())
+
+    @traced()
     async def ReadOrder(self, request, context) -> order_pb2.ReadOrderResponse:
         """
         Обрабатывает gRPC запрос на чтение заказа.
 
         Преобразует запрос из формата gRPC в объект OrderReadRequest, передает его в обработчик OrderHandler.read_order
-        для получения данных о заказе и возвращает результат.
+        для получения данных о заказе и возвращает результат. Заказ, которого нет среди текущих, ищется в архиве.
 
         Параметры:
         ----------
@@ -173,27 +263,25 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
 
         Исключения:
         -----------
-        Может выбрасывать исключения в случае ошибок при обработке запроса.
+        Если заказа нет ни среди текущих, ни в архиве, вызов завершается со статусом NOT_FOUND.
         """
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span("ReadOrder") as span:
-            logger.info(f'Получен запрос на чтение заказа: {request}')
-            request = OrderReadRequest(**self.message.rpc_to_dict(request))
+        logger.info('Получен запрос на чтение заказа: uuid={}', request.uuid)
+        request = OrderReadRequest(**self.message.rpc_to_dict(request))
 
+        try:
             result = await OrderHandler.read_order(
                 request=request
             )
+        except OrderNotFoundError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
 
-            response = self.message.dict_to_rpc(
-                data=result.dict(),
-                request_message=order_pb2.ReadOrderResponse(),
-            )
-
-            span.set_attribute("rpc.grpc.status_code", "OK")
-            span.add_event("Successful response", {"response": str(response)})
-
-            return response
+        response = self.message.dict_to_rpc(
+            data=result.dict(),
+            request_message=order_pb2.ReadOrderResponse(),
+        )
+        return response
 
+    @traced()
     async def UpdateOrder(self, request, context) -> order_pb2.UpdateOrderResponse:
         """
         Обрабатывает gRPC запрос на обновление заказа.
@@ -219,27 +307,28 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
 
         Исключения:
         -----------
-        Может выбрасывать исключения в случае ошибок при обработке запроса.
+        Если заказа нет, вызов завершается со статусом NOT_FOUND, а если заказ перенесен в архив -
+        FAILED_PRECONDITION: архивные заказы не изменяются.
         """
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span("UpdateOrder") as span:
-            logger.info(f'Получен запрос на обновление заказа: {request}')
-            request = OrderUpdateRequest(**self.message.rpc_to_dict(request))
+        logger.info('Получен запрос на обновление заказа: uuid={}', request.uuid)
+        request = OrderUpdateRequest(**self.message.rpc_to_dict(request))
 
+        try:
             result = await OrderHandler.update_order(
                 request=request
             )
-
-            response = self.message.dict_to_rpc(
-                data=result.dict(),
-                request_message=order_pb2.UpdateOrderResponse(),
-            )
-
-            span.set_attribute("rpc.grpc.status_code", "OK")
-            span.add_event("Successful response", {"response": str(response)})
-
-            return response
-
+        except OrderNotFoundError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except OrderArchivedError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+        response = self.message.dict_to_rpc(
+            data=result.dict(),
+            request_message=order_pb2.UpdateOrderResponse(),
+        )
+        return response
+
+    @traced()
     async def DeleteOrder(self, request, context) -> order_pb2.DeleteOrderResponse:
         """
         Обрабатывает gRPC запрос на удаление заказа.
@@ -267,55 +356,37 @@ class OrderService(order_pb2_grpc.OrderServiceServicer):
         -----------
         Может выбрасывать исключения в случае ошибок при обработке запроса.
         """
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span("DeleteOrder") as span:
-            logger.info(f'Получен запрос на удаление заказа: {request}')
-            request = OrderReadRequest(**self.message.rpc_to_dict(request))
+        logger.info('Получен запрос на удаление заказа: uuid={}', request.uuid)
+        request = OrderReadRequest(**self.message.rpc_to_dict(request))
 
-            result = await OrderHandler.delete_order(
-                request=request
-            )
+        result = await OrderHandler.delete_order(
+            request=request
+        )
 
-            response = self.message.dict_to_rpc(
-                data=result.dict(),
-                request_message=order_pb2.DeleteOrderResponse(),
-            )
-
-            span.set_attribute("rpc.grpc.status_code", "OK")
-            span.add_event("Successful response", {"response": str(response)})
-
-            return response
+        response = self.message.dict_to_rpc(
+            data=result.dict(),
+            request_message=order_pb2.DeleteOrderResponse(),
+        )
+        return response
 
+    @traced("OrderService.CheckStatusOrder")
     async def CheckStatusOrder(self, request, context) -> order_pb2.UpdateOrderResponse:
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span("OrderService.CheckStatusOrder") as span:
-            metadata = context.invocation_metadata()
-            auth = None
-            for key, value in metadata:
-                if key == 'rpc-auth':
-                    auth = value
-
-            await asyncio.sleep(1)
-            logger.info(f'Осталось времени в цепочке вызовов: {context.time_remaining()}')
-
-            client = await grpc_check_client(auth=auth)
-            response = await client.CheckStatusOrder(
-                check_pb2.CheckStatusOrderRequest(uuid=request.uuid),
-                timeout=context.time_remaining()
-            )
+        auth = self._get_metadata_value(context, 'rpc-auth')
 
-            await OrderHandler.update_after_check_order(response)
+        await asyncio.sleep(1)
+        logger.info('Осталось времени в цепочке вызовов: {}', context.time_remaining())
 
-            span.set_attribute("rpc.grpc.status_code", "OK")
-            span.add_event(
-                "Successful response",
-                {
-                    "response": str({
-                        "uuid": response.uuid,
-                        "completed": response.completed.value,
-                    })
-                }
-            )
+        client = await grpc_check_client(auth=auth)
+        response = await client.CheckStatusOrder(
+            check_pb2.CheckStatusOrderRequest(uuid=request.uuid),
+            timeout=context.time_remaining()
+        )
 
-            return response
+        try:
+            await OrderHandler.update_after_check_order(response)
+        except OrderNotFoundError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except OrderArchivedError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        return response
 
@@ -0,0 +1,339 @@
+import functools
+import threading
+import typing as t
+
+from loguru import logger
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import (ALWAYS_OFF, Decision, ParentBased, Sampler, SamplingResult,
+                                              TraceIdRatioBased)
+from opentelemetry.trace import SpanContext, TraceFlags
+from opentelemetry.trace.status import Status, StatusCode
+
+from grpc_core import metrics
+from settings import settings
+
+PAYLOAD_OFF = 'off'
+PAYLOAD_TRUNCATED = 'truncated'
+PAYLOAD_FULL = 'full'
+PAYLOAD_POLICIES = (PAYLOAD_OFF, PAYLOAD_TRUNCATED, PAYLOAD_FULL)
+
+SPANS_QUEUED = metrics.gauge('tracing_spans_queued', 'Спаны в очереди BatchSpanProcessor, ожидающие экспорта')
+SPANS_DROPPED = metrics.counter('tracing_spans_dropped_total', 'Спаны, отброшенные из-за переполнения очереди')
+SPANS_EXPORTED = metrics.counter(
+    'tracing_spans_exported_total', 'Спаны, переданные экспортеру, по результату экспорта', ['result']
+)
+
+
+class RecordUnsampled(Sampler):
+    """
+    Обертка над сэмплером, заменяющая решение DROP на RECORD_ONLY.
+
+    Такой спан не экспортируется обычным процессором, но записывается, и ErrorSpanProcessor может
+    отправить его, если запрос завершился ошибкой.
+    """
+
+    def __init__(self, delegate: Sampler) -> None:
+        self._delegate = delegate
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        result = self._delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision == Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, trace_state=result.trace_state)
+        return result
+
+    def get_description(self) -> str:
+        return f'RecordUnsampled{{{self._delegate.get_description()}}}'
+
+
+def create_sampler(ratio: float) -> Sampler:
+    """
+    Создает сэмплер: доля ratio новых трасс, решение родителя для продолжения чужих трасс.
+
+    Несэмплированные спаны записываются без экспорта (см. RecordUnsampled), чтобы ошибки
+    попадали в трассировку независимо от доли сэмплирования.
+    """
+    return ParentBased(
+        root=RecordUnsampled(TraceIdRatioBased(ratio)),
+        remote_parent_not_sampled=RecordUnsampled(ALWAYS_OFF),
+        local_parent_not_sampled=RecordUnsampled(ALWAYS_OFF),
+    )
+
+
+class ErrorSpanProcessor(SpanProcessor):
+    """
+    Процессор, передающий в delegate сэмплированные спаны и несэмплированные спаны со статусом ERROR.
+
+    Несэмплированный спан с ошибкой передается копией с установленным флагом SAMPLED,
+    так как BatchSpanProcessor отбрасывает спаны без этого флага.
+    """
+
+    def __init__(self, delegate: SpanProcessor) -> None:
+        self._delegate = delegate
+
+    def on_start(self, span, parent_context=None) -> None:
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self._delegate.on_end(span)
+        elif span.status.status_code == StatusCode.ERROR:
+            self._delegate.on_end(self._as_sampled(span))
+
+    def shutdown(self) -> None:
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
+
+    @staticmethod
+    def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+        context = SpanContext(
+            trace_id=span.context.trace_id,
+            span_id=span.context.span_id,
+            is_remote=span.context.is_remote,
+            trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            trace_state=span.context.trace_state,
+        )
+        return ReadableSpan(
+            name=span.name,
+            context=context,
+            parent=span.parent,
+            resource=span.resource,
+            attributes=span.attributes,
+            events=span.events,
+            links=span.links,
+            kind=span.kind,
+            status=span.status,
+            start_time=span.start_time,
+            end_time=span.end_time,
+            instrumentation_scope=span.instrumentation_scope,
+        )
+
+
+class CountingSpanExporter(SpanExporter):
+    """
+    Обертка над экспортером, считающая успешно и неуспешно экспортированные спаны.
+
+    on_export вызывается с числом спанов пакета до его отправки (см. MeteredSpanProcessor).
+    """
+
+    def __init__(self, delegate: SpanExporter, on_export: t.Optional[t.Callable[[int], None]] = None) -> None:
+        self._delegate = delegate
+        self._on_export = on_export
+
+    def export(self, spans) -> SpanExportResult:
+        if self._on_export is not None:
+            self._on_export(len(spans))
+        result = self._delegate.export(spans)
+        SPANS_EXPORTED.inc(len(spans), result='success' if result == SpanExportResult.SUCCESS else 'failure')
+        return result
+
+    def shutdown(self) -> None:
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
+
+
+class MeteredSpanProcessor(SpanProcessor):
+    """
+    BatchSpanProcessor с собственным учетом очереди: спаны в очереди и отброшенные из-за ее переполнения.
+
+    on_end только добавляет спан в ограниченную очередь и не ждет экспорта: если экспортер не успевает,
+    очередь переполняется и новые спаны отбрасываются, а обработка запросов не замедляется.
+
+    Внутренние поля BatchSpanProcessor (очередь и ее размер) меняются между версиями SDK, поэтому очередь
+    считается здесь: спан учитывается при передаче в BatchSpanProcessor и снимается, когда экспортер получает
+    его в пакете. Спан, для которого очередь уже заполнена (queued >= max_queue_size), отбрасывается этим
+    процессором, поэтому очередь BatchSpanProcessor того же размера не переполняется, и все потери видны
+    в SPANS_DROPPED.
+
+    Атрибуты:
+    ---------
+    queued : int
+        Спаны, переданные в BatchSpanProcessor и еще не полученные экспортером.
+    """
+
+    def __init__(self, exporter: SpanExporter, max_queue_size: int, **options) -> None:
+        self.max_queue_size = max_queue_size
+        self.queued = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._delegate = BatchSpanProcessor(
+            CountingSpanExporter(exporter, on_export=self._exported), max_queue_size=max_queue_size, **options
+        )
+
+    def _exported(self, count: int) -> None:
+        with self._lock:
+            self.queued = max(0, self.queued - count)
+
+    def on_start(self, span, parent_context=None) -> None:
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        # BatchSpanProcessor пропускает несэмплированные спаны и спаны после остановки
+        if self._shutdown or not span.context.trace_flags.sampled:
+            return
+        with self._lock:
+            if self.queued >= self.max_queue_size:
+                SPANS_DROPPED.inc()
+                return
+            self.queued += 1
+        self._delegate.on_end(span)
+
+    def shutdown(self) -> None:
+        self._shutdown = True
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
+
+
+def create_span_exporter(name: str) -> t.Optional[SpanExporter]:
+    """
+    Создает экспортер спанов по имени: otlp, jaeger или none (None - трассировка отключена).
+
+    Пакет экспортера импортируется только при выборе этого экспортера.
+    """
+    if name == 'none':
+        return None
+    if name == 'jaeger':
+        from opentelemetry.exporter.jaeger.proto.grpc import JaegerExporter
+        # Разрешаем небезопасное соединение с коллектором (без шифрования).
+        return JaegerExporter(collector_endpoint=f'{settings.JAEGER_HOST}:{settings.JAEGER_PORT}', insecure=True)
+    if name == 'otlp':
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise RuntimeError(
+                'Для TRACING_EXPORTER=otlp установите пакет opentelemetry-exporter-otlp-proto-grpc'
+            ) from e
+        return OTLPSpanExporter(endpoint=settings.OTLP_ENDPOINT, insecure=True)
+    raise ValueError(f'Неизвестный экспортер спанов: {name}')
+
+
+def setup_tracing(service_name: str = 'Order') -> None:
+    """
+    Настраивает глобальный провайдер трассировки по настройкам TRACING_*.
+
+    Спаны проходят через ErrorSpanProcessor в MeteredSpanProcessor с размерами очереди и пакета
+    и интервалом отправки из настроек. При TRACING_EXPORTER=none провайдер не устанавливается,
+    и трассировка работает в режиме no-op.
+    """
+    exporter = create_span_exporter(settings.TRACING_EXPORTER)
+    if exporter is None:
+        logger.info('Экспорт трассировки отключен (TRACING_EXPORTER=none)')
+        return
+
+    processor = MeteredSpanProcessor(
+        exporter,
+        max_queue_size=settings.TRACING_MAX_QUEUE_SIZE,
+        max_export_batch_size=settings.TRACING_MAX_EXPORT_BATCH_SIZE,
+        schedule_delay_millis=settings.TRACING_SCHEDULE_DELAY_MILLIS,
+        export_timeout_millis=settings.TRACING_EXPORT_TIMEOUT_MILLIS,
+    )
+    SPANS_QUEUED.set_function(lambda: processor.queued)
+
+    # Имя ресурса используется для идентификации службы в системе трассировки.
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: service_name}),
+        sampler=create_sampler(settings.TRACING_SAMPLE_RATIO),
+    )
+    provider.add_span_processor(ErrorSpanProcessor(processor))
+    trace.set_tracer_provider(provider)
+
+
+def payload_policy(method: str) -> str:
+    """
+    Возвращает политику записи ответа в спан для метода ('OrderService.ListOrders').
+
+    Политика метода задается в TRACING_PAYLOAD_CAPTURE_METHODS, иначе используется TRACING_PAYLOAD_CAPTURE.
+    """
+    policy = settings.TRACING_PAYLOAD_CAPTURE_METHODS.get(method, settings.TRACING_PAYLOAD_CAPTURE)
+    if policy not in PAYLOAD_POLICIES:
+        raise ValueError(f'Неизвестная политика записи ответа в спан для {method}: {policy}')
+    return policy
+
+
+def format_payload(message, policy: str) -> t.Optional[str]:
+    """
+    Формирует текст ответа для события спана согласно политике или None, если ответ не записывается.
+
+    При политике truncated форматируются только первые TRACING_PAYLOAD_MAX_ITEMS элементов повторяющихся
+    полей, а текст обрезается до TRACING_PAYLOAD_MAX_LENGTH символов, поэтому стоимость не зависит от размера ответа.
+    """
+    if policy == PAYLOAD_OFF:
+        return None
+    if policy == PAYLOAD_FULL:
+        return str(message)
+
+    preview, omitted = _preview(message)
+    text = str(preview)
+    if len(text) > settings.TRACING_PAYLOAD_MAX_LENGTH:
+        text = f'{text[:settings.TRACING_PAYLOAD_MAX_LENGTH]}...'
+    if omitted:
+        text = f'{text} (еще {omitted} элементов)'
+    return text
+
+
+def _preview(message):
+    # Копия верхнего уровня сообщения, в которой повторяющиеся поля урезаны до TRACING_PAYLOAD_MAX_ITEMS элементов
+    limit = settings.TRACING_PAYLOAD_MAX_ITEMS
+    preview = type(message)()
+    omitted = 0
+    for field, value in message.ListFields():
+        target = getattr(preview, field.name)
+        if field.message_type is not None and field.message_type.GetOptions().map_entry:
+            target.update(value)
+        elif field.label == field.LABEL_REPEATED:
+            target.extend(value[:limit])
+            omitted += max(0, len(value) - limit)
+        elif field.message_type is not None:
+            target.CopyFrom(value)
+        else:
+            setattr(preview, field.name, value)
+    return preview, omitted
+
+
+def traced(span_name: t.Optional[str] = None):
+    """
+    Декоратор метода gRPC сервиса, выполняющий его внутри спана трассировки.
+
+    При успехе устанавливает атрибут rpc.grpc.status_code=OK и добавляет событие "Successful response"
+    с ответом, записанным по политике метода. Ответ не форматируется, если спан не будет экспортирован.
+    При исключении спан получает статус ERROR и событие "Error response", исключение пробрасывается дальше.
+
+    Параметры:
+    ----------
+    span_name : str, optional
+        Имя спана, по умолчанию имя метода.
+    """
+    def decorator(method):
+        name = span_name or method.__name__
+        # Ключ политики: имя класса сервиса и метода, например 'OrderService.ListOrders'
+        qualname = method.__qualname__
+
+        @functools.wraps(method)
+        async def wrapper(self, request, context):
+            tracer = trace.get_tracer(method.__module__)
+            with tracer.start_as_current_span(name, record_exception=False, set_status_on_exception=False) as span:
+                try:
+                    response = await method(self, request, context)
+                except Exception as e:
+                    span.set_status(Status(StatusCode.ERROR, str(e)))
+                    span.add_event("Error response", {"error": str(e)})
+                    raise
+
+                span.set_attribute("rpc.grpc.status_code", "OK")
+                if span.get_span_context().trace_flags.sampled:
+                    payload = format_payload(response, payload_policy(qualname))
+                    if payload is not None:
+                        span.add_event("Successful response", {"response": payload})
+                return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,185 @@
+"""
+Запуск gRPC сервера в нескольких процессах на одном порту.
+
+Каждый рабочий процесс поднимает собственный Server с собственным циклом событий и слушает общий порт
+с опцией grpc.so_reuseport: ядро распределяет входящие соединения между процессами, поэтому сервис
+использует несколько ядер процессора. Распределение идет по соединениям, а не по запросам: все запросы
+одного HTTP/2 соединения обслуживает один процесс.
+
+Процессы ничего не разделяют в памяти. Кэши внутри процесса (ожидающие запросы IdempotencyHandler,
+статистика задержек хеджирования, балансировщик клиентских каналов) у каждого процесса свои и служат
+только оптимизацией: общее состояние хранится в БД, а межпроцессная идемпотентность CreateOrder
+обеспечивается резервированием ключа в таблице IdempotencyKey.
+
+Процессы запускаются командой python -m grpc_core.servers (см. grpc_core/servers/__main__.py).
+"""
+import asyncio
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+
+from loguru import logger
+
+from grpc_core.logger import setup_logging
+from settings import settings
+
+# Процесс, проработавший дольше этого времени, считается стабильным, и задержка перезапуска сбрасывается
+STABLE_UPTIME = 30.0
+INITIAL_RESTART_BACKOFF = 0.5
+
+
+def install_event_loop(event_loop: str) -> None:
+    """
+    Устанавливает реализацию цикла событий для asyncio.run: стандартную (asyncio) или uvloop.
+    """
+    if event_loop == 'uvloop':
+        try:
+            import uvloop
+        except ImportError as e:
+            raise RuntimeError('Для цикла событий uvloop установите пакет uvloop: pip install uvloop') from e
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    elif event_loop != 'asyncio':
+        raise ValueError(f'Неизвестный цикл событий: {event_loop}')
+
+
+def run_worker(index: int, event_loop: str = 'asyncio', reuse_port: bool = False) -> None:
+    """
+    Точка входа рабочего процесса: запускает Server и останавливает его по SIGTERM/SIGINT.
+    reuse_port - слушать порт вместе с другими процессами (GRPC_SO_REUSEPORT).
+    """
+    if reuse_port:
+        settings.GRPC_SO_REUSEPORT = True
+    setup_logging()
+    install_event_loop(event_loop)
+    asyncio.run(_serve(index))
+
+
+async def _serve(index: int) -> None:
+    # Импорт внутри процесса: сервер, трассировка и каналы gRPC создаются уже после запуска процесса
+    from grpc_core.clients.balancer import close_balancer
+    from grpc_core.loop_monitor import start_loop_monitor
+    from grpc_core.metrics import start_metrics_server
+    from grpc_core.servers.manager import Server
+
+    server = Server()
+    stopping = []
+
+    def stop() -> None:
+        if not stopping:
+            stopping.append(asyncio.ensure_future(server.stop()))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop)
+
+    logger.info(f'Рабочий процесс {index} запущен')
+    monitor = await start_loop_monitor()
+    metrics_server = None
+    if settings.GRPC_METRICS_PORT:
+        metrics_server = await start_metrics_server(settings.GRPC_HOST_LOCAL, settings.GRPC_METRICS_PORT + index)
+    try:
+        await server.run()
+        if stopping:
+            await stopping[0]
+    finally:
+        await close_balancer()
+        if metrics_server is not None:
+            metrics_server.close()
+        if monitor is not None:
+            await monitor.stop()
+    logger.info(f'Рабочий процесс {index} завершен')
+    await logger.complete()
+
+
+class WorkerSupervisor:
+    """
+    Запускает рабочие процессы gRPC сервера и следит за ними.
+
+    Упавший процесс перезапускается с экспоненциально растущей задержкой (не больше
+    GRPC_WORKER_RESTART_MAX_BACKOFF), чтобы процесс, падающий при старте, не перезапускался в цикле.
+    По SIGTERM или SIGINT всем процессам отправляется SIGTERM: они перестают принимать соединения и
+    дожидаются выполняющихся запросов до GRPC_SHUTDOWN_GRACE секунд. Процессы, не завершившиеся
+    за это время, принудительно останавливаются.
+
+    Атрибуты:
+    ---------
+    workers : int
+        Число рабочих процессов.
+    target : Callable[[int], None]
+        Функция, выполняемая в рабочем процессе; получает номер процесса. Должна сериализоваться pickle.
+    """
+
+    def __init__(self, workers: int, target=run_worker) -> None:
+        self.workers = workers
+        self.target = target
+        # spawn вместо fork: gRPC не поддерживает fork после создания каналов и серверов
+        self._context = multiprocessing.get_context('spawn')
+        self._processes: list[multiprocessing.Process | None] = [None] * workers
+        self._started_at = [0.0] * workers
+        self._failures = [0] * workers
+        self._restart_at: dict[int, float] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        """
+        Запускает процессы и следит за ними до получения сигнала остановки.
+        """
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        logger.info(
+            f'*** Запуск {self.workers} процессов gRPC сервера на {settings.GRPC_HOST_LOCAL}:{settings.GRPC_PORT} ***'
+        )
+        for index in range(self.workers):
+            self._spawn(index)
+
+        while not self._stopping:
+            sentinels = {process.sentinel: index for index, process in enumerate(self._processes) if process}
+            for sentinel in wait(list(sentinels), timeout=0.5):
+                self._on_exit(sentinels[sentinel])
+            now = time.monotonic()
+            for index, restart_at in list(self._restart_at.items()):
+                if restart_at <= now and not self._stopping:
+                    del self._restart_at[index]
+                    self._spawn(index)
+
+        self._drain()
+
+    def _request_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(target=self.target, args=(index,), name=f'grpc-worker-{index}')
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def _on_exit(self, index: int) -> None:
+        process = self._processes[index]
+        process.join()
+        self._processes[index] = None
+        if self._stopping:
+            return
+        if time.monotonic() - self._started_at[index] > STABLE_UPTIME:
+            self._failures[index] = 0
+        backoff = min(settings.GRPC_WORKER_RESTART_MAX_BACKOFF, INITIAL_RESTART_BACKOFF * 2 ** self._failures[index])
+        self._failures[index] += 1
+        self._restart_at[index] = time.monotonic() + backoff
+        logger.warning(
+            f'Рабочий процесс {index} (pid {process.pid}) завершился с кодом {process.exitcode}, '
+            f'перезапуск через {backoff} с'
+        )
+
+    def _drain(self) -> None:
+        processes = [process for process in self._processes if process is not None]
+        logger.info(f'*** Остановка {len(processes)} процессов gRPC сервера ***')
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + settings.GRPC_SHUTDOWN_GRACE + 5
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f'Рабочий процесс {process.name} не завершился вовремя, останавливаем принудительно')
+                process.kill()
+                process.join()
+
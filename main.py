@@ -1,23 +1,38 @@
-import asyncio
 import uvicorn
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 
+from grpc_core.clients.balancer import close_balancer
+from grpc_core.logger import setup_logging
+from grpc_core.loop_monitor import start_loop_monitor
 from grpc_core.servers.manager import Server
 
 from settings import settings
-from api import order
+from api import metrics, order
+
+setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    asyncio.create_task(Server().run())
+    # Встроенный режим удобен для разработки: шлюз и gRPC сервер делят один цикл событий.
+    # В остальных случаях сервер запускается отдельно командой python -m grpc_core.servers.
+    monitor = await start_loop_monitor()
+    if settings.GRPC_EMBEDDED:
+        await Server().start()
     try:
         yield
     finally:
-        await Server().stop()
+        await close_balancer()
+        if settings.GRPC_EMBEDDED:
+            await Server().stop()
+        if monitor is not None:
+            await monitor.stop()
+        # Дожидаемся записи сообщений, оставшихся в очереди логов
+        await logger.complete()
 
 
 app = FastAPI(
@@ -37,6 +52,13 @@ app.add_middleware(
 
 
 app.include_router(order.router)
+app.include_router(metrics.router)
 
 if __name__ == '__main__':
-    uvicorn.run('main:app', port=settings.SERVICE_PORT, host=settings.SERVICE_HOST_LOCAL, reload=True)
+    uvicorn.run(
+        'main:app',
+        port=settings.SERVICE_PORT,
+        host=settings.SERVICE_HOST_LOCAL,
+        reload=settings.SERVICE_RELOAD,
+        workers=settings.SERVICE_WORKERS,
+    )
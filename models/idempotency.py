@@ -0,0 +1,13 @@
+from piccolo.columns import BigInt, Text, Varchar
+from piccolo.table import Table
+
+from models.order import DB
+
+
+class IdempotencyKey(Table, db=DB):
+    key = Varchar(primary_key=True)
+    response = Text()
+    created_at = BigInt(index=True)
+    # Хеш параметров запроса и идентификатор ресурса, создаваемого операцией по ключу
+    request_hash = Varchar(length=64, default='')
+    resource = Varchar(default='')
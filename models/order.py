@@ -1,4 +1,4 @@
-from piccolo.columns import Boolean, Varchar
+from piccolo.columns import BigInt, Boolean, Varchar
 from piccolo.engine.sqlite import SQLiteEngine
 from piccolo.table import Table
 
@@ -10,3 +10,6 @@ class Order(Table, db=DB):
     name = Varchar()
     completed = Boolean(default=False)
     date = Varchar()
+    # date в микросекундах Unix (UTC) для выборок по диапазону; индексы и миграция существующих таблиц -
+    # в grpc_core.servers.repositories.schema
+    timestamp = BigInt(null=True, default=None)
@@ -4,14 +4,129 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     SERVICE_HOST_LOCAL: str = '0.0.0.0'
     SERVICE_PORT: int = 1111
+    # Число процессов HTTP шлюза (uvicorn) и автоперезагрузка при изменении кода (только для разработки)
+    SERVICE_WORKERS: int = 1
+    SERVICE_RELOAD: bool = False
 
     GRPC_HOST_LOCAL: str = '0.0.0.0'
     GRPC_PORT: int = 50091
+    # Запускать gRPC сервер внутри процесса шлюза; при False он запускается отдельно: python -m grpc_core.servers
+    GRPC_EMBEDDED: bool = True
+    # Число процессов и цикл событий (asyncio или uvloop) gRPC сервера при запуске через python -m grpc_core.servers
+    GRPC_WORKERS: int = 1
+    GRPC_EVENT_LOOP: str = 'asyncio'
+    # Общий порт для нескольких процессов сервера. Включается только для рабочих процессов
+    # python -m grpc_core.servers --workers N (N > 1): иначе второй сервер на том же порту (еще один шлюз
+    # или не остановленный встроенный сервер) молча делил бы с первым соединения вместо ошибки при запуске
+    GRPC_SO_REUSEPORT: bool = False
+    # Максимальный размер одного принимаемого и отправляемого сервером сообщения, байт (-1 - без ограничения)
+    GRPC_MAX_RECEIVE_MESSAGE_LENGTH: int = 4 * 1024 * 1024
+    GRPC_MAX_SEND_MESSAGE_LENGTH: int = 4 * 1024 * 1024
+    # Время, которое выполняющиеся запросы получают на завершение при остановке сервера, с
+    GRPC_SHUTDOWN_GRACE: float = 10.0
+    # Максимальная задержка перед перезапуском упавшего процесса сервера, с
+    GRPC_WORKER_RESTART_MAX_BACKOFF: float = 30.0
+    # Порт HTTP /metrics процессов python -m grpc_core.servers: процесс N слушает GRPC_METRICS_PORT + N (0 - не запускать)
+    GRPC_METRICS_PORT: int = 0
+    # Файл записи вызовов для воспроизведения (python -m grpc_core.clients.replay), '' - не записывать.
+    # {pid} в пути заменяется номером процесса; при переполнении очереди записи вызовы не записываются
+    GRPC_CAPTURE_PATH: str = ''
+    GRPC_CAPTURE_MAX_QUEUE: int = 10000
+    # Service config клиентских каналов в формате JSON, заменяет grpc_core.clients.channel.DEFAULT_SERVICE_CONFIG
+    GRPC_CLIENT_SERVICE_CONFIG: dict = {}
+    # Адреса бэкендов OrderService для клиентской балансировки, по умолчанию GRPC_HOST_LOCAL:GRPC_PORT
+    GRPC_BACKENDS: list[str] = []
+    # Политика балансировки: round_robin или least_request
+    GRPC_LB_POLICY: str = 'round_robin'
+    # Имя сервиса, статус которого запрашивается через Health.Watch ('' - статус сервера целиком).
+    # Не указывайте order.OrderService, если бэкенд - этот же сервер: его статус зависит от самого балансировщика
+    GRPC_HEALTH_CHECK_SERVICE: str = ''
+    GRPC_HEALTH_CHECK_RETRY_INTERVAL: float = 1.0
+    # Outlier detection: исключение бэкендов с ошибками подряд или медленными ответами. Задержка метода
+    # на бэкенде считается медленной, если она больше порога и в GRPC_OUTLIER_LATENCY_RATIO раз больше,
+    # чем у того же метода на самом быстром из остальных бэкендов. Методы с заведомо долгим ответом
+    # в оценку задержки не входят
+    GRPC_OUTLIER_CONSECUTIVE_FAILURES: int = 5
+    GRPC_OUTLIER_LATENCY_THRESHOLD: float = 1.0
+    GRPC_OUTLIER_LATENCY_RATIO: float = 3.0
+    GRPC_OUTLIER_LATENCY_EXCLUDED_METHODS: list[str] = ['/check.CheckStatusOrderService/CheckStatusOrder']
+    GRPC_OUTLIER_EJECTION_TIME: float = 30.0
+    GRPC_OUTLIER_MAX_EJECTION_PERCENT: int = 50
+
+    # Хранилище заказов: sqlite (Piccolo), sharded (несколько файлов SQLite) или memory (в памяти процесса),
+    # см. grpc_core.servers.repositories.order.
+    # Снимок memory загружается при запуске и пишется каждые ORDER_MEMORY_SNAPSHOT_INTERVAL с и при остановке
+    ORDER_STORAGE: str = 'sqlite'
+    ORDER_MEMORY_SNAPSHOT_PATH: str = ''
+    ORDER_MEMORY_SNAPSHOT_INTERVAL: float = 60.0
+    # Число файлов и шаблон пути шардов sharded ({shard} - номер шарда); число шардов меняется только
+    # инструментом python -m grpc_core.servers.repositories.reshard. Размер пакета чтения шарда для списка заказов
+    ORDER_SHARDS: int = 4
+    ORDER_SHARD_PATH: str = 'bd.order.{shard}.sqlite'
+    ORDER_SHARD_SCAN_BATCH: int = 1000
+    # Размер страницы SearchOrders, если limit не задан, и наибольший допустимый
+    ORDER_SEARCH_DEFAULT_LIMIT: int = 20
+    ORDER_SEARCH_MAX_LIMIT: int = 100
+    # Перенос выполненных заказов старше ORDER_ARCHIVE_AGE с в архив (0 - не переносить): период, с,
+    # заказов в пакете (одной транзакции) и пауза между пакетами, с
+    ORDER_ARCHIVE_AGE: float = 0.0
+    ORDER_ARCHIVE_INTERVAL: float = 300.0
+    ORDER_ARCHIVE_BATCH: int = 500
+    ORDER_ARCHIVE_PAUSE: float = 0.05
+
+    # Проверка доступности БД для Health: период и время ожидания ответа, с
+    HEALTH_DATABASE_PROBE_INTERVAL: float = 5.0
+    HEALTH_DATABASE_PROBE_TIMEOUT: float = 2.0
+
+    # Экспортер спанов: otlp, jaeger или none
+    TRACING_EXPORTER: str = 'jaeger'
+    # Очередь BatchSpanProcessor: при переполнении спаны отбрасываются, а не задерживают запросы
+    TRACING_MAX_QUEUE_SIZE: int = 2048
+    TRACING_MAX_EXPORT_BATCH_SIZE: int = 512
+    TRACING_SCHEDULE_DELAY_MILLIS: int = 5000
+    TRACING_EXPORT_TIMEOUT_MILLIS: int = 30000
+    # Доля сэмплируемых трасс (0..1); спаны с ошибкой экспортируются всегда
+    TRACING_SAMPLE_RATIO: float = 1.0
+    # Запись ответа в событие спана: off, truncated (первые TRACING_PAYLOAD_MAX_ITEMS элементов списков,
+    # не больше TRACING_PAYLOAD_MAX_LENGTH символов) или full
+    TRACING_PAYLOAD_CAPTURE: str = 'truncated'
+    # Политика для отдельных методов, ключ - имя класса сервиса и метода
+    TRACING_PAYLOAD_CAPTURE_METHODS: dict[str, str] = {'OrderService.ListOrders': 'off'}
+    TRACING_PAYLOAD_MAX_LENGTH: int = 512
+    TRACING_PAYLOAD_MAX_ITEMS: int = 3
 
     JAEGER_HOST: str = "0.0.0.0"
     JAEGER_PORT: int = 14250
+    OTLP_ENDPOINT: str = 'localhost:4317'
+
+    # Зонд задержки цикла событий: период и опоздание, после которого в лог пишется стек блокирующего вызова, с
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_SLOW_CALLBACK_THRESHOLD: float = 0.25
+
+    # Уровень логов loguru; при LOG_ENQUEUE=True запись в stderr выполняется отдельным потоком
+    LOG_LEVEL: str = 'INFO'
+    LOG_ENQUEUE: bool = True
 
     SECRET_KEY: str = 'secret_key'
 
+    # Максимальный размер полезной нагрузки ответов EchoService, байт
+    ECHO_MAX_PAYLOAD_SIZE: int = 1024 * 1024
+    # Сколько принятых сообщений BothStream может ожидать ответа, прежде чем сервер перестанет читать стрим
+    ECHO_MAX_IN_FLIGHT: int = 16
+    # Лимит сообщений ClientStream, сохраняемых для ответа; ответ должен укладываться в GRPC_MAX_SEND_MESSAGE_LENGTH.
+    # При превышении: reject - ошибка RESOURCE_EXHAUSTED, summary - ответ с итогом по всему стриму без лишних сообщений
+    ECHO_CLIENT_STREAM_MAX_MESSAGES: int = 1000
+    ECHO_CLIENT_STREAM_MAX_BYTES: int = 1024 * 1024
+    ECHO_CLIENT_STREAM_OVERFLOW: str = 'reject'
+
+    # Максимальная длительность профилирования и tracemalloc через AdminService, с
+    ADMIN_PROFILE_MAX_DURATION: float = 60.0
+
+    # Время жизни ключей идемпотентности CreateOrder в секундах
+    IDEMPOTENCY_KEY_TTL: int = 24 * 60 * 60
+    # Через сколько секунд незаполненный резерв ключа считается брошенным упавшим процессом
+    IDEMPOTENCY_PENDING_TIMEOUT: int = 30
+
 
 settings = Settings()
@@ -0,0 +1,11 @@
+"""
+Общая настройка тестов производительности: сервер запускается в процессе теста на свободном порту.
+"""
+import pytest
+
+from benchmarks import regression
+
+
+@pytest.fixture(scope='session', autouse=True)
+def server_settings() -> None:
+    regression.configure()
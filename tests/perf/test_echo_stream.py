@@ -0,0 +1,124 @@
+"""
+Конвейер BothStream EchoService (см. benchmarks.echo_stream).
+
+EchoService запускается на отдельном сервере gRPC в цикле теста, без перехватчиков и БД:
+    test_pipelining_beats_serial - при ECHO_MAX_IN_FLIGHT > 1 клиент, отправляющий сообщения не дожидаясь
+                                   ответов, быстрее клиента, ждущего ответ на каждое сообщение: подготовка
+                                   следующего сообщения клиентом (WORK) совпадает по времени с ответом
+                                   сервера (пауза WORK между двумя ответами), а не следует за ним;
+    test_reader_stops_when_full  - пока обработчик отвечает на первое сообщение, задача чтения принимает
+                                   не больше ECHO_MAX_IN_FLIGHT сообщений и останавливается.
+"""
+import asyncio
+import contextlib
+import time
+
+import grpc
+import pytest
+
+from benchmarks.workers_scaling import free_port
+from grpc_core.protos.echo import echo_pb2, echo_pb2_grpc
+from grpc_core.servers.services.echo import EchoService
+from settings import settings
+
+pytestmark = pytest.mark.perf
+
+MESSAGES = 100
+REPEAT = 3
+# Работа клиента и сервера на одно сообщение, с
+WORK = 0.002
+# Конвейер должен давать выигрыш хотя бы в SPEEDUP раз, чтобы тест не зависел от шума машины
+SPEEDUP = 1.5
+
+
+@contextlib.asynccontextmanager
+async def echo_stub():
+    server = grpc.aio.server()
+    echo_pb2_grpc.add_EchoServiceServicer_to_server(EchoService(), server)
+    port = free_port()
+    server.add_insecure_port(f'127.0.0.1:{port}')
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f'127.0.0.1:{port}') as channel:
+            yield echo_pb2_grpc.EchoServiceStub(channel)
+    finally:
+        await server.stop(grace=0)
+
+
+def message(**fields) -> echo_pb2.EchoMessage:
+    return echo_pb2.EchoMessage(username='perf', message='echo', **{'replies': 1, 'interval': 0, **fields})
+
+
+async def pipelined(stub) -> float:
+    # Клиент отправляет все сообщения, не дожидаясь ответов, и одновременно читает ответы
+    started = time.perf_counter()
+    call = stub.BothStream()
+
+    async def send() -> None:
+        for _ in range(MESSAGES):
+            await asyncio.sleep(WORK)
+            await call.write(message(replies=2, interval=WORK))
+        await call.done_writing()
+
+    _, replies = await asyncio.gather(send(), count_replies(call))
+    assert replies == 2 * MESSAGES
+    return time.perf_counter() - started
+
+
+async def count_replies(call) -> int:
+    return len([reply async for reply in call])
+
+
+async def serial(stub) -> float:
+    # Клиент отправляет следующее сообщение только после ответа на предыдущее
+    started = time.perf_counter()
+    call = stub.BothStream()
+    for _ in range(MESSAGES):
+        await asyncio.sleep(WORK)
+        await call.write(message(replies=2, interval=WORK))
+        for _ in range(2):
+            assert (await call.read()).message == 'echo'
+    await call.done_writing()
+    assert await call.read() is grpc.aio.EOF
+    return time.perf_counter() - started
+
+
+def test_pipelining_beats_serial(monkeypatch):
+    monkeypatch.setattr(settings, 'ECHO_MAX_IN_FLIGHT', 16)
+
+    async def measure() -> tuple[float, float]:
+        async with echo_stub() as stub:
+            # Прогрев соединения и обработчика
+            await pipelined(stub)
+            await serial(stub)
+            return (
+                min([await pipelined(stub) for _ in range(REPEAT)]),
+                min([await serial(stub) for _ in range(REPEAT)]),
+            )
+
+    pipelined_time, serial_time = asyncio.run(measure())
+    assert pipelined_time * SPEEDUP < serial_time, f'конвейер {pipelined_time:.3f} с, последовательно {serial_time:.3f} с'
+
+
+@pytest.mark.parametrize('limit', [1, 4])
+def test_reader_stops_when_full(monkeypatch, limit):
+    monkeypatch.setattr(settings, 'ECHO_MAX_IN_FLIGHT', limit)
+    # Задача чтения разбирает каждое принятое сообщение через _pacing до ожидания свободного места
+    accepted = []
+    pacing = EchoService._pacing
+    monkeypatch.setattr(EchoService, '_pacing', staticmethod(lambda request: accepted.append(request) or pacing(request)))
+
+    async def fill() -> None:
+        async with echo_stub() as stub:
+            call = stub.BothStream()
+            # Первое сообщение занимает обработчик: второй ответ на него отправляется через 60 с
+            await call.write(message(replies=2, interval=60))
+            assert (await call.read()).message == 'echo'
+            for _ in range(limit + 10):
+                await call.write(message())
+            await asyncio.sleep(0.5)
+            call.cancel()
+
+    asyncio.run(fill())
+    # Места заняты первым сообщением и limit - 1 следующими; еще одно разобрано и ждет места
+    assert len(accepted) == limit + 1
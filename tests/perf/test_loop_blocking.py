@@ -0,0 +1,77 @@
+"""
+Обнаружение блокировок цикла событий LoopMonitor.
+
+В цикле с запущенным монитором выполняется один из сценариев:
+    idle      - цикл свободен, блокировок быть не должно;
+    sleep     - time.sleep внутри корутины (блокирующий вызов в обработчике);
+    jwt       - серия синхронных jwt.decode, как в AuthInterceptor под нагрузкой;
+    pydantic  - многократная валидация запроса схемой pydantic OrderCreateRequest.
+Блокировка длительностью BLOCK должна быть обнаружена ровно один раз, а в снятом стеке должна быть
+блокирующая функция; в свободном цикле блокировок быть не должно.
+"""
+import asyncio
+import time
+
+import jwt
+import pytest
+
+from grpc_core.loop_monitor import SLOW_CALLBACKS, LoopMonitor
+from grpc_core.servers.schemas.order import OrderCreateRequest
+from settings import settings
+
+pytestmark = pytest.mark.perf
+
+# Длительность блокировки, период зонда и порог обнаружения, с
+BLOCK = 0.5
+INTERVAL = 0.05
+THRESHOLD = 0.1
+
+
+def block_sleep(duration: float) -> None:
+    time.sleep(duration)
+
+
+def block_jwt(duration: float) -> None:
+    token = jwt.encode({'sub': 'benchmark'}, settings.SECRET_KEY, algorithm='HS256')
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+
+
+def block_pydantic(duration: float) -> None:
+    data = {'name': 'order', 'completed': False, 'date': '2024-01-01'}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            OrderCreateRequest(**data)
+
+
+async def run_scenario(block) -> tuple[int, str]:
+    # Возвращает число обнаруженных блокировок и стек последней из них
+    monitor = LoopMonitor(interval=INTERVAL, threshold=THRESHOLD)
+    monitor.start()
+    try:
+        detected_before = SLOW_CALLBACKS.value()
+        # Даем зонду сделать несколько тактов до и после блокировки
+        await asyncio.sleep(monitor.interval * 3)
+        if block is None:
+            await asyncio.sleep(BLOCK)
+        else:
+            block(BLOCK)
+        await asyncio.sleep(monitor.interval * 3)
+    finally:
+        await monitor.stop()
+    detected = int(SLOW_CALLBACKS.value() - detected_before)
+    return detected, monitor.slow_callbacks[-1] if detected else ''
+
+
+def test_idle_loop():
+    detected, _ = asyncio.run(run_scenario(None))
+    assert detected == 0
+
+
+@pytest.mark.parametrize('block', [block_sleep, block_jwt, block_pydantic], ids=['sleep', 'jwt', 'pydantic'])
+def test_blocking_detected(block):
+    detected, stack = asyncio.run(run_scenario(block))
+    assert detected == 1
+    assert block.__name__ in stack
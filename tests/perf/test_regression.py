@@ -0,0 +1,32 @@
+"""
+Проверка производительности на регрессии относительно benchmarks/baseline.json (см. benchmarks.regression).
+
+Все нагрузки измеряются один раз на модуль, а каждая нагрузка базового замера проверяется отдельным тестом
+с теми же допусками, что и python -m benchmarks.regression. После намеренного изменения скорости базовый
+замер обновляется командой python -m benchmarks.regression --update-baseline.
+"""
+import pytest
+
+from benchmarks import regression
+
+pytestmark = pytest.mark.perf
+
+BASELINE = regression.load_baseline()
+
+
+@pytest.fixture(scope='module')
+def results() -> dict[str, dict]:
+    return regression.run(None, regression.REPEAT)
+
+
+def test_baseline_covers_workloads(results):
+    assert sorted(results) == sorted(BASELINE), 'обновите базовый замер: --update-baseline'
+
+
+@pytest.mark.parametrize('name', sorted(BASELINE))
+def test_no_regression(results, name):
+    assert name in results, f'нагрузка {name} из базового замера не выполнялась'
+    regressions = regression.regressions_of(
+        name, results[name], BASELINE[name], regression.THROUGHPUT_TOLERANCE, regression.ALLOC_TOLERANCE
+    )
+    assert not regressions, '; '.join(regressions)